@@ -0,0 +1,536 @@
+"""
+Upload em massa processado em segundo plano.
+
+A requisição do exam_upload_multi só valida os nomes dos arquivos, grava os
+PDFs num diretório de staging (UPLOAD_BATCH_DIR) e cria o UploadBatch com um
+UploadBatchItem por arquivo; a resposta volta na hora com o id do lote. Os
+laudos também podem vir num .zip, que é lido membro a membro para o mesmo
+staging (sem o limite de PDFs por envio do formulário). O processamento
+(process_batch) então:
+
+  1. lê os dados de cada nome (parse_exam_filename);
+  2. garante tutores/pets e traduz as siglas dos exames uma vez por valor
+     distinto do lote;
+  3. grava os arquivos no storage em paralelo (UPLOAD_BATCH_WRITE_WORKERS
+     threads), já com o hash e a otimização de PDF;
+  4. cria os exames com bulk_create. Como bulk_create não passa pelo save()
+     nem pelos sinais, os campos calculados, o índice da busca, as
+     referências dos arquivos e a versão das listas são tratados aqui;
+  5. notifica a clínica/vet, como o upload em massa fazia.
+
+UPLOAD_BATCH_WORKER escolhe quem roda o processamento: "thread" (padrão,
+uma thread daemon iniciada no processo web depois do commit), "inline" (na
+própria requisição) ou "command" (só o process_upload_batches, por cron).
+A thread morre junto com o processo web (deploy, reciclagem de worker do
+gunicorn) e o lote fica parado até o comando retomá-lo; em produção, use
+"command" com o process_upload_batches rodando sempre. O comando também
+retoma lotes que ficaram parados (reinício do servidor no meio): o
+processamento atualiza UploadBatch.heartbeat_at a cada arquivo, e só volta
+para a fila o lote sem heartbeat há UPLOAD_BATCH_STALE_MINUTES. Se mesmo
+assim dois processos pegarem o mesmo lote, só o último claim (started_at)
+grava os exames; os itens já cadastrados não são processados de novo.
+
+Erros de um arquivo ficam no próprio item, sem parar os outros.
+"""
+import logging
+import shutil
+import threading
+import zipfile
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from pathlib import Path
+
+from django import forms
+from django.conf import settings
+from django.core.files import File
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import search
+from .exam_types import translate_many
+from .list_cache import bump_list_version
+from .models import (
+    Exam,
+    UploadBatch,
+    UploadBatchItem,
+    compute_sha256,
+    sync_exam_providers,
+)
+from .pdf_optimize import optimize_uploaded_pdf
+from .storage import retain_file
+
+logger = logging.getLogger(__name__)
+
+COPY_BLOCK_SIZE = 64 * 1024
+
+
+def batch_dir(batch) -> Path:
+    directory = getattr(settings, "UPLOAD_BATCH_DIR", None)
+    base = Path(directory) if directory else Path(settings.MEDIA_ROOT) / "upload_batches"
+    return base / str(batch.pk)
+
+
+def stage_batch(user, files, *, provider, notify_provider, archive=None) -> UploadBatch:
+    """
+    Grava os arquivos (já validados pelo formulário) no staging e cria o
+    lote. `provider` é o dict de prepare_provider_for_notification.
+    `archive` é um .zip com mais laudos (ver _stage_archive).
+    """
+    batch = UploadBatch.objects.create(
+        user=user,
+        notify_provider=notify_provider,
+        provider=_provider_snapshot(provider),
+    )
+    directory = batch_dir(batch)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    items = []
+    for position, uploaded in enumerate(files):
+        path = directory / f"{position:04d}.pdf"
+        with open(path, "wb") as target:
+            for chunk in uploaded.chunks(COPY_BLOCK_SIZE):
+                target.write(chunk)
+        items.append(UploadBatchItem(
+            batch=batch,
+            position=position,
+            filename=Path(uploaded.name).name,
+            staged_path=str(path),
+        ))
+
+    if archive:
+        items.extend(_stage_archive(batch, directory, archive, start=len(items)))
+
+    UploadBatchItem.objects.bulk_create(items)
+    return batch
+
+
+def _member_filename(info) -> str:
+    name = info.filename
+    if not info.flag_bits & 0x800:
+        # sem a flag de UTF-8 o zipfile decodifica como cp437; o macOS grava
+        # UTF-8 mesmo assim e o Windows usa a página de código OEM (cp850)
+        raw = name.encode("cp437")
+        try:
+            name = raw.decode("utf-8")
+        except UnicodeDecodeError:
+            name = raw.decode("cp850")
+    return name.replace("\\", "/").rsplit("/", 1)[-1]
+
+
+def _is_archive_junk(info) -> bool:
+    # pastas, __MACOSX/ e arquivos ocultos (.DS_Store) que os compactadores incluem
+    return info.is_dir() or info.filename.startswith("__MACOSX/") or _member_filename(info).startswith(".")
+
+
+def archive_members(zf):
+    """Membros do .zip que viram itens do lote (sem pastas e arquivos de sistema)."""
+    return [info for info in zf.infolist() if not _is_archive_junk(info)]
+
+
+def _stage_archive(batch, directory, archive, *, start):
+    """
+    Itens do lote para os laudos de um .zip. Cada membro é descompactado em
+    blocos direto para o staging, sem passar o ZIP inteiro pela memória.
+    Nome fora do padrão, arquivo grande demais, membro corrompido ou o que
+    passar de UPLOAD_ZIP_MAX_TOTAL_SIZE descompactado viram item com erro;
+    os outros seguem normalmente.
+    """
+    from .forms import parse_exam_filename
+
+    max_size = getattr(settings, "UPLOAD_ZIP_MAX_MEMBER_SIZE", 100 * 1024 * 1024)
+    remaining = getattr(settings, "UPLOAD_ZIP_MAX_TOTAL_SIZE", 2 * 1024 * 1024 * 1024)
+    items = []
+    archive.seek(0)
+    with zipfile.ZipFile(archive) as zf:
+        members = archive_members(zf)
+        for position, info in enumerate(members, start=start):
+            filename = _member_filename(info)
+            item = UploadBatchItem(batch=batch, position=position, filename=filename[:255])
+            items.append(item)
+
+            try:
+                parse_exam_filename(filename)
+            except forms.ValidationError as exc:
+                item.status = UploadBatchItem.STATUS_ERROR
+                item.error = exc.messages[0][:255]
+                continue
+
+            path = directory / f"{position:04d}.pdf"
+            try:
+                remaining -= _extract_member(zf, info, path, max_size, remaining)
+            except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError, RuntimeError, OSError, ValueError) as exc:
+                # RuntimeError: membro com senha; NotImplementedError: compressão não suportada
+                path.unlink(missing_ok=True)
+                item.status = UploadBatchItem.STATUS_ERROR
+                item.error = f"Não foi possível extrair do ZIP: {exc}"[:255]
+                continue
+            item.staged_path = str(path)
+
+    return items
+
+
+def _extract_member(zf, info, path, max_size, remaining):
+    """Descompacta o membro em `path`; devolve quantos bytes gravou."""
+    def check(size):
+        if size > max_size:
+            raise ValueError("arquivo maior que o permitido")
+        if size > remaining:
+            raise ValueError("o ZIP passa do tamanho total permitido")
+
+    check(info.file_size)
+    copied = 0
+    with zf.open(info) as source, open(path, "wb") as target:
+        while True:
+            block = source.read(COPY_BLOCK_SIZE)
+            if not block:
+                break
+            copied += len(block)
+            # o tamanho do cabeçalho pode não ser verdadeiro (ZIP malicioso)
+            check(copied)
+            target.write(block)
+    return copied
+
+
+def _provider_snapshot(provider):
+    if not provider:
+        return {}
+    return {
+        "token": provider.get("token") or "",
+        "kind": provider["kind"],
+        "id": provider["obj"].pk,
+        "label": provider["label"],
+        "email": (provider.get("email") or "").strip(),
+        "phone": (provider.get("phone") or "").strip(),
+        "user_id": provider["user"].pk if provider.get("user") else None,
+        "activation_link": provider.get("activation_link"),
+    }
+
+
+def start_batch(batch):
+    """Agenda o processamento do lote conforme UPLOAD_BATCH_WORKER."""
+    mode = getattr(settings, "UPLOAD_BATCH_WORKER", "thread")
+    if mode == "inline":
+        transaction.on_commit(lambda: process_batch(batch.pk))
+    elif mode == "thread":
+        transaction.on_commit(lambda: _start_thread(batch.pk))
+
+
+def _start_thread(batch_id):
+    def run():
+        try:
+            process_batch(batch_id)
+        except Exception:
+            logger.exception("Falha ao processar o lote %s", batch_id)
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, name=f"upload-batch-{batch_id}", daemon=True).start()
+
+
+class BatchClaimLost(Exception):
+    """O lote voltou para a fila e foi pego por outro processo."""
+
+
+def _claim(batch_id) -> bool:
+    now = timezone.now()
+    return UploadBatch.objects.filter(pk=batch_id, status=UploadBatch.STATUS_PENDING).update(
+        status=UploadBatch.STATUS_RUNNING, started_at=now, heartbeat_at=now,
+    ) == 1
+
+
+def _owned(batch):
+    # o started_at do claim identifica o processo dono do lote
+    return UploadBatch.objects.filter(
+        pk=batch.pk, status=UploadBatch.STATUS_RUNNING, started_at=batch.started_at,
+    )
+
+
+def _heartbeat(batch):
+    if not _owned(batch).update(heartbeat_at=timezone.now()):
+        raise BatchClaimLost()
+
+
+def requeue_stale_batches():
+    """
+    Lotes "processando" sem sinal de vida (heartbeat_at) há mais de
+    UPLOAD_BATCH_STALE_MINUTES voltam para a fila. Um lote grande ainda em
+    andamento atualiza o heartbeat a cada arquivo e não é retomado.
+    """
+    minutes = getattr(settings, "UPLOAD_BATCH_STALE_MINUTES", 30)
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    return UploadBatch.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=UploadBatch.STATUS_RUNNING,
+    ).update(status=UploadBatch.STATUS_PENDING)
+
+
+def process_batch(batch_id):
+    """Processa um lote na fila. Devolve o lote, ou None se outro já pegou."""
+    if not _claim(batch_id):
+        return None
+
+    batch = UploadBatch.objects.get(pk=batch_id)
+    try:
+        created = _process_items(batch)
+    except BatchClaimLost:
+        # o outro processo continua só com os itens que ainda estão na fila
+        logger.warning("Lote %s foi retomado por outro processo", batch_id)
+        return None
+    except Exception as exc:
+        logger.exception("Falha ao processar o lote %s", batch_id)
+        batch.status = UploadBatch.STATUS_FAILED
+        batch.error = str(exc)
+        batch.finished_at = timezone.now()
+        batch.save(update_fields=["status", "error", "finished_at"])
+        return batch
+
+    if created and batch.notify_provider and batch.provider:
+        _notify_provider(batch, created)
+
+    batch.status = UploadBatch.STATUS_DONE
+    batch.finished_at = timezone.now()
+    batch.save(update_fields=["status", "error", "finished_at"])
+    _cleanup_staging(batch)
+    return batch
+
+
+def _process_items(batch):
+    from .forms import parse_exam_filename
+    from .views import ensure_tutors_and_pets
+
+    items = list(batch.items.filter(status=UploadBatchItem.STATUS_PENDING))
+    parsed = {}
+    for item in items:
+        try:
+            parsed[item.pk] = parse_exam_filename(item.filename)
+        except forms.ValidationError as exc:
+            _fail(item, exc.messages[0])
+
+    # tutores e pets do lote inteiro de uma vez
+    ensure_tutors_and_pets([
+        (data["tutor_name"], data["pet_name"], data["breed"], "", "") for data in parsed.values()
+    ])
+
+    exam_types = translate_many({data["exam_type"] for data in parsed.values()})
+
+    pending = [item for item in items if item.pk in parsed]
+    stored = _store_files(pending, before_write=lambda: _heartbeat(batch))
+
+    provider = batch.provider or {}
+    exams = []
+    done_items = []
+    for item in pending:
+        result = stored.get(item.pk)
+        if isinstance(result, Exception):
+            _fail(item, f"Falha ao gravar o arquivo: {result}")
+            continue
+
+        data = parsed[item.pk]
+        exam = Exam(
+            date_realizacao=data["date_realizacao"],
+            clinic_or_vet=provider.get("label", ""),
+            exam_type=exam_types.get(data["exam_type"], data["exam_type"]),
+            pet_name=data["pet_name"],
+            breed=data["breed"],
+            tutor_name=data["tutor_name"],
+            pdf_file=result["name"],
+            pdf_sha256=result["sha256"],
+            pdf_original_name=item.filename,
+            pdf_bytes_saved=result["bytes_saved"],
+            owner_id=batch.user_id,
+            assigned_user_id=provider.get("user_id"),
+            tutor_phone="",
+            tutor_email="",
+            observations="",
+        )
+        exam.fill_derived_fields()
+        exams.append(exam)
+        done_items.append(item)
+
+    with transaction.atomic():
+        # se o lote foi retomado por outro processo no meio, nada é gravado aqui
+        if not _owned(batch).select_for_update().exists():
+            raise BatchClaimLost()
+
+        # bulk_create não chama save() nem os sinais (busca, arquivos, cache das listas)
+        Exam.objects.bulk_create(exams)
+        for exam, item in zip(exams, done_items):
+            retain_file(exam.pdf_file.name, exam.pdf_sha256, stored[item.pk]["size"])
+            search.index_exam(exam)
+            item.exam = exam
+            item.status = UploadBatchItem.STATUS_DONE
+
+        # mesmas linhas de ExamProvider que o Exam.save() gravaria
+        main_token = provider.get("token") or None
+        sync_exam_providers([(exam, main_token) for exam in exams])
+
+        UploadBatchItem.objects.bulk_update(done_items, ["exam", "status"])
+        bump_list_version()
+
+    return exams
+
+
+def _fail(item, message):
+    item.status = UploadBatchItem.STATUS_ERROR
+    item.error = str(message)[:255]
+    item.save(update_fields=["status", "error"])
+
+
+def _store_files(items, before_write=None):
+    """
+    Grava os arquivos do staging no storage dos exames, em paralelo.
+    {item.pk: {"name", "sha256", "size", "bytes_saved"} ou a exceção}.
+
+    `before_write` é chamado (nesta thread) antes de cada arquivo ir para o
+    storage; se levantar exceção (BatchClaimLost), nenhum arquivo novo é
+    gravado. Como só UPLOAD_BATCH_WRITE_WORKERS arquivos ficam em andamento
+    por vez, um lote retomado por outro processo para de gravar logo; os
+    poucos que já estavam a caminho têm o mesmo nome (pelo hash) que o novo
+    dono grava para os mesmos itens, então não sobram arquivos soltos.
+    """
+    field = Exam._meta.get_field("pdf_file")
+    guard = threading.Lock()
+    locks = {}
+
+    def lock_for(sha256):
+        # o mesmo conteúdo duas vezes no lote vai para o mesmo nome (storage.py)
+        with guard:
+            return locks.setdefault(sha256, threading.Lock())
+
+    def store(item):
+        with open(item.staged_path, "rb") as handle:
+            content = optimize_uploaded_pdf(File(handle, name=item.filename))
+            try:
+                sha256 = compute_sha256(content)
+                content.content_sha256 = sha256
+                with lock_for(sha256):
+                    name = field.storage.save(
+                        field.generate_filename(None, item.filename), content, max_length=field.max_length,
+                    )
+                return {
+                    "name": name,
+                    "sha256": sha256,
+                    "size": field.storage.size(name),
+                    "bytes_saved": getattr(content, "bytes_saved", 0),
+                }
+            finally:
+                content.close()
+
+    workers = max(int(getattr(settings, "UPLOAD_BATCH_WRITE_WORKERS", 4)), 1)
+    queue = iter(items)
+    running = {}
+    results = {}
+
+    def submit_next():
+        item = next(queue, None)
+        if item is None:
+            return
+        if before_write is not None:
+            before_write()
+        running[pool.submit(store, item)] = item.pk
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(workers):
+            submit_next()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                pk = running.pop(future)
+                try:
+                    results[pk] = future.result()
+                except Exception as exc:
+                    results[pk] = exc
+                submit_next()
+    return results
+
+
+def _notify_provider(batch, exams):
+    from .notifications import send_provider_bulk_exam_email, send_provider_exam_email
+    from .whatsapp_client import (
+        normalize_br_phone,
+        send_provider_bulk_exam_whatsapp,
+        send_provider_exam_whatsapp,
+    )
+
+    provider = batch.provider
+    # fora da requisição: os links saem do SITE_URL (invitations.absolute_url)
+    request = None
+
+    label = provider.get("label") or "Clínica/Veterinário"
+    email = provider.get("email")
+    phone = provider.get("phone")
+    activation_link = provider.get("activation_link")
+
+    # 1 exame: mesmo template do upload simples; mais de 1: templates de massa
+    if len(exams) == 1:
+        senders = [
+            (email, "e-mail", lambda: send_provider_exam_email(
+                request, exam=exams[0], to_email=email, recipient_label=label, activation_link=activation_link,
+            )),
+            (phone and normalize_br_phone(phone), "WhatsApp", lambda: send_provider_exam_whatsapp(
+                request, exam=exams[0], to_phone=phone, recipient_label=label, activation_link=activation_link,
+            )),
+        ]
+    else:
+        senders = [
+            (email, "e-mail", lambda: send_provider_bulk_exam_email(
+                request, recipient_label=label, to_email=email, exam_count=len(exams),
+                activation_link=activation_link,
+            )),
+            (phone and normalize_br_phone(phone), "WhatsApp", lambda: send_provider_bulk_exam_whatsapp(
+                request, recipient_label=label, to_phone=phone, exam_count=len(exams),
+                activation_link=activation_link,
+            )),
+        ]
+
+    sent_any = False
+    errors = []
+    for enabled, channel, send in senders:
+        if not enabled:
+            continue
+        try:
+            sent_any = send() or sent_any
+        except Exception as exc:
+            errors.append(f"Falha ao enviar {channel} para a clínica/vet: {exc}")
+
+    if sent_any:
+        Exam.objects.filter(pk__in=[exam.pk for exam in exams]).update(
+            alerta_provider=True, updated_at=timezone.now(),
+        )
+        bump_list_version()
+    batch.error = "\n".join(errors)
+
+
+def _cleanup_staging(batch):
+    shutil.rmtree(batch_dir(batch), ignore_errors=True)
+
+
+def batch_progress(batch) -> dict:
+    items = list(batch.items.all())
+    counts = {status: 0 for status, _ in UploadBatchItem.STATUS_CHOICES}
+    for item in items:
+        counts[item.status] += 1
+
+    return {
+        "id": str(batch.pk),
+        "status": batch.status,
+        "status_display": batch.get_status_display(),
+        "error": batch.error,
+        "total": len(items),
+        "done": counts[UploadBatchItem.STATUS_DONE],
+        "errors": counts[UploadBatchItem.STATUS_ERROR],
+        "pending": counts[UploadBatchItem.STATUS_PENDING],
+        "finished": batch.status in (UploadBatch.STATUS_DONE, UploadBatch.STATUS_FAILED),
+        "items": [
+            {
+                "filename": item.filename,
+                "status": item.status,
+                "status_display": item.get_status_display(),
+                "error": item.error,
+                "exam_id": item.exam_id,
+            }
+            for item in items
+        ],
+    }
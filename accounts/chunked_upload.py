@@ -0,0 +1,211 @@
+"""
+Upload em partes (retomável) para laudos grandes e vídeos extras.
+
+Protocolo (JSON, usado pelo exam_upload.html quando os arquivos passam de
+CHUNKED_UPLOAD_THRESHOLD):
+
+  POST   /exames/uploads/                  {filename, size} -> {id, offset, chunk_size}
+  PUT    /exames/uploads/<id>/?offset=N    corpo = bytes da parte -> {offset, size}
+  GET    /exames/uploads/<id>/             progresso, para retomar -> {offset, size, complete}
+  POST   /exames/uploads/<id>/concluir/    confere o tamanho e fecha o upload
+  DELETE /exames/uploads/<id>/             cancela
+
+Cada PUT é lido do corpo da requisição em blocos e gravado direto no
+arquivo parcial (CHUNKED_UPLOAD_DIR), sem passar pelo upload handler do
+Django; a memória usada não depende do tamanho do arquivo. Se a conexão cai
+no meio, o que chegou fica gravado e o cliente continua do `offset`.
+
+Depois de concluído, o formulário de exame manda os ids nos campos
+pdf_upload / extra_uploads e attach_chunked_uploads() coloca os arquivos
+montados em request.FILES, então ExamUploadForm valida como num upload
+normal. Uploads abandonados são apagados pelo cleanup_chunked_uploads.
+"""
+import os
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.utils import timezone
+
+from .file_delivery import guess_content_type
+from .models import ChunkedUpload
+
+COPY_BLOCK_SIZE = 64 * 1024
+
+ALLOWED_EXTENSIONS = {".pdf", ".avi", ".png", ".jpg", ".jpeg"}
+
+
+class ChunkedUploadError(Exception):
+    def __init__(self, message, status=400, upload=None):
+        super().__init__(message)
+        self.status = status
+        self.upload = upload
+
+
+def chunk_size() -> int:
+    return getattr(settings, "CHUNKED_UPLOAD_CHUNK_SIZE", 5 * 1024 * 1024)
+
+
+def upload_dir() -> Path:
+    directory = getattr(settings, "CHUNKED_UPLOAD_DIR", None)
+    return Path(directory) if directory else Path(settings.MEDIA_ROOT) / "chunked_uploads"
+
+
+def part_path(upload) -> Path:
+    return upload_dir() / f"{upload.pk}.part"
+
+
+def upload_status(upload) -> dict:
+    return {
+        "id": str(upload.pk),
+        "filename": upload.filename,
+        "size": upload.size,
+        "offset": upload.offset,
+        "complete": upload.is_complete,
+        "chunk_size": chunk_size(),
+    }
+
+
+def start_upload(user, filename, size) -> ChunkedUpload:
+    filename = os.path.basename((filename or "").strip())
+    if not filename:
+        raise ChunkedUploadError("Informe o nome do arquivo.")
+    if Path(filename).suffix.lower() not in ALLOWED_EXTENSIONS:
+        raise ChunkedUploadError("Formato inválido. Use apenas: PDF, AVI, PNG, JPG ou JPEG.")
+
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise ChunkedUploadError("Tamanho do arquivo inválido.")
+
+    max_size = getattr(settings, "CHUNKED_UPLOAD_MAX_SIZE", 1024 * 1024 * 1024)
+    if size <= 0 or size > max_size:
+        raise ChunkedUploadError("Tamanho do arquivo inválido.", status=413 if size > 0 else 400)
+
+    upload = ChunkedUpload.objects.create(user=user, filename=filename, size=size)
+    upload_dir().mkdir(parents=True, exist_ok=True)
+    part_path(upload).touch()
+    return upload
+
+
+def append_chunk(upload_id, user, offset, stream, length) -> ChunkedUpload:
+    """
+    Grava `length` bytes de `stream` a partir de `offset`. O offset precisa
+    ser o que o servidor tem (409 senão, com o offset certo na resposta).
+    Se o corpo chegar incompleto, grava o que veio.
+    """
+    with transaction.atomic():
+        upload = ChunkedUpload.objects.select_for_update().filter(pk=upload_id, user=user).first()
+        if upload is None:
+            raise ChunkedUploadError("Upload não encontrado.", status=404)
+        if upload.is_complete:
+            raise ChunkedUploadError("Upload já concluído.", status=409, upload=upload)
+        if offset != upload.offset:
+            raise ChunkedUploadError("Offset diferente do recebido até agora.", status=409, upload=upload)
+        if length <= 0 or length > chunk_size() or offset + length > upload.size:
+            raise ChunkedUploadError("Tamanho da parte inválido.", status=413, upload=upload)
+
+        written = 0
+        with open(part_path(upload), "r+b") as target:
+            # descarta sobra de uma tentativa anterior que não chegou a ser contada
+            target.truncate(offset)
+            target.seek(offset)
+            while written < length:
+                block = stream.read(min(COPY_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                target.write(block)
+                written += len(block)
+
+        upload.offset = offset + written
+        upload.save(update_fields=["offset", "updated_at"])
+
+    if written < length:
+        raise ChunkedUploadError("Parte incompleta; continue do offset informado.", status=400, upload=upload)
+    return upload
+
+
+def finish_upload(upload) -> ChunkedUpload:
+    if upload.offset != upload.size:
+        raise ChunkedUploadError("O arquivo ainda não chegou inteiro.", status=409, upload=upload)
+
+    path = part_path(upload)
+    if not path.exists() or path.stat().st_size != upload.size:
+        raise ChunkedUploadError("Arquivo parcial não encontrado.", status=410, upload=upload)
+
+    if not upload.is_complete:
+        upload.completed_at = timezone.now()
+        upload.save(update_fields=["completed_at", "updated_at"])
+    return upload
+
+
+def discard_upload(upload):
+    try:
+        part_path(upload).unlink()
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def _completed_upload_file(upload):
+    path = part_path(upload)
+    if not path.exists():
+        return None
+    return UploadedFile(
+        file=open(path, "rb"),
+        name=upload.filename,
+        content_type=guess_content_type(upload.filename),
+        size=upload.size,
+    )
+
+
+def _valid_ids(values):
+    ids = []
+    for value in values:
+        try:
+            ids.append(str(uuid.UUID(value)))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def attach_chunked_uploads(request, files, fields):
+    """
+    Coloca em `files` (cópia de request.FILES) os uploads concluídos cujos
+    ids vieram em request.POST. `fields` = {campo do POST: (campo de
+    arquivo do form, vários?)}. Devolve [(ChunkedUpload, arquivo aberto)]
+    para finish_attached_uploads() depois que o exame for salvo.
+    """
+    attached = []
+    for post_field, (file_field, multiple) in fields.items():
+        ids = _valid_ids(request.POST.getlist(post_field))
+        if not ids:
+            continue
+
+        uploads = {
+            str(upload.pk): upload
+            for upload in ChunkedUpload.objects.filter(
+                pk__in=ids, user=request.user, completed_at__isnull=False,
+            )
+        }
+        for upload_id in ids:
+            upload = uploads.get(upload_id)
+            uploaded = _completed_upload_file(upload) if upload else None
+            if uploaded is None:
+                continue
+            attached.append((upload, uploaded))
+            if multiple:
+                files.appendlist(file_field, uploaded)
+            else:
+                files[file_field] = uploaded
+    return attached
+
+
+def finish_attached_uploads(attached, discard=True):
+    """Fecha os arquivos e, se o exame foi salvo, apaga os parciais."""
+    for upload, uploaded in attached:
+        uploaded.close()
+        if discard:
+            discard_upload(upload)
@@ -0,0 +1,51 @@
+"""
+GET condicional (ETag / Last-Modified) das páginas HTML de exames e gestão.
+
+O ETag de uma página junta a identidade de quem vê (usuário, papel, dados do
+topo, cookie CSRF que vai dentro dos formulários), os parâmetros da URL e a
+"impressão digital" dos dados: maior updated_at + quantidade de registros,
+mais a versão das listas (list_cache.py), que cobre exclusões e alterações
+feitas em modelos relacionados. Se nada disso mudou, a resposta é 304.
+"""
+import hashlib
+import json
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .list_cache import get_list_version
+
+
+def fingerprint(queryset):
+    """
+    (maior updated_at, quantidade) do queryset numa única consulta.
+    """
+    data = queryset.order_by().aggregate(last=Max("updated_at"), total=Count("pk"))
+    return data["last"], data["total"]
+
+
+def make_etag(*parts) -> str:
+    raw = json.dumps([get_list_version(), *parts], sort_keys=True, default=str)
+    return '"%s"' % hashlib.sha256(raw.encode("utf-8")).hexdigest()[:40]
+
+
+def _timestamp(last_modified):
+    return int(last_modified.timestamp()) if last_modified else None
+
+
+def not_modified_response(request, etag, last_modified=None):
+    """
+    HttpResponseNotModified se o navegador já tem esta versão da página,
+    senão None (a view segue e renderiza normalmente).
+    """
+    return get_conditional_response(request, etag=etag, last_modified=_timestamp(last_modified))
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(_timestamp(last_modified))
+    # o navegador guarda a página, mas sempre revalida antes de reaproveitar
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
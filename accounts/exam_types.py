@@ -0,0 +1,79 @@
+"""
+Siglas de exame (ExamTypeAlias) em memória.
+
+A tabela é pequena e quase não muda, mas era consultada a cada exame
+enviado ("eco" -> "Ecocardiograma"). Cada processo guarda o dicionário
+{sigla: nome completo} junto com a versão que leu; quando a versão muda,
+recarrega na próxima tradução.
+
+A versão fica no cache compartilhado (CACHE_DIR, Redis...), incrementada
+ao salvar ou excluir uma sigla (ver signals.py). Com o cache em memória
+local (padrão) esse contador não chegaria aos outros workers do gunicorn,
+então a versão sai do banco: quantidade de siglas + maior updated_at, numa
+consulta pequena em vez de carregar a tabela toda.
+"""
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .list_cache import shared_cache_available
+from .models import ExamTypeAlias
+
+EXAM_TYPE_VERSION_KEY = "accounts:exam_type_alias_version"
+
+_lock = threading.Lock()
+_loaded_version = None
+_aliases = {}
+
+
+def _current_version():
+    if not shared_cache_available():
+        data = ExamTypeAlias.objects.aggregate(total=Count("pk"), last=Max("updated_at"))
+        return ("db", data["total"], data["last"])
+
+    version = cache.get(EXAM_TYPE_VERSION_KEY)
+    if version is None:
+        cache.add(EXAM_TYPE_VERSION_KEY, 1, timeout=None)
+        version = cache.get(EXAM_TYPE_VERSION_KEY, 1)
+    return version
+
+
+def _bump():
+    try:
+        cache.incr(EXAM_TYPE_VERSION_KEY)
+    except ValueError:
+        # chave ainda não existe (ou expirou)
+        cache.add(EXAM_TYPE_VERSION_KEY, 1, timeout=None)
+
+
+def bump_exam_type_version():
+    _bump()
+    # de novo depois do commit: um processo que recarregou no meio da
+    # transação leu as siglas antigas com a versão nova
+    transaction.on_commit(_bump)
+
+
+def get_exam_type_aliases() -> dict:
+    """{sigla em minúsculo: nome completo}, recarregado quando a versão muda."""
+    global _loaded_version, _aliases
+
+    version = _current_version()
+    if version == _loaded_version:
+        return _aliases
+
+    with _lock:
+        if version != _loaded_version:
+            _aliases = dict(ExamTypeAlias.objects.values_list("abbreviation", "full_name"))
+            _loaded_version = version
+        return _aliases
+
+
+def translate_many(values) -> dict:
+    """{valor como veio: nome completo, ou o próprio valor sem sigla cadastrada}."""
+    aliases = get_exam_type_aliases()
+    return {
+        value: aliases.get((value or "").strip().lower(), value)
+        for value in values
+    }
@@ -0,0 +1,255 @@
+"""
+Exportação da lista de exames (CSV e XLSX) em streaming.
+
+As linhas saem do banco com values_list + iterator(chunk_size), então a
+memória não cresce com o tamanho da exportação. Os nomes das
+clínicas/vets adicionais são resolvidos por bloco de linhas, com uma
+consulta por tipo (clínica, vet) em cada bloco. O XLSX é montado à mão
+(planilha única com inlineStr) dentro de um zip gravado em streaming,
+sem depender de biblioteca externa.
+
+O download em lote dos arquivos (stream_files_zip) usa o mesmo zip em
+streaming, com os arquivos gravados sem compressão (PDF já é comprimido):
+cada arquivo é lido em blocos e mandado para a resposta na hora.
+"""
+import csv
+import re
+import zipfile
+import zlib
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from .models import additional_provider_names, resolve_provider_tokens
+
+EXPORT_CHUNK_SIZE = 2000
+
+ZIP_FILE_CHUNK_SIZE = 64 * 1024
+
+EXPORT_COLUMNS = (
+    ("id", "ID"),
+    ("date_realizacao", "Data de realização"),
+    ("clinic_or_vet", "Clínica / Veterinário"),
+    ("additional_clinic_or_vet", "Clínicas / Vets adicionais"),
+    ("exam_type", "Exame"),
+    ("pet_name", "Pet"),
+    ("breed", "Raça"),
+    ("tutor_name", "Tutor"),
+    ("tutor_email", "E-mail do tutor"),
+    ("tutor_phone", "Celular do tutor"),
+    ("retorno_previsto", "Retorno"),
+    ("created_at", "Cadastro"),
+)
+
+
+ADDITIONAL_COLUMN = [field for field, _ in EXPORT_COLUMNS].index("additional_clinic_or_vet")
+
+
+def export_rows(queryset):
+    fields = [field for field, _ in EXPORT_COLUMNS]
+    chunk = []
+    for row in queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        chunk.append(row)
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield from _with_additional_names(chunk)
+            chunk = []
+    yield from _with_additional_names(chunk)
+
+
+def _with_additional_names(rows):
+    """Troca os tokens ("CLINIC:1", ...) pelos nomes, para o bloco todo de uma vez."""
+    providers = resolve_provider_tokens(
+        {token for row in rows for token in (row[ADDITIONAL_COLUMN] or [])}
+    )
+    for row in rows:
+        names = additional_provider_names(row[ADDITIONAL_COLUMN], providers)
+        yield (*row[:ADDITIONAL_COLUMN], ", ".join(names), *row[ADDITIONAL_COLUMN + 1:])
+
+
+def _format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime("%d/%m/%Y %H:%M")
+    if isinstance(value, date):
+        return value.strftime("%d/%m/%Y")
+    return str(value)
+
+
+class _Echo:
+    """Pseudo-arquivo: write() devolve o texto em vez de guardar."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset):
+    writer = csv.writer(_Echo(), delimiter=";")
+    # BOM para o Excel abrir os acentos corretamente
+    yield "﻿" + writer.writerow([label for _, label in EXPORT_COLUMNS])
+    for row in export_rows(queryset):
+        yield writer.writerow([_format_value(value) for value in row])
+
+
+class _ZipStream:
+    """
+    Destino do zipfile que só acumula o que foi escrito até o próximo
+    drain(); como não é "seekable", o zipfile usa data descriptors.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Exames" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _xlsx_row(values):
+    cells = "".join(
+        f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_format_value(value))}</t></is></c>'
+        for value in values
+    )
+    return f"<row>{cells}</row>"
+
+
+def stream_xlsx(queryset):
+    buffer = _ZipStream()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _XLSX_ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _XLSX_WORKBOOK)
+        archive.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS)
+        yield buffer.drain()
+
+        with archive.open("xl/worksheets/sheet1.xml", mode="w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(label for _, label in EXPORT_COLUMNS).encode("utf-8"))
+
+            for index, row in enumerate(export_rows(queryset), start=1):
+                sheet.write(_xlsx_row(row).encode("utf-8"))
+                if index % EXPORT_CHUNK_SIZE == 0:
+                    yield buffer.drain()
+
+            sheet.write(b"</sheetData></worksheet>")
+
+    yield buffer.drain()
+
+
+def zip_entry_name(*parts) -> str:
+    """Caminho dentro do zip sem barras, controles ou reservados do Windows."""
+    cleaned = [re.sub(r'[\x00-\x1f\\/:*?"<>|]+', "_", str(part)).strip(" .") or "_" for part in parts]
+    return "/".join(cleaned)
+
+
+def stream_files_zip(entries):
+    """
+    Zip (ZIP_STORED) em streaming a partir de (nome no zip, FieldFile).
+    Arquivos que sumiram do storage ficam de fora; nomes repetidos ganham
+    um sufixo " (2)", " (3)"...
+    """
+    buffer = _ZipStream()
+    used_names = set()
+    now = timezone.localtime().timetuple()[:6]
+
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for arcname, field_file in entries:
+            try:
+                handle = field_file.storage.open(field_file.name, "rb")
+            except (FileNotFoundError, OSError):
+                continue
+
+            arcname = _unique_name(arcname, used_names)
+            info = zipfile.ZipInfo(arcname, date_time=now)
+            info.compress_type = zipfile.ZIP_STORED
+            try:
+                with archive.open(info, mode="w", force_zip64=True) as target:
+                    for chunk in iter(lambda: handle.read(ZIP_FILE_CHUNK_SIZE), b""):
+                        target.write(chunk)
+                        yield buffer.drain()
+            finally:
+                handle.close()
+            yield buffer.drain()
+
+    yield buffer.drain()
+
+
+def _unique_name(name, used_names):
+    base, dot, extension = name.rpartition(".")
+    if not dot or "/" in extension:
+        base, dot, extension = name, "", ""
+    candidate, counter = name, 1
+    while candidate in used_names:
+        counter += 1
+        candidate = f"{base} ({counter}){dot}{extension}"
+    used_names.add(candidate)
+    return candidate
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: cabeçalho gzip
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,140 @@
+"""
+Filtros por faceta da lista de exames (além da busca ?q=):
+
+  ?de=AAAA-MM-DD&ate=AAAA-MM-DD   período da data de realização
+  ?tipo=...                        tipo de exame (pode repetir)
+  ?clinica=...                     clínica / veterinário (pode repetir)
+  ?retorno=pendente                retorno previsto para hoje ou depois
+
+As contagens ao lado de cada valor saem de uma única consulta agrupada por
+(exame, clínica) com agregação condicional para o retorno pendente. Cada
+faceta é contada com os filtros das outras facetas aplicados, mas não o seu
+próprio, para mostrar as alternativas de cada filtro.
+"""
+from urllib.parse import urlencode
+
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+# valores mostrados por faceta (os selecionados sempre aparecem)
+FACET_LIMIT = 30
+
+
+def retorno_pending_q():
+    return Q(retorno_previsto__isnull=False, retorno_previsto__gte=timezone.localdate())
+
+
+class ExamFacets:
+    def __init__(self, params):
+        self.date_from = _parse_date(params.get("de"))
+        self.date_to = _parse_date(params.get("ate"))
+        self.exam_types = [v for v in params.getlist("tipo") if v.strip()]
+        self.providers = [v for v in params.getlist("clinica") if v.strip()]
+        self.retorno_pending = params.get("retorno") == "pendente"
+        self._base = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.date_from or self.date_to or self.exam_types or self.providers or self.retorno_pending)
+
+    def cache_key_parts(self):
+        return (
+            str(self.date_from or ""),
+            str(self.date_to or ""),
+            sorted(self.exam_types),
+            sorted(self.providers),
+            self.retorno_pending,
+        )
+
+    def querystring(self) -> str:
+        """Parâmetros das facetas para repetir nos links (ordenação, páginas)."""
+        params = []
+        if self.date_from:
+            params.append(("de", self.date_from.isoformat()))
+        if self.date_to:
+            params.append(("ate", self.date_to.isoformat()))
+        params += [("tipo", value) for value in self.exam_types]
+        params += [("clinica", value) for value in self.providers]
+        if self.retorno_pending:
+            params.append(("retorno", "pendente"))
+        return urlencode(params)
+
+    def _apply_range(self, queryset):
+        if self.date_from:
+            queryset = queryset.filter(date_realizacao__gte=self.date_from)
+        if self.date_to:
+            queryset = queryset.filter(date_realizacao__lte=self.date_to)
+        return queryset
+
+    def apply(self, queryset):
+        """
+        Aplica todas as facetas. O queryset recebido (já com escopo e busca)
+        fica guardado como base das contagens.
+        """
+        queryset = self._apply_range(queryset)
+        self._base = queryset
+
+        if self.exam_types:
+            queryset = queryset.filter(exam_type__in=self.exam_types)
+        if self.providers:
+            queryset = queryset.filter(clinic_or_vet__in=self.providers)
+        if self.retorno_pending:
+            queryset = queryset.filter(retorno_pending_q())
+        return queryset
+
+    def counts(self):
+        """
+        {'exam_types': [(valor, n, selecionado), ...], 'providers': [...],
+         'retorno_pending': n} a partir de uma consulta só.
+        """
+        if self._base is None:
+            raise RuntimeError("ExamFacets.apply() precisa ser chamado antes de counts()")
+
+        rows = (
+            self._base.order_by()
+            .values("exam_type", "clinic_or_vet")
+            .annotate(total=Count("pk"), pending=Count("pk", filter=retorno_pending_q()))
+        )
+
+        exam_types = {}
+        providers = {}
+        pending_total = 0
+
+        for row in rows:
+            exam_type, provider = row["exam_type"], row["clinic_or_vet"]
+            matches_type = not self.exam_types or exam_type in self.exam_types
+            matches_provider = not self.providers or provider in self.providers
+            scoped = row["pending"] if self.retorno_pending else row["total"]
+
+            if matches_provider:
+                exam_types[exam_type] = exam_types.get(exam_type, 0) + scoped
+            if matches_type:
+                providers[provider] = providers.get(provider, 0) + scoped
+            if matches_type and matches_provider:
+                pending_total += row["pending"]
+
+        return {
+            "exam_types": _facet_values(exam_types, self.exam_types),
+            "providers": _facet_values(providers, self.providers),
+            "retorno_pending": pending_total,
+        }
+
+
+def _parse_date(value):
+    try:
+        return parse_date((value or "").strip())
+    except ValueError:
+        # formato certo, data inválida (ex.: 2024-02-31)
+        return None
+
+
+def _facet_values(counts, selected):
+    values = sorted(
+        ((value, total) for value, total in counts.items() if value and total),
+        key=lambda item: (-item[1], item[0].lower()),
+    )[:FACET_LIMIT]
+
+    shown = {value for value, _ in values}
+    values += [(value, counts.get(value, 0)) for value in selected if value not in shown]
+    return [(value, total, value in selected) for value, total in values]
@@ -0,0 +1,265 @@
+"""
+Entrega dos arquivos dos exames (PDF principal e extras).
+
+A view só confere a permissão; quem manda os bytes depende de
+FILE_OFFLOAD_MODE:
+
+  - "" (padrão): o próprio Django, com FileResponse
+  - "x-accel": nginx. A resposta leva X-Accel-Redirect apontando para
+    FILE_OFFLOAD_PREFIX + caminho do arquivo no MEDIA_ROOT; o nginx precisa
+    de uma location "internal" com esse prefixo (alias para o MEDIA_ROOT).
+  - "x-sendfile": Apache (mod_xsendfile) / lighttpd, com o caminho absoluto
+    do arquivo em X-Sendfile.
+
+Assim o worker do gunicorn fica livre enquanto o arquivo é transferido.
+
+Quando o Django entrega, pedidos com Range (um intervalo só) recebem 206
+Partial Content, para o visualizador de PDF e o player de vídeo buscarem
+só o trecho que precisam; If-Range que não bate com a versão atual faz
+voltar o arquivo inteiro. Pedidos com vários intervalos recebem o arquivo
+inteiro (200), o que a RFC 9110 permite. No offload quem trata Range é o
+nginx/Apache.
+
+Com o SHA-256 gravado no upload, o ETag é forte e o navegador revalida com
+If-None-Match (304). Arquivos antigos, ainda sem hash, recebem um ETag
+fraco de tamanho + data de modificação: o hash não é calculado durante o
+pedido (um vídeo de centenas de MB travaria o worker), e sim pelo comando
+compute_exam_file_hashes. Os links assinados (abaixo) apontam para um
+conteúdo fixo e ficam no cache do navegador até a validade do token.
+
+Links assinados (make_download_token / signed_download): o token (HMAC do
+SECRET_KEY via django.core.signing) carrega o arquivo, o hash e a validade,
+então a view de download não precisa de sessão, login nem consulta ao banco.
+Servem também para e-mail e WhatsApp. A validade é arredondada para cima em
+janelas, assim o mesmo arquivo gera o mesmo link por um tempo e o cache do
+navegador continua valendo.
+"""
+import math
+import mimetypes
+import os
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+OFFLOAD_X_ACCEL = "x-accel"
+OFFLOAD_X_SENDFILE = "x-sendfile"
+
+RANGE_CHUNK_SIZE = 64 * 1024
+
+DOWNLOAD_TOKEN_SALT = "accounts.file_delivery.download"
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def get_offload_mode() -> str:
+    return (getattr(settings, "FILE_OFFLOAD_MODE", "") or "").strip().lower()
+
+
+def guess_content_type(name: str, default="application/octet-stream") -> str:
+    content_type, _ = mimetypes.guess_type(name)
+    return content_type or default
+
+
+def _content_disposition(filename: str, disposition="inline") -> str:
+    # filename* (RFC 5987) para nomes com acento
+    ascii_name = filename.encode("ascii", "ignore").decode() or "arquivo"
+    return f'{disposition}; filename="{ascii_name}"; filename*=UTF-8\'\'{quote(filename)}'
+
+
+def _local_path(field_file):
+    try:
+        return field_file.path
+    except NotImplementedError:
+        # storage sem caminho local (S3, memória...)
+        return None
+
+
+def parse_range_header(header, size):
+    """
+    "bytes=0-99" -> (0, 99) (inclusivo). None quando o Range deve ser
+    ignorado (ausente, malformado, mais de um intervalo); RangeNotSatisfiable
+    quando o intervalo está fora do arquivo.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+
+    spec = header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+
+    start_text, end_text = (part.strip() for part in spec.split("-", 1))
+    try:
+        if start_text == "":
+            # sufixo: os últimos N bytes
+            length = int(end_text)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - length, 0), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # só ETag forte vale para If-Range
+        return bool(etag) and if_range == etag
+    modified_since = parse_http_date_safe(if_range)
+    return modified_since is not None and last_modified is not None and int(last_modified) == modified_since
+
+
+def _last_modified(field_file):
+    try:
+        return field_file.storage.get_modified_time(field_file.name).timestamp()
+    except (NotImplementedError, OSError):
+        return None
+
+
+def _weak_etag(field_file):
+    """ETag fraco (tamanho + data) para arquivos ainda sem hash gravado."""
+    last_modified = _last_modified(field_file)
+    try:
+        size = field_file.size
+    except OSError:
+        return None
+    if last_modified is None:
+        return None
+    return f'W/"{size:x}-{int(last_modified):x}"'
+
+
+def _iter_file_range(field_file, start, length):
+    handle = field_file.open("rb")
+    try:
+        handle.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = handle.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        handle.close()
+
+
+def _django_response(request, field_file, content_type, etag):
+    size = field_file.size
+    last_modified = _last_modified(field_file)
+
+    byte_range = None
+    if request.method == "GET" and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range_header(request.headers.get("Range"), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    if byte_range is None:
+        response = FileResponse(field_file.open("rb"), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _iter_file_range(field_file, start, length),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(length)
+
+    response["Accept-Ranges"] = "bytes"
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def _set_cache_headers(response, etag, max_age=None):
+    if not etag:
+        return response
+
+    response["ETag"] = etag
+    if max_age:
+        patch_cache_control(response, private=True, max_age=max_age, immutable=True)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def serve_file(request, field_file, *, sha256="", content_type=None, filename=None,
+               disposition="inline", max_age=None):
+    """
+    Resposta para um FieldFile já autorizado pela view.
+    Sem offload configurado (ou sem caminho local para entregar) o próprio
+    Django entrega, com suporte a Range.
+    `sha256` (hash gravado no upload) vira o ETag forte e permite o 304;
+    sem ele, o ETag é fraco (tamanho + data). `max_age` força o tempo de
+    cache (links assinados, que apontam para um conteúdo fixo).
+    """
+    filename = filename or os.path.basename(field_file.name)
+    content_type = content_type or guess_content_type(field_file.name)
+    etag = f'"{sha256}"' if sha256 else _weak_etag(field_file)
+
+    if etag:
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return _set_cache_headers(not_modified, etag, max_age)
+
+    mode = get_offload_mode()
+    path = _local_path(field_file) if mode else None
+
+    if mode == OFFLOAD_X_ACCEL and path:
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, "FILE_OFFLOAD_PREFIX", "/protected-media/").rstrip("/")
+        response["X-Accel-Redirect"] = f"{prefix}/{quote(field_file.name.lstrip('/'))}"
+    elif mode == OFFLOAD_X_SENDFILE and path:
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = path
+    else:
+        response = _django_response(request, field_file, content_type, etag=etag)
+
+    response["Content-Disposition"] = _content_disposition(filename, disposition)
+    return _set_cache_headers(response, etag, max_age)
+
+
+def make_download_token(kind, field_file, *, sha256="", filename="", max_age=None) -> str:
+    """
+    Token assinado para baixar `field_file` sem login até a validade.
+    `kind` ("exam" / "extra") diz de qual campo vem o storage.
+    """
+    if max_age is None:
+        max_age = getattr(settings, "SIGNED_DOWNLOAD_MAX_AGE", 3600)
+    window = max(int(getattr(settings, "SIGNED_DOWNLOAD_WINDOW", 900)), 1)
+    expires = math.ceil((time.time() + max_age) / window) * window
+
+    payload = {"k": kind, "n": field_file.name, "h": sha256, "f": filename, "e": expires}
+    return signing.dumps(payload, salt=DOWNLOAD_TOKEN_SALT, compress=True)
+
+
+def read_download_token(token):
+    """Payload do token, ou None se a assinatura não confere ou se expirou."""
+    try:
+        payload = signing.loads(token, salt=DOWNLOAD_TOKEN_SALT)
+    except signing.BadSignature:
+        return None
+
+    if not isinstance(payload, dict) or payload.get("e", 0) < time.time():
+        return None
+    return payload
@@ -1,6 +1,8 @@
 import os
 import re
 import unicodedata
+import zipfile
+from django.conf import settings
 from django.contrib.auth.models import User
 from .models import Profile
 from datetime import date, datetime, time as dt_time, timedelta
@@ -12,6 +14,7 @@ from django.core.validators import RegexValidator
 from django import forms
 
 from .models import Tutor, Clinic, Veterinarian, Pet, Profile, ExamTypeAlias
+from .batch_upload import archive_members
 
 PHONE_ANY_RE = re.compile(r'^\(\d{2}\)\s?(\d{4}-\d{4}|9\d{4}-\d{4})$')  # aceita fixo ou celular 9xxxx
 PHONE_WA_RE  = re.compile(r'^\(\d{2}\)\s?9\d{4}-\d{4}$')               # só whatsapp (celular)
@@ -673,8 +676,11 @@ class ClinicForm(forms.ModelForm):
                 clinic.save()
 
             # mantém consistência da coluna exibida na tabela de exames
+            # (save() por exame para atualizar também a busca e o updated_at)
             from .models import Exam
-            Exam.objects.filter(assigned_user=existing_user).update(clinic_or_vet=clinic.name)
+            for exam in Exam.objects.filter(assigned_user=existing_user).exclude(clinic_or_vet=clinic.name):
+                exam.clinic_or_vet = clinic.name
+                exam.save(update_fields=["clinic_or_vet"])
 
             return clinic
 
@@ -798,8 +804,11 @@ class VeterinarianForm(forms.ModelForm):
                 vet.save()
 
             # Atualiza a coluna exibida na tabela de exames
+            # (save() por exame para atualizar também a busca e o updated_at)
             from .models import Exam
-            Exam.objects.filter(assigned_user=existing_user).update(clinic_or_vet=vet.name)
+            for exam in Exam.objects.filter(assigned_user=existing_user).exclude(clinic_or_vet=vet.name):
+                exam.clinic_or_vet = vet.name
+                exam.save(update_fields=["clinic_or_vet"])
 
             return vet
 
@@ -978,10 +987,7 @@ class MultiExamUploadForm(forms.Form):
     )
 
     pdf_files = MultipleFileField(
-        required=True,
-        error_messages={
-            "required": "Selecione um arquivo.",
-        },
+        required=False,
         widget=MultipleFileInput(attrs={
             "multiple": True,
             "accept": "application/pdf",
@@ -990,6 +996,15 @@ class MultiExamUploadForm(forms.Form):
         label="Arquivos PDF",
     )
 
+    # alternativa aos PDFs soltos: um .zip com os laudos (ver batch_upload.stage_batch)
+    zip_file = forms.FileField(
+        required=False,
+        widget=forms.FileInput(attrs={
+            "accept": ".zip,application/zip",
+            "class": "file-input-hidden",
+        }),
+        label="Arquivo ZIP",
+    )
 
     MAX_FILES = 50
 
@@ -1028,6 +1043,46 @@ class MultiExamUploadForm(forms.Form):
             parse_exam_filename(f.name)
 
         return files
+
+    def clean_zip_file(self):
+        archive = self.cleaned_data.get("zip_file")
+        if not archive:
+            return archive
+
+        if not archive.name.lower().endswith(".zip"):
+            raise forms.ValidationError("O arquivo precisa ser um ZIP.")
+
+        # só lê o diretório central; os nomes de cada laudo são conferidos
+        # no processamento do lote, um por um
+        try:
+            with zipfile.ZipFile(archive) as zf:
+                members = archive_members(zf)
+        except zipfile.BadZipFile:
+            raise forms.ValidationError("Arquivo ZIP inválido ou corrompido.")
+        finally:
+            archive.seek(0)
+
+        if not members:
+            raise forms.ValidationError("O arquivo ZIP está vazio.")
+
+        max_members = getattr(settings, "UPLOAD_ZIP_MAX_MEMBERS", 1000)
+        if len(members) > max_members:
+            raise forms.ValidationError(f"O ZIP pode ter no máximo {max_members} arquivos.")
+
+        # tamanho declarado no ZIP; a extração confere de novo o que foi gravado
+        max_total = getattr(settings, "UPLOAD_ZIP_MAX_TOTAL_SIZE", 2 * 1024 * 1024 * 1024)
+        if sum(info.file_size for info in members) > max_total:
+            raise forms.ValidationError(
+                f"O conteúdo do ZIP passa de {max_total // (1024 * 1024)} MB descompactado."
+            )
+        return archive
+
+    def clean(self):
+        cleaned_data = super().clean()
+        has_file_errors = "pdf_files" in self.errors or "zip_file" in self.errors
+        if not has_file_errors and not cleaned_data.get("pdf_files") and not cleaned_data.get("zip_file"):
+            self.add_error("pdf_files", "Selecione um arquivo.")
+        return cleaned_data
         
 class ExamTypeAliasForm(forms.ModelForm):
     class Meta:
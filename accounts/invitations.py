@@ -4,9 +4,19 @@ from django.urls import reverse
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 
+def absolute_url(request, path):
+    """
+    URL absoluta de `path`. Com requisição, usa o host dela; fora de uma
+    (comandos, upload em massa em segundo plano), usa o SITE_URL.
+    """
+    if request is not None:
+        return request.build_absolute_uri(path)
+    return settings.SITE_URL.rstrip("/") + path
+
+
 def build_activate_link(user):
     uidb64 = urlsafe_base64_encode(force_bytes(user.pk))
     token = default_token_generator.make_token(user)
     path = reverse("activate_account", args=[uidb64, token])
-    return settings.SITE_URL.rstrip("/") + path
+    return absolute_url(None, path)
 
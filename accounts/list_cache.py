@@ -0,0 +1,123 @@
+"""
+Cache das listas (exames e gestão).
+
+Um contador de versão no cache compartilhado é incrementado sempre que um
+Exam/Tutor/Clinic/Veterinarian/Pet é salvo ou excluído (ver signals.py).
+Toda chave guardada aqui inclui essa versão, então nada precisa ser apagado:
+depois de uma alteração as chaves antigas simplesmente deixam de ser lidas.
+
+Guarda as contagens das listas, as sugestões da busca e o HTML renderizado
+da lista de exames. A versão só é vista por todos os workers do gunicorn com
+um cache compartilhado (arquivo com CACHE_DIR, Redis, banco); com o cache em
+memória local (padrão) uma alteração feita num worker não invalidaria o que
+os outros guardaram, então tudo isso fica desligado (ver list_cache_enabled).
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+
+LIST_VERSION_KEY = "accounts:list_version"
+
+# backends em que cada processo tem o seu próprio cache
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+def shared_cache_available() -> bool:
+    """True quando o cache default é visto por todos os processos."""
+    return not isinstance(caches["default"], PROCESS_LOCAL_CACHES)
+
+
+def list_cache_enabled() -> bool:
+    """
+    True quando a versão das listas é compartilhada entre os processos.
+    LIST_CACHE_ENABLED (True/False) força; None decide pelo backend.
+    """
+    forced = getattr(settings, "LIST_CACHE_ENABLED", None)
+    if forced is not None:
+        return bool(forced)
+    return shared_cache_available()
+
+
+def get_list_version() -> int:
+    version = cache.get(LIST_VERSION_KEY)
+    if version is None:
+        cache.add(LIST_VERSION_KEY, 1, timeout=None)
+        version = cache.get(LIST_VERSION_KEY, 1)
+    return version
+
+
+def bump_list_version():
+    try:
+        cache.incr(LIST_VERSION_KEY)
+    except ValueError:
+        # chave ainda não existe (ou expirou)
+        cache.add(LIST_VERSION_KEY, 1, timeout=None)
+
+
+def make_list_key(prefix: str, *parts) -> str:
+    raw = json.dumps([get_list_version(), *parts], sort_keys=True, default=str)
+    digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+    return f"accounts:{prefix}:{digest}"
+
+
+def cached_count(key_parts, compute) -> int:
+    """
+    COUNT(*) de uma lista guardado no cache por (escopo, busca, filtros).
+    """
+    if not list_cache_enabled():
+        return compute()
+
+    key = make_list_key("count", *key_parts)
+    count = cache.get(key)
+    if count is None:
+        count = compute()
+        cache.set(key, count, getattr(settings, "LIST_COUNT_CACHE_TIMEOUT", 300))
+    return count
+
+
+def estimated_table_count(model, using="default"):
+    """
+    Estimativa do planner do Postgres (pg_class.reltuples) para a tabela
+    inteira. Retorna None fora do Postgres, com a estimativa desligada ou
+    quando a tabela é pequena demais para valer a pena estimar.
+    """
+    if (getattr(settings, "LIST_COUNT_MODE", "exact") or "exact").lower() != "estimate":
+        return None
+
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+
+    estimate = row[0] if row else None
+    # -1 = tabela nunca analisada; tabelas pequenas são contadas de verdade
+    if estimate is None or estimate < getattr(settings, "LIST_COUNT_ESTIMATE_MIN_ROWS", 10000):
+        return None
+    return int(estimate)
+
+
+def get_cached_page(key_parts):
+    """
+    HTML renderizado de uma página de lista, ou None.
+    Com LIST_PAGE_CACHE_TIMEOUT = 0 o cache de páginas fica desligado.
+    """
+    if not getattr(settings, "LIST_PAGE_CACHE_TIMEOUT", 60) or not list_cache_enabled():
+        return None
+    return cache.get(make_list_key("page", *key_parts))
+
+
+def set_cached_page(key_parts, content: bytes):
+    timeout = getattr(settings, "LIST_PAGE_CACHE_TIMEOUT", 60)
+    if timeout and list_cache_enabled():
+        cache.set(make_list_key("page", *key_parts), content, timeout)
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.chunked_upload import discard_upload
+from accounts.models import ChunkedUpload
+
+
+class Command(BaseCommand):
+    help = "Apaga os uploads em partes abandonados (sem atividade há CHUNKED_UPLOAD_EXPIRY_HOURS)."
+
+    def handle(self, *args, **options):
+        hours = getattr(settings, "CHUNKED_UPLOAD_EXPIRY_HOURS", 24)
+        limit = timezone.now() - timedelta(hours=hours)
+
+        removed = 0
+        for upload in ChunkedUpload.objects.filter(updated_at__lt=limit).iterator(chunk_size=200):
+            discard_upload(upload)
+            removed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Uploads em partes apagados: {removed}."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Exam, ExamExtraPDF
+
+
+class Command(BaseCommand):
+    help = "Calcula o SHA-256 dos PDFs/extras enviados antes de o hash ser gravado no upload."
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.filter(pdf_sha256="").exclude(pdf_file="").exclude(pdf_file__isnull=True)
+        extras = ExamExtraPDF.objects.filter(sha256="").exclude(file="")
+
+        done = missing = 0
+        for exam in exams.iterator(chunk_size=200):
+            if exam.get_pdf_sha256():
+                done += 1
+            else:
+                missing += 1
+
+        for extra in extras.iterator(chunk_size=200):
+            if extra.get_sha256():
+                done += 1
+            else:
+                missing += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Arquivos com hash calculado: {done}. Arquivos não encontrados: {missing}.")
+        )
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import Exam, ExamExtraPDF, compute_sha256
+from accounts.storage import ContentAddressedStorage, content_address, is_content_addressed, retain_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Move os PDFs/extras gravados com o nome antigo (exam_pdfs/...) para o "
+        "armazenamento por hash (exam_files/...), juntando arquivos repetidos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-old",
+            action="store_true",
+            help="Não apaga os arquivos antigos depois de copiar.",
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(Exam._meta.get_field("pdf_file").storage, ContentAddressedStorage):
+            raise CommandError('STORAGES["exam_files"] não está usando accounts.storage.ContentAddressedStorage.')
+
+        moved = missing = 0
+        old_names = set()
+
+        targets = [
+            (Exam, "pdf_file", "pdf_sha256", "pdf_original_name"),
+            (ExamExtraPDF, "file", "sha256", "original_name"),
+        ]
+
+        for model, file_attr, hash_attr, name_attr in targets:
+            rows = model.objects.exclude(**{file_attr: ""}).exclude(**{f"{file_attr}__isnull": True})
+
+            for obj in rows.iterator(chunk_size=200):
+                field_file = getattr(obj, file_attr)
+                if is_content_addressed(field_file.name):
+                    continue
+
+                try:
+                    sha256 = compute_sha256(field_file)
+                    storage = field_file.storage
+                    target = content_address(sha256, field_file.name)
+                    if not storage.exists(target):
+                        field_file.open("rb")
+                        field_file.file.content_sha256 = sha256
+                        storage.save(field_file.name, field_file.file)
+                    size = storage.size(target)
+                except (FileNotFoundError, OSError):
+                    missing += 1
+                    continue
+                finally:
+                    field_file.close()
+
+                old_names.add((storage, field_file.name))
+                with transaction.atomic():
+                    model.objects.filter(pk=obj.pk).update(**{
+                        file_attr: target,
+                        hash_attr: sha256,
+                        name_attr: getattr(obj, name_attr) or field_file.name.rsplit("/", 1)[-1],
+                    })
+                    retain_file(target, sha256, size)
+                moved += 1
+
+        if not options["keep_old"]:
+            for storage, name in old_names:
+                storage.delete(name)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Arquivos movidos: {moved}. Arquivos não encontrados: {missing}.")
+        )
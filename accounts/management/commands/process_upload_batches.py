@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from accounts.batch_upload import process_batch, requeue_stale_batches
+from accounts.models import UploadBatch
+
+
+class Command(BaseCommand):
+    help = (
+        "Processa os lotes do upload em massa que estão na fila "
+        "(UPLOAD_BATCH_WORKER=command, ou lotes parados por reinício do servidor)."
+    )
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_batches()
+
+        processed = 0
+        pending = UploadBatch.objects.filter(status=UploadBatch.STATUS_PENDING).order_by("created_at")
+        for batch_id in pending.values_list("pk", flat=True):
+            if process_batch(batch_id) is not None:
+                processed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Lotes processados: {processed}. Lotes retomados: {requeued}.")
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from accounts.search import get_search_backend, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Recalcula o texto de busca de todos os exames e recria o índice de busca."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        total = rebuild_search_index(using=using)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exames indexados: {total}. Backend de busca: {get_search_backend(using)}."
+            )
+        )
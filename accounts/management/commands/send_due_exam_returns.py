@@ -1,11 +1,10 @@
 from datetime import datetime, time as dt_time
 
-from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.test import RequestFactory
+from django.db.models import Prefetch
 from django.utils import timezone
 
-from accounts.models import Exam, Clinic, Veterinarian
+from accounts.models import Exam, Clinic, Veterinarian, ExamProvider
 from accounts.notifications import send_provider_return_email
 from accounts.whatsapp_client import send_provider_return_whatsapp
 from accounts.views import (
@@ -47,55 +46,33 @@ class Command(BaseCommand):
 
         return None
 
-    def _provider_from_token(self, token):
-        token = (token or "").strip()
-        if not token:
-            return None
-
-        try:
-            kind, raw_id = token.split(":", 1)
-            obj_id = int(raw_id)
-        except Exception:
-            return None
-
-        if kind == "CLINIC":
-            clinic = Clinic.objects.filter(id=obj_id).first()
-            if clinic:
-                return {
-                    "key": f"CLINIC:{clinic.id}",
-                    "obj": clinic,
-                    "label": clinic.name,
-                    "email": (clinic.email or "").strip(),
-                    "phone": (clinic.phone or "").strip(),
-                    "user": clinic.user,
-                }
-
-        if kind == "VET":
-            vet = Veterinarian.objects.filter(id=obj_id).first()
-            if vet:
-                return {
-                    "key": f"VET:{vet.id}",
-                    "obj": vet,
-                    "label": vet.name,
-                    "email": (vet.email or "").strip(),
-                    "phone": (vet.phone or "").strip(),
-                    "user": vet.user,
-                }
-
-        return None
+    def _provider_from_link(self, link):
+        obj = link.provider
+        return {
+            "key": link.token,
+            "obj": obj,
+            "label": obj.name,
+            "email": (obj.email or "").strip(),
+            "phone": (obj.phone or "").strip(),
+            "user": obj.user,
+        }
 
     def _collect_provider_targets(self, exam):
         seen = set()
         providers = []
 
-        main_provider = self._main_provider_from_exam(exam)
-        if main_provider and main_provider["key"] not in seen:
-            seen.add(main_provider["key"])
-            providers.append(main_provider)
+        # exam.provider_links já vem pré-carregado (principal primeiro, depois adicionais)
+        links = list(exam.provider_links.all())
+
+        if not any(link.role == ExamProvider.ROLE_MAIN for link in links):
+            main_provider = self._main_provider_from_exam(exam)
+            if main_provider:
+                seen.add(main_provider["key"])
+                providers.append(main_provider)
 
-        for token in (exam.additional_clinic_or_vet or []):
-            provider = self._provider_from_token(token)
-            if provider and provider["key"] not in seen:
+        for link in links:
+            provider = self._provider_from_link(link)
+            if provider["key"] not in seen:
                 seen.add(provider["key"])
                 providers.append(provider)
 
@@ -103,20 +80,24 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         now = timezone.localtime()
-        host = (getattr(settings, "CANONICAL_HOST", "") or "localhost").strip()
-
-        request = RequestFactory().get("/", secure=True, HTTP_HOST=host)
+        # sem requisição: os links saem do SITE_URL (invitations.absolute_url)
+        request = None
 
         qs = Exam.objects.filter(
             retorno_previsto__isnull=False,
             retorno_previsto__lte=now.date(),
-        ).order_by("retorno_previsto", "retorno_horario", "id")
+        ).order_by("retorno_previsto", "retorno_horario", "id").prefetch_related(
+            Prefetch(
+                "provider_links",
+                queryset=ExamProvider.objects.select_related("clinic__user", "veterinarian__user"),
+            )
+        )
 
         checked = 0
         processed = 0
         sent_count = 0
 
-        for exam in qs.iterator():
+        for exam in qs.iterator(chunk_size=200):
             checked += 1
 
             return_time = exam.retorno_horario or dt_time(12, 0)
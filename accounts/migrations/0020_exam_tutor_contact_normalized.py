@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:20
+
+import re
+
+from django.db import migrations, models
+
+
+def backfill_tutor_contact(apps, schema_editor):
+    Exam = apps.get_model("accounts", "Exam")
+
+    batch = []
+    for exam in Exam.objects.only("id", "tutor_email", "tutor_phone").iterator(chunk_size=500):
+        exam.tutor_email_normalized = (exam.tutor_email or "").strip().lower()
+        exam.tutor_phone_digits = re.sub(r"\D", "", exam.tutor_phone or "")
+        batch.append(exam)
+
+        if len(batch) >= 500:
+            Exam.objects.bulk_update(batch, ["tutor_email_normalized", "tutor_phone_digits"])
+            batch = []
+
+    if batch:
+        Exam.objects.bulk_update(batch, ["tutor_email_normalized", "tutor_phone_digits"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_profile_exams_per_page_profile_management_per_page'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='tutor_email_normalized',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='tutor_phone_digits',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.RunPython(backfill_tutor_contact, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _parse_token(token):
+    try:
+        kind, raw_id = (token or "").strip().split(":", 1)
+        return kind, int(raw_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def copy_provider_tokens(apps, schema_editor):
+    Exam = apps.get_model("accounts", "Exam")
+    Clinic = apps.get_model("accounts", "Clinic")
+    Veterinarian = apps.get_model("accounts", "Veterinarian")
+    ExamProvider = apps.get_model("accounts", "ExamProvider")
+
+    clinic_ids = set()
+    vet_ids = set()
+    clinic_by_user = {}
+    vet_by_user = {}
+    clinic_by_name = {}
+    vet_by_name = {}
+
+    for clinic_id, user_id, name in Clinic.objects.order_by("name", "id").values_list("id", "user_id", "name"):
+        clinic_ids.add(clinic_id)
+        if user_id:
+            clinic_by_user.setdefault(user_id, clinic_id)
+        clinic_by_name.setdefault((name or "").strip().lower(), clinic_id)
+
+    for vet_id, user_id, name in Veterinarian.objects.order_by("name", "id").values_list("id", "user_id", "name"):
+        vet_ids.add(vet_id)
+        if user_id:
+            vet_by_user.setdefault(user_id, vet_id)
+        vet_by_name.setdefault((name or "").strip().lower(), vet_id)
+
+    batch = []
+    exams = Exam.objects.only("id", "assigned_user_id", "clinic_or_vet", "additional_clinic_or_vet")
+
+    for exam in exams.iterator(chunk_size=500):
+        tokens = []
+
+        # mesma regra de _get_main_provider_token_for_exam
+        main = None
+        if exam.assigned_user_id in clinic_by_user:
+            main = ("CLINIC", clinic_by_user[exam.assigned_user_id])
+        elif exam.assigned_user_id in vet_by_user:
+            main = ("VET", vet_by_user[exam.assigned_user_id])
+        else:
+            name = (exam.clinic_or_vet or "").strip().lower()
+            if name and name in clinic_by_name:
+                main = ("CLINIC", clinic_by_name[name])
+            elif name and name in vet_by_name:
+                main = ("VET", vet_by_name[name])
+
+        if main:
+            tokens.append((main, "MAIN"))
+
+        for token in (exam.additional_clinic_or_vet or []):
+            parsed = _parse_token(token)
+            if parsed:
+                tokens.append((parsed, "ADDITIONAL"))
+
+        seen = set()
+        for (kind, obj_id), role in tokens:
+            if (kind, obj_id) in seen:
+                continue
+            seen.add((kind, obj_id))
+
+            if kind == "CLINIC" and obj_id in clinic_ids:
+                batch.append(ExamProvider(exam_id=exam.id, clinic_id=obj_id, role=role))
+            elif kind == "VET" and obj_id in vet_ids:
+                batch.append(ExamProvider(exam_id=exam.id, veterinarian_id=obj_id, role=role))
+
+        if len(batch) >= 1000:
+            ExamProvider.objects.bulk_create(batch)
+            batch = []
+
+    if batch:
+        ExamProvider.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_exam_tutor_contact_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamProvider',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('MAIN', 'Principal'), ('ADDITIONAL', 'Adicional')], default='ADDITIONAL', max_length=10)),
+                ('clinic', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='exam_links', to='accounts.clinic')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='provider_links', to='accounts.exam')),
+                ('veterinarian', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='exam_links', to='accounts.veterinarian')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['exam', 'role'], name='examprovider_exam_role_idx'), models.Index(fields=['clinic', 'exam'], name='examprovider_clinic_exam_idx'), models.Index(fields=['veterinarian', 'exam'], name='examprovider_vet_exam_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('clinic__isnull', False), ('veterinarian__isnull', True)), models.Q(('clinic__isnull', True), ('veterinarian__isnull', False)), _connector='OR'), name='examprovider_clinic_xor_vet')],
+            },
+        ),
+        migrations.RunPython(copy_provider_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:23
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+SEARCH_FIELDS = ("clinic_or_vet", "exam_type", "pet_name", "breed", "tutor_name")
+
+
+def _fold(value):
+    value = unicodedata.normalize("NFKD", (value or "").lower())
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", value).strip()
+
+
+def backfill_search_text(apps, schema_editor):
+    Exam = apps.get_model("accounts", "Exam")
+
+    batch = []
+    for exam in Exam.objects.only("id", *SEARCH_FIELDS).iterator(chunk_size=500):
+        exam.search_text = _fold(" ".join(getattr(exam, f) or "" for f in SEARCH_FIELDS))
+        batch.append(exam)
+
+        if len(batch) >= 500:
+            Exam.objects.bulk_update(batch, ["search_text"])
+            batch = []
+
+    if batch:
+        Exam.objects.bulk_update(batch, ["search_text"])
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS accounts_exam_search "
+            "USING fts5(search_text, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO accounts_exam_search (rowid, search_text) "
+            "SELECT id, search_text FROM accounts_exam"
+        )
+
+    elif vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS accounts_exam_search_tsv_idx "
+            "ON accounts_exam USING gin (to_tsvector('simple', search_text))"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS accounts_exam_search_trgm_idx "
+            "ON accounts_exam USING gin (search_text gin_trgm_ops)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS accounts_exam_search")
+
+    elif vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS accounts_exam_search_tsv_idx")
+        schema_editor.execute("DROP INDEX IF EXISTS accounts_exam_search_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0021_examprovider'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,147 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0022_exam_search_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clinic',
+            index=models.Index(fields=['name', 'id'], name='clinic_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clinic',
+            index=models.Index(fields=['email', 'id'], name='clinic_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clinic',
+            index=models.Index(fields=['phone', 'id'], name='clinic_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clinic',
+            index=models.Index(fields=['created_at', 'id'], name='clinic_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['date_realizacao', 'created_at'], name='exam_default_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['date_realizacao', 'id'], name='exam_realizacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['clinic_or_vet', 'id'], name='exam_clinic_or_vet_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['exam_type', 'id'], name='exam_exam_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['pet_name', 'id'], name='exam_pet_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['breed', 'id'], name='exam_breed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['tutor_name', 'id'], name='exam_tutor_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['created_at', 'id'], name='exam_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['retorno_previsto', 'id'], name='exam_retorno_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['assigned_user', 'date_realizacao', 'created_at'], name='exam_user_default_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['assigned_user', 'date_realizacao', 'id'], name='exam_user_realizacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['assigned_user', 'clinic_or_vet', 'id'], name='exam_user_clinic_or_vet_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['assigned_user', 'exam_type', 'id'], name='exam_user_exam_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['assigned_user', 'pet_name', 'id'], name='exam_user_pet_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['assigned_user', 'breed', 'id'], name='exam_user_breed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['assigned_user', 'tutor_name', 'id'], name='exam_user_tutor_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['assigned_user', 'created_at', 'id'], name='exam_user_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['assigned_user', 'retorno_previsto', 'id'], name='exam_user_retorno_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['name', 'id'], name='pet_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['breed', 'id'], name='pet_breed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['created_at', 'id'], name='pet_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutor',
+            index=models.Index(fields=['name', 'id'], name='tutor_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutor',
+            index=models.Index(fields=['email', 'id'], name='tutor_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutor',
+            index=models.Index(fields=['phone', 'id'], name='tutor_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutor',
+            index=models.Index(fields=['created_at', 'id'], name='tutor_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='veterinarian',
+            index=models.Index(fields=['name', 'id'], name='vet_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='veterinarian',
+            index=models.Index(fields=['email', 'id'], name='vet_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='veterinarian',
+            index=models.Index(fields=['phone', 'id'], name='vet_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='veterinarian',
+            index=models.Index(fields=['created_at', 'id'], name='vet_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:30
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    # registros existentes: "última alteração" = data de cadastro
+    for model_name in ("Exam", "Tutor", "Clinic", "Veterinarian", "Pet"):
+        apps.get_model("accounts", model_name).objects.update(updated_at=F("created_at"))
+    apps.get_model("accounts", "ExamExtraPDF").objects.update(updated_at=F("uploaded_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0023_list_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clinic',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='examextrapdf',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='tutor',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='veterinarian',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:33
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0024_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(django.db.models.functions.text.Lower('pet_name'), name='exam_pet_name_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(django.db.models.functions.text.Lower('tutor_name'), name='exam_tutor_name_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(django.db.models.functions.text.Lower('exam_type'), name='exam_exam_type_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(django.db.models.functions.text.Lower('clinic_or_vet'), name='exam_clinic_prefix_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:38
+
+import os
+
+import accounts.storage
+from django.db import migrations, models
+
+
+def backfill_original_names(apps, schema_editor):
+    Exam = apps.get_model("accounts", "Exam")
+    ExamExtraPDF = apps.get_model("accounts", "ExamExtraPDF")
+
+    exams = []
+    for exam in Exam.objects.exclude(pdf_file="").exclude(pdf_file__isnull=True).only("id", "pdf_file").iterator(chunk_size=500):
+        exam.pdf_original_name = os.path.basename(exam.pdf_file.name)
+        exams.append(exam)
+    Exam.objects.bulk_update(exams, ["pdf_original_name"], batch_size=500)
+
+    extras = []
+    for extra in ExamExtraPDF.objects.exclude(file="").only("id", "file").iterator(chunk_size=500):
+        extra.original_name = os.path.basename(extra.file.name)
+        extras.append(extra)
+    ExamExtraPDF.objects.bulk_update(extras, ["original_name"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0026_file_sha256'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.BigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='pdf_original_name',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='examextrapdf',
+            name='original_name',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='exam',
+            name='pdf_file',
+            field=models.FileField(blank=True, null=True, storage=accounts.storage.exam_file_storage, upload_to='exam_pdfs/', verbose_name='Arquivo PDF'),
+        ),
+        migrations.AlterField(
+            model_name='examextrapdf',
+            name='file',
+            field=models.FileField(storage=accounts.storage.exam_file_storage, upload_to='exam_pdfs/extras/'),
+        ),
+        migrations.RunPython(backfill_original_names, migrations.RunPython.noop),
+    ]
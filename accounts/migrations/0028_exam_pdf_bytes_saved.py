@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0027_content_addressed_files'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='pdf_bytes_saved',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:50
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0029_chunkedupload'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadBatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('provider', models.JSONField(blank=True, default=dict)),
+                ('notify_provider', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('PENDING', 'Na fila'), ('RUNNING', 'Processando'), ('DONE', 'Concluído'), ('FAILED', 'Falhou')], db_index=True, default='PENDING', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_batches', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UploadBatchItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('filename', models.CharField(max_length=255)),
+                ('staged_path', models.CharField(blank=True, max_length=500)),
+                ('status', models.CharField(choices=[('PENDING', 'Na fila'), ('DONE', 'Cadastrado'), ('ERROR', 'Erro')], default='PENDING', max_length=10)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='accounts.uploadbatch')),
+                ('exam', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.exam')),
+            ],
+            options={
+                'ordering': ['batch', 'position'],
+            },
+        ),
+    ]
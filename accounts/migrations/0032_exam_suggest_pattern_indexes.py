@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# índices Lower() da 0025 (Exam.Meta.indexes), usados por search.suggest_exam_values
+PREFIX_INDEXES = (
+    ("pet_name", "exam_pet_name_prefix_idx"),
+    ("tutor_name", "exam_tutor_name_prefix_idx"),
+    ("exam_type", "exam_exam_type_prefix_idx"),
+    ("clinic_or_vet", "exam_clinic_prefix_idx"),
+)
+
+
+def _recreate(schema_editor, opclass):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for column, name in PREFIX_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+        schema_editor.execute(f"CREATE INDEX {name} ON accounts_exam (LOWER({column}) {opclass})")
+
+
+def use_pattern_ops(apps, schema_editor):
+    # LIKE 'abc%' só usa índice btree no Postgres com text_pattern_ops (ou
+    # collation "C"). Troca os índices da 0025 no lugar, com o mesmo nome,
+    # em vez de manter dois índices por coluna a cada gravação.
+    _recreate(schema_editor, "text_pattern_ops")
+
+
+def use_default_ops(apps, schema_editor):
+    _recreate(schema_editor, "")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0031_uploadbatch_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(use_pattern_ops, use_default_ops),
+    ]
@@ -0,0 +1,43 @@
+from django.db import OperationalError, migrations, transaction
+
+# A busca procura cada termo como pedaço do texto ("ana" acha "Mariana"),
+# como o icontains de antes. O tokenizer trigram do FTS5 (SQLite 3.34+)
+# indexa exatamente isso; o unicode61 só achava começo de palavra.
+
+
+def _recreate(schema_editor, tokenize):
+    schema_editor.execute("DROP TABLE IF EXISTS accounts_exam_search")
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE accounts_exam_search "
+                f"USING fts5(search_text, tokenize = '{tokenize}')"
+            )
+    except OperationalError:
+        # SQLite sem o tokenizer: sem a tabela, a busca usa LIKE (backend "basic")
+        return
+    schema_editor.execute(
+        "INSERT INTO accounts_exam_search (rowid, search_text) "
+        "SELECT id, search_text FROM accounts_exam"
+    )
+
+
+def use_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        _recreate(schema_editor, "trigram")
+
+
+def use_unicode61(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        _recreate(schema_editor, "unicode61 remove_diacritics 2")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0032_exam_suggest_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(use_trigram, use_unicode61),
+    ]
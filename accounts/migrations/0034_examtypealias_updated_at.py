@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 05:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0033_exam_search_trigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examtypealias',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,7 +1,215 @@
+import hashlib
+import os
+import re
+import uuid
+
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 from django.conf import settings
 
+from .list_cache import bump_list_version
+from .search import SEARCH_FIELDS, build_exam_search_text
+from .storage import exam_file_storage, release_file, retain_file
+
+
+def normalize_tutor_email(email: str) -> str:
+    return (email or "").strip().lower()
+
+
+def normalize_tutor_phone(phone: str) -> str:
+    return re.sub(r"\D", "", phone or "")
+
+
+def compute_sha256(file) -> str:
+    """
+    SHA-256 (hex) de um arquivo enviado ou de um FieldFile, lido em blocos.
+    Volta o ponteiro para o início para o arquivo poder ser salvo em seguida.
+    """
+    digest = hashlib.sha256()
+    file.open("rb")
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def _ensure_stored_sha256(instance, file_attr, hash_attr) -> str:
+    """
+    Hash de arquivos enviados antes de o campo existir: calcula uma vez a
+    partir do storage e grava, sem passar pelo save() (nada mais mudou).
+    Lê o arquivo inteiro; só para o comando compute_exam_file_hashes, nunca
+    durante um pedido (as views usam o campo gravado e, sem ele, um ETag
+    fraco).
+    """
+    value = getattr(instance, hash_attr)
+    field_file = getattr(instance, file_attr)
+    if value or not field_file:
+        return value
+
+    try:
+        value = compute_sha256(field_file)
+    except (FileNotFoundError, OSError):
+        return ""
+    finally:
+        field_file.close()
+
+    setattr(instance, hash_attr, value)
+    type(instance).objects.filter(pk=instance.pk).update(**{hash_attr: value})
+    return value
+
+
+def parse_provider_token(token: str):
+    """
+    "CLINIC:1" -> ("CLINIC", 1), "VET:3" -> ("VET", 3).
+    Retorna None se o token for inválido.
+    """
+    try:
+        kind, raw_id = (token or "").strip().split(":", 1)
+        obj_id = int(raw_id)
+    except (AttributeError, ValueError):
+        return None
+
+    if kind not in ("CLINIC", "VET"):
+        return None
+
+    return kind, obj_id
+
+
+def resolve_provider_tokens(tokens):
+    """
+    {token: Clinic/Veterinarian} para vários tokens de uma vez, com no
+    máximo uma consulta por tipo. Tokens inválidos ou de registros apagados
+    ficam de fora.
+    """
+    parsed = {}
+    ids = {"CLINIC": set(), "VET": set()}
+    for token in tokens or []:
+        key = parse_provider_token(token)
+        if key:
+            parsed[token] = key
+            ids[key[0]].add(key[1])
+
+    objects = {}
+    if ids["CLINIC"]:
+        objects.update((("CLINIC", c.id), c) for c in Clinic.objects.filter(id__in=ids["CLINIC"]))
+    if ids["VET"]:
+        objects.update((("VET", v.id), v) for v in Veterinarian.objects.filter(id__in=ids["VET"]))
+
+    return {token: objects[key] for token, key in parsed.items() if key in objects}
+
+
+def additional_provider_names(tokens, providers):
+    """
+    Nomes dos adicionais a partir dos tokens já resolvidos (ver
+    Exam.get_additional_clinic_or_vet_names para a ordem).
+    """
+    resolved = []  # lista de tuplas ("C"|"V", "Nome")
+
+    for token in tokens or []:
+        obj = providers.get(token)
+        if obj is not None:
+            resolved.append(("C" if isinstance(obj, Clinic) else "V", obj.display_name))
+
+    clinic_names = [name for k, name in resolved if k == "C"]
+    vet_names = [name for k, name in resolved if k == "V"]
+
+    if clinic_names and vet_names:
+        return clinic_names + vet_names
+
+    return [name for _, name in resolved]
+
+
+def prefetch_additional_providers(exams):
+    """
+    Resolve de uma vez os adicionais de vários exames (uma consulta por
+    tipo no total) e guarda em cada exame; additional_clinic_or_vet_display
+    passa a não consultar o banco. Devolve a lista de exames.
+    """
+    exams = list(exams)
+    providers = resolve_provider_tokens(
+        {token for exam in exams for token in (exam.additional_clinic_or_vet or [])}
+    )
+    for exam in exams:
+        exam._additional_providers = providers
+    return exams
+
+
+def main_provider_token(exam):
+    """
+    Token do responsável principal de um exame sem um escolhido no
+    formulário: a clínica/vet da conta vinculada (assigned_user) ou, se
+    não houver, a de mesmo nome que exam.clinic_or_vet.
+    """
+    if exam.assigned_user_id:
+        clinic = Clinic.objects.filter(user_id=exam.assigned_user_id).first()
+        if clinic:
+            return f"CLINIC:{clinic.id}"
+
+        vet = Veterinarian.objects.filter(user_id=exam.assigned_user_id).first()
+        if vet:
+            return f"VET:{vet.id}"
+
+    provider_name = (exam.clinic_or_vet or "").strip()
+    if provider_name:
+        clinic = Clinic.objects.filter(name__iexact=provider_name).first()
+        if clinic:
+            return f"CLINIC:{clinic.id}"
+
+        vet = Veterinarian.objects.filter(name__iexact=provider_name).first()
+        if vet:
+            return f"VET:{vet.id}"
+
+    return None
+
+
+def sync_exam_providers(exams_with_main):
+    """
+    Regrava as linhas de ExamProvider de vários exames de uma vez, a partir
+    de pares (exam, token do principal ou None); os adicionais saem de
+    exam.additional_clinic_or_vet. Tokens inválidos, repetidos ou de
+    registros apagados ficam de fora. Número fixo de consultas.
+    """
+    links = []
+    for exam, main_token in exams_with_main:
+        seen = set()
+        tokens = [(main_token, ExamProvider.ROLE_MAIN)]
+        tokens += [(token, ExamProvider.ROLE_ADDITIONAL) for token in (exam.additional_clinic_or_vet or [])]
+
+        for token, role in tokens:
+            parsed = parse_provider_token(token)
+            if not parsed or parsed in seen:
+                continue
+            seen.add(parsed)
+
+            kind, obj_id = parsed
+            links.append(ExamProvider(
+                exam=exam,
+                clinic_id=obj_id if kind == "CLINIC" else None,
+                veterinarian_id=obj_id if kind == "VET" else None,
+                role=role,
+            ))
+
+    ExamProvider.objects.filter(exam__in=[exam.pk for exam, _ in exams_with_main]).delete()
+
+    existing_clinics = set(Clinic.objects.filter(
+        id__in=[link.clinic_id for link in links if link.clinic_id]
+    ).values_list("id", flat=True))
+    existing_vets = set(Veterinarian.objects.filter(
+        id__in=[link.veterinarian_id for link in links if link.veterinarian_id]
+    ).values_list("id", flat=True))
+
+    links = [
+        link for link in links
+        if link.clinic_id in existing_clinics or link.veterinarian_id in existing_vets
+    ]
+    ExamProvider.objects.bulk_create(links)
+    # bulk_create não dispara o post_save que invalida o cache das listas,
+    # e estas linhas mudam quais exames uma clínica/vet enxerga
+    bump_list_version()
+    return links
+
 
 class Profile(models.Model):
     ROLE_CHOICES = [
@@ -24,6 +232,11 @@ class Profile(models.Model):
         return f'Perfil de {self.user.username}'
 
 
+# campos do Exam que decidem as linhas de ExamProvider
+PROVIDER_FIELDS = ("clinic_or_vet", "assigned_user", "additional_clinic_or_vet")
+PROVIDER_ATTNAMES = ("clinic_or_vet", "assigned_user_id", "additional_clinic_or_vet")
+
+
 class Exam(models.Model):
     date_realizacao = models.DateField("Data de realização")
     clinic_or_vet = models.CharField("Clínica / Veterinário", max_length=255)
@@ -34,8 +247,17 @@ class Exam(models.Model):
 
     tutor_phone = models.CharField("Celular do tutor", max_length=20, blank=True)
     tutor_email = models.CharField("E-mail do tutor", max_length=255, blank=True)
+
+    # Versões normalizadas do contato do tutor, usadas para filtrar os exames
+    # visíveis para um TUTOR direto no banco (preenchidas no save()).
+    tutor_email_normalized = models.CharField(max_length=255, blank=True, db_index=True, editable=False)
+    tutor_phone_digits = models.CharField(max_length=20, blank=True, db_index=True, editable=False)
+
     observations = models.TextField("Observações", blank=True)
 
+    # Texto sem acentos usado pela busca (ver accounts/search.py)
+    search_text = models.TextField(blank=True, editable=False)
+
     alerta_email = models.DateTimeField("Alerta Email", blank=True, null=True)
     alerta_zap = models.DateTimeField("Alerta Zap", blank=True, null=True)
     alerta_provider = models.BooleanField(default=False)
@@ -50,7 +272,15 @@ class Exam(models.Model):
         blank=True,
     )
 
-    pdf_file = models.FileField("Arquivo PDF", upload_to='exam_pdfs/', blank=True, null=True)
+    pdf_file = models.FileField(
+        "Arquivo PDF", upload_to='exam_pdfs/', storage=exam_file_storage, blank=True, null=True
+    )
+    # SHA-256 do PDF, calculado no upload (ETag forte do exam_pdf)
+    pdf_sha256 = models.CharField(max_length=64, blank=True, editable=False)
+    # nome do arquivo enviado (no storage ele fica com o nome do hash, ver storage.py)
+    pdf_original_name = models.CharField(max_length=255, blank=True, editable=False)
+    # bytes economizados pela otimização no upload (ver pdf_optimize.py)
+    pdf_bytes_saved = models.PositiveIntegerField(default=0, editable=False)
 
     assigned_user = models.ForeignKey(
         User,
@@ -70,6 +300,91 @@ class Exam(models.Model):
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def fill_derived_fields(self):
+        """
+        Campos calculados a partir dos outros (contatos normalizados, texto
+        da busca). O save() chama sempre; quem usa bulk_create chama antes.
+        """
+        self.tutor_email_normalized = normalize_tutor_email(self.tutor_email)
+        self.tutor_phone_digits = normalize_tutor_phone(self.tutor_phone)
+        self.search_text = build_exam_search_text(self)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # valores lidos do banco, para o save() saber se precisa refazer
+        # as linhas de ExamProvider
+        if not instance.get_deferred_fields() & set(PROVIDER_ATTNAMES):
+            instance._saved_providers = instance._provider_values()
+        return instance
+
+    def _provider_values(self):
+        return (self.clinic_or_vet, self.assigned_user_id, list(self.additional_clinic_or_vet or []))
+
+    def save(self, *args, main_provider=None, **kwargs):
+        """
+        main_provider ("CLINIC:1"/"VET:3") é o responsável escolhido no
+        formulário; sem ele, sync_providers mantém ou resolve o principal.
+        """
+        self.fill_derived_fields()
+
+        new_upload = bool(self.pdf_file) and not self.pdf_file._committed
+        if not self.pdf_file:
+            self.pdf_sha256 = ""
+            self.pdf_original_name = ""
+            self.pdf_bytes_saved = 0
+        elif new_upload:
+            self.pdf_original_name = os.path.basename(self.pdf_file.name)
+            self.pdf_bytes_saved = getattr(self.pdf_file.file, "bytes_saved", 0)
+            self.pdf_sha256 = compute_sha256(self.pdf_file)
+            self.pdf_file.file.content_sha256 = self.pdf_sha256
+
+        # arquivo anterior, para soltar a referência se foi trocado/removido
+        previous_name = None
+        if self.pk and (new_upload or not self.pdf_file):
+            previous_name = Exam.objects.filter(pk=self.pk).values_list("pdf_file", flat=True).first()
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if "tutor_email" in update_fields:
+                update_fields.add("tutor_email_normalized")
+            if "tutor_phone" in update_fields:
+                update_fields.add("tutor_phone_digits")
+            if update_fields.intersection(SEARCH_FIELDS):
+                update_fields.add("search_text")
+            if "pdf_file" in update_fields:
+                update_fields.update(("pdf_sha256", "pdf_original_name", "pdf_bytes_saved"))
+            update_fields.add("updated_at")
+            kwargs["update_fields"] = update_fields
+
+        saved_providers = None if self._state.adding else getattr(self, "_saved_providers", None)
+        providers = self._provider_values()
+        sync = main_provider is not None or providers != saved_providers
+        if update_fields is not None and not update_fields.intersection(PROVIDER_FIELDS + PROVIDER_ATTNAMES):
+            sync = main_provider is not None
+
+        super().save(*args, **kwargs)
+
+        if sync:
+            # só os adicionais mudaram: o principal atual continua
+            keep_main = saved_providers is not None and providers[:2] == saved_providers[:2]
+            self.sync_providers(main_token=main_provider, keep_main=keep_main)
+            self._saved_providers = providers
+
+        if new_upload:
+            retain_file(self.pdf_file.name, self.pdf_sha256, self.pdf_file.size)
+        if previous_name and previous_name != (self.pdf_file.name if self.pdf_file else None):
+            release_file(previous_name)
+
+    @property
+    def pdf_display_name(self) -> str:
+        return self.pdf_original_name or os.path.basename(self.pdf_file.name or "")
+
+    def get_pdf_sha256(self) -> str:
+        return _ensure_stored_sha256(self, "pdf_file", "pdf_sha256")
     
     def get_additional_clinic_or_vet_names(self):
         """
@@ -78,39 +393,64 @@ class Exam(models.Model):
           - se tiver só um tipo: mantém a ordem em que foi selecionado
         """
         tokens = self.additional_clinic_or_vet or []
-        resolved = []  # lista de tuplas ("C"|"V", "Nome")
-
-        for token in tokens:
-            try:
-                kind, raw_id = token.split(":", 1)
-                obj_id = int(raw_id)
-            except Exception:
-                continue
-
-            if kind == "CLINIC":
-                c = Clinic.objects.filter(id=obj_id).first()
-                if c:
-                    resolved.append(("C", c.display_name))
-            elif kind == "VET":
-                v = Veterinarian.objects.filter(id=obj_id).first()
-                if v:
-                    resolved.append(("V", v.display_name))
-
-        clinic_names = [name for k, name in resolved if k == "C"]
-        vet_names = [name for k, name in resolved if k == "V"]
-
-        if clinic_names and vet_names:
-            return clinic_names + vet_names
-
-        return [name for _, name in resolved]
+        # prefetch_additional_providers() já resolveu os tokens de vários exames
+        providers = getattr(self, "_additional_providers", None)
+        if providers is None:
+            providers = resolve_provider_tokens(tokens)
+        return additional_provider_names(tokens, providers)
 
     @property
     def additional_clinic_or_vet_display(self):
         names = self.get_additional_clinic_or_vet_names()
         return ", ".join(names)
 
+    def sync_providers(self, main_token=None, keep_main=False):
+        """
+        Regrava as linhas de ExamProvider deste exame (o save() chama
+        quando clínica/vet principal ou adicionais mudam):
+          - main_token ("CLINIC:1"/"VET:3") vira o responsável principal;
+            sem ele, fica o principal atual (keep_main) ou o resolvido por
+            main_provider_token
+          - additional_clinic_or_vet vira os adicionais, na mesma ordem
+        """
+        if main_token is None and keep_main:
+            link = self.provider_links.filter(role=ExamProvider.ROLE_MAIN).first()
+            main_token = link.token if link else None
+        if main_token is None:
+            main_token = main_provider_token(self)
+        return sync_exam_providers([(self, main_token)])
+
     class Meta:
         ordering = ['-date_realizacao', '-created_at']
+        # Um índice por coluna ordenável da lista de exames (com id para o
+        # desempate da paginação por cursor) e as variantes por assigned_user
+        # para as listas de clínica/vet.
+        indexes = [
+            models.Index(fields=['date_realizacao', 'created_at'], name='exam_default_order_idx'),
+            models.Index(fields=['date_realizacao', 'id'], name='exam_realizacao_idx'),
+            models.Index(fields=['clinic_or_vet', 'id'], name='exam_clinic_or_vet_idx'),
+            models.Index(fields=['exam_type', 'id'], name='exam_exam_type_idx'),
+            models.Index(fields=['pet_name', 'id'], name='exam_pet_name_idx'),
+            models.Index(fields=['breed', 'id'], name='exam_breed_idx'),
+            models.Index(fields=['tutor_name', 'id'], name='exam_tutor_name_idx'),
+            models.Index(fields=['created_at', 'id'], name='exam_created_at_idx'),
+            models.Index(fields=['retorno_previsto', 'id'], name='exam_retorno_idx'),
+            models.Index(fields=['assigned_user', 'date_realizacao', 'created_at'], name='exam_user_default_order_idx'),
+            models.Index(fields=['assigned_user', 'date_realizacao', 'id'], name='exam_user_realizacao_idx'),
+            models.Index(fields=['assigned_user', 'clinic_or_vet', 'id'], name='exam_user_clinic_or_vet_idx'),
+            models.Index(fields=['assigned_user', 'exam_type', 'id'], name='exam_user_exam_type_idx'),
+            models.Index(fields=['assigned_user', 'pet_name', 'id'], name='exam_user_pet_name_idx'),
+            models.Index(fields=['assigned_user', 'breed', 'id'], name='exam_user_breed_idx'),
+            models.Index(fields=['assigned_user', 'tutor_name', 'id'], name='exam_user_tutor_name_idx'),
+            models.Index(fields=['assigned_user', 'created_at', 'id'], name='exam_user_created_at_idx'),
+            models.Index(fields=['assigned_user', 'retorno_previsto', 'id'], name='exam_user_retorno_idx'),
+            # prefixo em minúsculo para as sugestões da busca (search.suggest_exam_values);
+            # no Postgres a migração 0032 recria estes com text_pattern_ops
+            models.Index(Lower('pet_name'), name='exam_pet_name_prefix_idx'),
+            models.Index(Lower('tutor_name'), name='exam_tutor_name_prefix_idx'),
+            models.Index(Lower('exam_type'), name='exam_exam_type_prefix_idx'),
+            models.Index(Lower('clinic_or_vet'), name='exam_clinic_prefix_idx'),
+        ]
 
     def __str__(self):
         return f'{self.exam_type} - {self.pet_name}'
@@ -134,6 +474,7 @@ class Tutor(BaseContact):
     email = models.CharField(max_length=255, blank=True)
     phone = models.CharField(max_length=20, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     surname = models.CharField("Sobrenome", max_length=255, blank=True)
     photo = models.ImageField(upload_to="management_photos/tutores/", blank=True, null=True)
 
@@ -150,6 +491,12 @@ class Tutor(BaseContact):
     class Meta(BaseContact.Meta):
         verbose_name = "Tutor"
         verbose_name_plural = "Tutores"
+        indexes = [
+            models.Index(fields=["name", "id"], name="tutor_name_idx"),
+            models.Index(fields=["email", "id"], name="tutor_email_idx"),
+            models.Index(fields=["phone", "id"], name="tutor_phone_idx"),
+            models.Index(fields=["created_at", "id"], name="tutor_created_at_idx"),
+        ]
 
 
 class Clinic(models.Model):
@@ -157,6 +504,7 @@ class Clinic(models.Model):
     email = models.CharField(max_length=255, blank=True)
     phone = models.CharField(max_length=20, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     user = models.OneToOneField(User, null=True, blank=True, on_delete=models.SET_NULL)
     photo = models.ImageField(upload_to="management_photos/clinicas/", blank=True, null=True)
@@ -171,6 +519,12 @@ class Clinic(models.Model):
     class Meta(BaseContact.Meta):
         verbose_name = "Clínica"
         verbose_name_plural = "Clínicas"
+        indexes = [
+            models.Index(fields=["name", "id"], name="clinic_name_idx"),
+            models.Index(fields=["email", "id"], name="clinic_email_idx"),
+            models.Index(fields=["phone", "id"], name="clinic_phone_idx"),
+            models.Index(fields=["created_at", "id"], name="clinic_created_at_idx"),
+        ]
 
 
 class Veterinarian(models.Model):
@@ -178,6 +532,7 @@ class Veterinarian(models.Model):
     email = models.CharField(max_length=255, blank=True)
     phone = models.CharField(max_length=20, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     user = models.OneToOneField(User, null=True, blank=True, on_delete=models.SET_NULL)
     
@@ -197,6 +552,12 @@ class Veterinarian(models.Model):
     class Meta(BaseContact.Meta):
         verbose_name = "Veterinário"
         verbose_name_plural = "Veterinários"
+        indexes = [
+            models.Index(fields=["name", "id"], name="vet_name_idx"),
+            models.Index(fields=["email", "id"], name="vet_email_idx"),
+            models.Index(fields=["phone", "id"], name="vet_phone_idx"),
+            models.Index(fields=["created_at", "id"], name="vet_created_at_idx"),
+        ]
 
 
 class Pet(models.Model):
@@ -204,10 +565,16 @@ class Pet(models.Model):
     breed = models.CharField("Raça", max_length=255, blank=True)
     tutor = models.ForeignKey(Tutor, on_delete=models.CASCADE, related_name="pets")
     created_at = models.DateTimeField("Data de cadastro", auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     photo = models.ImageField(upload_to="management_photos/pets/", blank=True, null=True)
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=["name", "id"], name="pet_name_idx"),
+            models.Index(fields=["breed", "id"], name="pet_breed_idx"),
+            models.Index(fields=["created_at", "id"], name="pet_created_at_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -216,6 +583,8 @@ class ExamTypeAlias(models.Model):
     abbreviation = models.CharField("Sigla", max_length=50, unique=True)
     full_name = models.CharField("Exame", max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
+    # versão das siglas quando o cache não é compartilhado (ver exam_types.py)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["abbreviation"]
@@ -231,17 +600,209 @@ class ExamTypeAlias(models.Model):
     def __str__(self):
         return f"{self.abbreviation} -> {self.full_name}"
 
+class ExamProvider(models.Model):
+    """
+    Clínicas/veterinários que podem ver um exame (principal + adicionais).
+    Espelha exam.assigned_user / exam.additional_clinic_or_vet em forma relacional
+    para que listagem, permissão e envio de alertas sejam um join indexado.
+    """
+    ROLE_MAIN = "MAIN"
+    ROLE_ADDITIONAL = "ADDITIONAL"
+    ROLE_CHOICES = [
+        (ROLE_MAIN, "Principal"),
+        (ROLE_ADDITIONAL, "Adicional"),
+    ]
+
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name="provider_links")
+    clinic = models.ForeignKey(
+        Clinic,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="exam_links",
+    )
+    veterinarian = models.ForeignKey(
+        Veterinarian,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="exam_links",
+    )
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES, default=ROLE_ADDITIONAL)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["exam", "role"], name="examprovider_exam_role_idx"),
+            models.Index(fields=["clinic", "exam"], name="examprovider_clinic_exam_idx"),
+            models.Index(fields=["veterinarian", "exam"], name="examprovider_vet_exam_idx"),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(clinic__isnull=False, veterinarian__isnull=True) |
+                    models.Q(clinic__isnull=True, veterinarian__isnull=False)
+                ),
+                name="examprovider_clinic_xor_vet",
+            ),
+        ]
+
+    @property
+    def provider(self):
+        return self.clinic if self.clinic_id else self.veterinarian
+
+    @property
+    def token(self):
+        if self.clinic_id:
+            return f"CLINIC:{self.clinic_id}"
+        return f"VET:{self.veterinarian_id}"
+
+    def __str__(self):
+        return f"{self.token} ({self.exam_id}, {self.role})"
+
 class ExamExtraPDF(models.Model):
     exam = models.ForeignKey(
         Exam,
         on_delete=models.CASCADE,
         related_name="extra_pdfs",
     )
-    file = models.FileField(upload_to="exam_pdfs/extras/")
+    file = models.FileField(upload_to="exam_pdfs/extras/", storage=exam_file_storage)
+    sha256 = models.CharField(max_length=64, blank=True, editable=False)
+    original_name = models.CharField(max_length=255, blank=True, editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def save(self, *args, **kwargs):
+        new_upload = bool(self.file) and not self.file._committed
+        if not self.file:
+            self.sha256 = ""
+            self.original_name = ""
+        elif new_upload:
+            self.original_name = os.path.basename(self.file.name)
+            self.sha256 = compute_sha256(self.file)
+            self.file.file.content_sha256 = self.sha256
+
+        previous_name = None
+        if self.pk and (new_upload or not self.file):
+            previous_name = ExamExtraPDF.objects.filter(pk=self.pk).values_list("file", flat=True).first()
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "file" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "sha256", "original_name"}
+
+        super().save(*args, **kwargs)
+
+        if new_upload:
+            retain_file(self.file.name, self.sha256, self.file.size)
+        if previous_name and previous_name != (self.file.name if self.file else None):
+            release_file(previous_name)
+
+    @property
+    def display_name(self) -> str:
+        return self.original_name or os.path.basename(self.file.name or "")
+
+    def get_sha256(self) -> str:
+        return _ensure_stored_sha256(self, "file", "sha256")
 
     def __str__(self):
         return f"Extra PDF ({self.exam_id})"
 
 
 
+
+
+class StoredFile(models.Model):
+    """
+    Arquivo endereçado pelo conteúdo (ver storage.py) e quantos
+    Exam.pdf_file / ExamExtraPDF.file apontam para ele.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+
+class ChunkedUpload(models.Model):
+    """
+    Arquivo enviado em partes (ver chunked_upload.py). `offset` é quanto já
+    chegou; o envio pode ser retomado dali até chegar em `size`.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="chunked_uploads")
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    @property
+    def is_complete(self) -> bool:
+        return self.completed_at is not None
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+
+class UploadBatch(models.Model):
+    """
+    Lote do upload em massa processado em segundo plano (ver batch_upload.py).
+    `provider` guarda a clínica/vet principal já resolvida na requisição
+    (token, nome, contatos, link de ativação) para o processamento e as
+    notificações.
+    """
+    STATUS_PENDING = "PENDING"
+    STATUS_RUNNING = "RUNNING"
+    STATUS_DONE = "DONE"
+    STATUS_FAILED = "FAILED"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Na fila"),
+        (STATUS_RUNNING, "Processando"),
+        (STATUS_DONE, "Concluído"),
+        (STATUS_FAILED, "Falhou"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="upload_batches")
+    provider = models.JSONField(default=dict, blank=True)
+    notify_provider = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # atualizado a cada arquivo processado; lote sem sinal de vida volta para a fila
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Lote {self.pk} ({self.get_status_display()})"
+
+
+class UploadBatchItem(models.Model):
+    STATUS_PENDING = "PENDING"
+    STATUS_DONE = "DONE"
+    STATUS_ERROR = "ERROR"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Na fila"),
+        (STATUS_DONE, "Cadastrado"),
+        (STATUS_ERROR, "Erro"),
+    ]
+
+    batch = models.ForeignKey(UploadBatch, on_delete=models.CASCADE, related_name="items")
+    position = models.PositiveIntegerField()
+    filename = models.CharField(max_length=255)
+    # caminho do arquivo no diretório de staging do lote
+    staged_path = models.CharField(max_length=500, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    error = models.CharField(max_length=255, blank=True)
+    exam = models.ForeignKey(Exam, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+
+    class Meta:
+        ordering = ["batch", "position"]
+
+    def __str__(self):
+        return f"{self.filename} ({self.get_status_display()})"
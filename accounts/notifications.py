@@ -4,6 +4,8 @@ from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
 from django.urls import reverse
 
+from .invitations import absolute_url
+
 
 def _first_name_only(name: str) -> str:
     parts = (name or "").strip().split()
@@ -18,8 +20,8 @@ def send_exam_email(request, *, exam, to_email: str, recipient_label: str, activ
     if not to_email:
         return False
 
-    login_link = request.build_absolute_uri(reverse("login"))
-    exam_link = request.build_absolute_uri(reverse("exam_view", args=[exam.pk]))
+    login_link = absolute_url(request, reverse("login"))
+    exam_link = absolute_url(request, reverse("exam_view", args=[exam.pk]))
 
     subject = f"LumaVet — Exame cadastrado ({exam.exam_type})"
 
@@ -101,7 +103,7 @@ def send_tutor_exam_email(request, *, exam, to_email: str, activation_link: str
 
     tutor_first_name = _first_name_only(exam.tutor_name)
     exam_date = exam.date_realizacao.strftime("%d/%m/%Y")
-    login_link = request.build_absolute_uri(reverse("login"))
+    login_link = absolute_url(request, reverse("login"))
 
     is_first_access = bool(activation_link)
     target_link = activation_link or login_link
@@ -186,7 +188,7 @@ def send_provider_exam_email(request, *, exam, to_email: str, recipient_label: s
         return False
 
     exam_date = exam.date_realizacao.strftime("%d/%m/%Y")
-    login_link = request.build_absolute_uri(reverse("login"))
+    login_link = absolute_url(request, reverse("login"))
 
     is_first_access = bool(activation_link)
     target_link = activation_link or login_link
@@ -272,7 +274,7 @@ def send_provider_exam_resend_email(request, *, exam, to_email: str, recipient_l
         return False
 
     exam_date = exam.date_realizacao.strftime("%d/%m/%Y")
-    login_link = request.build_absolute_uri(reverse("login"))
+    login_link = absolute_url(request, reverse("login"))
 
     is_first_access = bool(activation_link)
     target_link = activation_link or login_link
@@ -419,7 +421,7 @@ def send_contact_updated_email(
     if not to_email:
         return False
 
-    login_link = request.build_absolute_uri(reverse("login"))
+    login_link = absolute_url(request, reverse("login"))
     subject = "LumaVet — Dados atualizados"
 
     text_body = "\n".join([
@@ -471,7 +473,7 @@ def send_provider_bulk_exam_email(
     if not to_email:
         return False
 
-    login_link = request.build_absolute_uri(reverse("login"))
+    login_link = absolute_url(request, reverse("login"))
 
     is_first_access = bool(activation_link)
     target_link = activation_link or login_link
@@ -542,7 +544,7 @@ def send_provider_return_email(request, *, exam, to_email: str, recipient_label:
         return False
 
     exam_date = exam.date_realizacao.strftime("%d/%m/%Y")
-    login_link = request.build_absolute_uri(reverse("login"))
+    login_link = absolute_url(request, reverse("login"))
 
     is_first_access = bool(activation_link)
     target_link = activation_link or login_link
@@ -0,0 +1,193 @@
+"""
+Paginação das listas (exames e gestão).
+
+Dois modos:
+  - numerado (Paginator do Django): COUNT(*) + OFFSET, com a barra de páginas
+  - cursor (keyset): a página seguinte é buscada a partir do último item
+    (valor da coluna ordenada + id), então o custo não cresce com a
+    profundidade. Os tokens ?cursor= são assinados e opacos.
+
+No modo numerado o total vem do cache de contagens (list_cache.py).
+"""
+from django.conf import settings
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+
+from .list_cache import cached_count, estimated_table_count
+
+CURSOR_SALT = "accounts.pagination.cursor"
+
+
+def build_page_numbers(current_page, total_pages):
+    """
+    Páginas mostradas no rodapé: primeira, última e até 2 vizinhas da atual,
+    com '...' nos buracos. Ex.: [1, '...', 8, 9, 10, 11, 12, '...', 40]
+    """
+    if total_pages <= 9:
+        return list(range(1, total_pages + 1))
+
+    window = {1, total_pages}
+    window.update(range(max(1, current_page - 2), min(total_pages, current_page + 2) + 1))
+
+    page_numbers = []
+    last_added = None
+    for num in sorted(window):
+        if last_added and num - last_added > 1:
+            page_numbers.append('...')
+        page_numbers.append(num)
+        last_added = num
+
+    return page_numbers
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator cujo total vem do cache de contagens, chaveado por count_key
+    (escopo do usuário, busca normalizada, filtros). Com estimate=True, em
+    listas sem filtro, usa a estimativa do planner do Postgres quando ligada.
+    """
+    def __init__(self, object_list, per_page, *, count_key=None, estimate=False, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.estimate = estimate
+
+    @cached_property
+    def count(self):
+        def exact_count():
+            return Paginator.count.func(self)
+
+        if self.estimate and hasattr(self.object_list, "model"):
+            estimated = estimated_table_count(self.object_list.model, self.object_list.db)
+            if estimated is not None:
+                return estimated
+
+        if self.count_key is None:
+            return exact_count()
+        return cached_count(self.count_key, exact_count)
+
+
+def cursor_pagination_enabled(request) -> bool:
+    mode = (getattr(settings, "LIST_PAGINATION_MODE", "pages") or "pages").lower()
+    return mode == "cursor" or bool(request.GET.get("cursor"))
+
+
+class CursorPage:
+    def __init__(self, object_list, *, has_next, has_previous, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _encode_cursor(order_key, value, pk, backwards):
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    return signing.dumps(
+        {"k": order_key, "v": value, "id": pk, "b": backwards},
+        salt=CURSOR_SALT,
+        compress=True,
+    )
+
+
+def _decode_cursor(token, order_key):
+    if not token:
+        return None
+    try:
+        data = signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+
+    # cursor gerado para outra ordenação: volta para a primeira página
+    if not isinstance(data, dict) or data.get("k") != order_key:
+        return None
+    return data
+
+
+def _field_is_nullable(model, path):
+    field = None
+    for part in path.split("__"):
+        field = model._meta.get_field(part)
+        if field.null:
+            return True
+        model = field.related_model or model
+    return False
+
+
+def _ordering(field_name, descending, nullable):
+    # NULL é tratado como "maior que tudo" (mesma ordem natural do btree no Postgres)
+    if descending:
+        return [F(field_name).desc(nulls_first=True if nullable else None), "-pk"]
+    return [F(field_name).asc(nulls_last=True if nullable else None), "pk"]
+
+
+def _after(field_name, value, pk, descending, nullable):
+    if descending:
+        if value is None:
+            return Q(**{f"{field_name}__isnull": True, "pk__lt": pk}) | Q(**{f"{field_name}__isnull": False})
+        return Q(**{f"{field_name}__lt": value}) | Q(**{field_name: value, "pk__lt": pk})
+
+    if value is None:
+        return Q(**{f"{field_name}__isnull": True, "pk__gt": pk})
+    after = Q(**{f"{field_name}__gt": value}) | Q(**{field_name: value, "pk__gt": pk})
+    if nullable:
+        after |= Q(**{f"{field_name}__isnull": True})
+    return after
+
+
+def paginate_by_cursor(queryset, field_name, *, descending, cursor, per_page, order_key=""):
+    """
+    Página de `per_page` itens ordenados por (field_name, id).
+    `cursor` é o token recebido em ?cursor= (ou None para a primeira página).
+    """
+    nullable = _field_is_nullable(queryset.model, field_name)
+    position = _decode_cursor(cursor, order_key)
+    backwards = bool(position and position.get("b"))
+
+    # voltando uma página: percorre na ordem inversa e desinverte no final
+    query_descending = descending != backwards
+
+    qs = queryset.annotate(_cursor_value=F(field_name))
+    if position is not None:
+        qs = qs.filter(_after(field_name, position.get("v"), position.get("id"), query_descending, nullable))
+    qs = qs.order_by(*_ordering(field_name, query_descending, nullable))
+
+    rows = list(qs[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if backwards:
+        rows.reverse()
+        has_previous, has_next = has_more, True
+    else:
+        has_previous, has_next = position is not None, has_more
+
+    next_cursor = previous_cursor = None
+    if rows and has_next:
+        last = rows[-1]
+        next_cursor = _encode_cursor(order_key, last._cursor_value, last.pk, False)
+    if rows and has_previous:
+        first = rows[0]
+        previous_cursor = _encode_cursor(order_key, first._cursor_value, first.pk, True)
+
+    return CursorPage(
+        rows,
+        has_next=has_next,
+        has_previous=has_previous,
+        next_cursor=next_cursor,
+        previous_cursor=previous_cursor,
+    )
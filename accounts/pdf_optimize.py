@@ -0,0 +1,89 @@
+"""
+Otimização dos PDFs no upload (exam_upload / exam_upload_multi).
+
+Os laudos saem dos exportadores dos equipamentos sem otimização e sem
+linearização, e o visualizador do navegador precisa baixar o arquivo todo
+antes de mostrar a primeira página. Com PDF_OPTIMIZE_ON_UPLOAD ligado, o
+PDF é regravado com pikepdf (pip install pikepdf):
+
+  - linearizado ("fast web view"): a primeira página vem no começo do
+    arquivo e, com o Range de file_delivery.py, aparece antes do download
+    terminar;
+  - streams recomprimidos e objetos agrupados em object streams.
+
+O pikepdf está no requirements.txt. Se faltar com a opção ligada, um aviso
+vai para o log na inicialização (warn_if_unavailable, no AccountsConfig.ready)
+e os PDFs são gravados como vieram. Se o PDF não abrir (protegido,
+corrompido) ou o resultado não ficar menor, o arquivo original é mantido. A economia
+vai no atributo bytes_saved do arquivo devolvido e o Exam.save() grava em
+Exam.pdf_bytes_saved.
+"""
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+
+try:
+    import pikepdf
+except ImportError:  # dependência opcional
+    pikepdf = None
+
+logger = logging.getLogger(__name__)
+
+# acima disso o resultado vai para arquivo temporário em disco
+SPOOL_MAX_SIZE = 10 * 1024 * 1024
+
+
+def pdf_optimization_enabled() -> bool:
+    return pikepdf is not None and getattr(settings, "PDF_OPTIMIZE_ON_UPLOAD", False)
+
+
+def warn_if_unavailable():
+    if pikepdf is None and getattr(settings, "PDF_OPTIMIZE_ON_UPLOAD", False):
+        logger.warning(
+            "PDF_OPTIMIZE_ON_UPLOAD está ligado, mas o pikepdf não está instalado; "
+            "os PDFs serão gravados sem otimização (pip install pikepdf)."
+        )
+
+
+def optimize_uploaded_pdf(uploaded):
+    """
+    Arquivo para gravar no lugar de `uploaded`: a versão otimizada (com
+    `bytes_saved`) ou o próprio `uploaded` quando a otimização está
+    desligada ou não compensa.
+    """
+    if not pdf_optimization_enabled() or not uploaded:
+        return uploaded
+    if not uploaded.name.lower().endswith(".pdf"):
+        return uploaded
+
+    original_size = uploaded.size
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    try:
+        uploaded.seek(0)
+        with pikepdf.open(uploaded) as pdf:
+            pdf.save(
+                output,
+                linearize=True,
+                compress_streams=True,
+                recompress_flate=True,
+                object_stream_mode=pikepdf.ObjectStreamMode.generate,
+            )
+    except (pikepdf.PdfError, OSError, ValueError) as exc:
+        logger.warning("PDF não otimizado (%s): %s", uploaded.name, exc)
+        output.close()
+        uploaded.seek(0)
+        return uploaded
+
+    optimized_size = output.tell()
+    uploaded.seek(0)
+    if optimized_size >= original_size:
+        output.close()
+        return uploaded
+
+    output.seek(0)
+    optimized = File(output, name=os.path.basename(uploaded.name))
+    optimized.bytes_saved = original_size - optimized_size
+    return optimized
@@ -0,0 +1,252 @@
+"""
+Busca de exames (parâmetro `q` da lista de exames).
+
+O texto pesquisável de cada exame (clínica, exame, pet, raça e tutor) fica
+em Exam.search_text já sem acentos e em minúsculo. Cada termo buscado
+precisa aparecer nele como pedaço de texto, como o icontains de antes
+("ana" acha "Mariana"). Em cima dele:
+  - SQLite: tabela virtual FTS5 com tokenizer trigram (accounts_exam_search),
+    ranqueada por bm25; termos de 1-2 letras vão por LIKE
+  - Postgres: LIKE '%termo%' no índice trigram (pg_trgm), ranqueado por
+    ts_rank no índice GIN de to_tsvector('simple', search_text)
+  - outros bancos: LIKE simples em search_text, sem ranking
+
+O backend é escolhido pelo banco configurado via dj_database_url
+(settings.DATABASES), ou forçado com EXAM_SEARCH_BACKEND.
+
+As sugestões enquanto o usuário digita (suggest_exam_values) usam outro
+caminho: prefixo sobre LOWER(campo), no índice de Exam.Meta.indexes. No
+SQLite é uma faixa (>= / <); no Postgres é LIKE 'abc%', e a migração 0032
+recria esses índices com text_pattern_ops (a faixa não serve lá, porque a
+collation do banco não ordena por bytes).
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
+
+SEARCH_FIELDS = ("clinic_or_vet", "exam_type", "pet_name", "breed", "tutor_name")
+
+SQLITE_FTS_TABLE = "accounts_exam_search"
+
+# chave no JSON de sugestões -> campo do Exam (todos com índice em LOWER())
+SUGGEST_FIELDS = {
+    "pets": "pet_name",
+    "tutores": "tutor_name",
+    "exames": "exam_type",
+    "clinicas": "clinic_or_vet",
+}
+
+SUGGEST_MIN_LENGTH = 2
+
+# o tokenizer trigram do FTS5 não acha pedaços menores que isso
+TRIGRAM_MIN_LENGTH = 3
+
+_TERM_RE = re.compile(r"\w+")
+
+# cache por alias de banco: a tabela FTS5 existe?
+_fts_available = {}
+
+
+def fold_search_text(value: str) -> str:
+    """
+    "  João   da Silva " -> "joao da silva"
+    """
+    value = unicodedata.normalize("NFKD", (value or "").lower())
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", value).strip()
+
+
+def build_exam_search_text(exam) -> str:
+    return fold_search_text(" ".join(getattr(exam, field) or "" for field in SEARCH_FIELDS))
+
+
+def search_terms(query: str):
+    return _TERM_RE.findall(fold_search_text(query))
+
+
+def get_search_backend(using="default") -> str:
+    backend = (getattr(settings, "EXAM_SEARCH_BACKEND", "auto") or "auto").lower()
+    if backend != "auto":
+        return backend
+
+    connection = connections[using]
+    if connection.vendor == "sqlite" and _sqlite_fts_table_exists(using):
+        return "sqlite_fts"
+    if connection.vendor == "postgresql":
+        return "postgres"
+    return "basic"
+
+
+def _sqlite_fts_table_exists(using) -> bool:
+    if using not in _fts_available:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                [SQLITE_FTS_TABLE],
+            )
+            _fts_available[using] = cursor.fetchone() is not None
+    return _fts_available[using]
+
+
+def search_exams(queryset, query: str):
+    """
+    Filtra o queryset de exames pelo texto buscado e anota `search_rank`
+    (quanto maior, mais relevante). Todos os termos precisam aparecer, como
+    pedaço de texto ("ana" acha "Mariana"), em algum dos campos; o mesmo
+    resultado em todos os backends, só muda o índice usado e o ranking.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    backend = get_search_backend(queryset.db)
+    connection = connections[queryset.db]
+    exam_table = connection.ops.quote_name(queryset.model._meta.db_table)
+
+    if backend == "sqlite_fts":
+        # o índice trigram só serve para termos de 3+ letras; os menores
+        # ficam no LIKE sobre search_text
+        indexed = [term for term in terms if len(term) >= TRIGRAM_MIN_LENGTH]
+        for term in terms:
+            if term not in indexed:
+                queryset = queryset.filter(search_text__contains=term)
+        if not indexed:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+        match = " AND ".join(f'"{term}"' for term in indexed)
+        matches = RawSQL(
+            f"{exam_table}.id IN (SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s)",
+            [match],
+            output_field=BooleanField(),
+        )
+        # bm25: menor é melhor, por isso o sinal invertido
+        rank = RawSQL(
+            f"(SELECT -bm25({SQLITE_FTS_TABLE}) FROM {SQLITE_FTS_TABLE} "
+            f"WHERE {SQLITE_FTS_TABLE} MATCH %s AND rowid = {exam_table}.id)",
+            [match],
+            output_field=FloatField(),
+        )
+        return queryset.filter(matches).annotate(search_rank=rank)
+
+    for term in terms:
+        queryset = queryset.filter(search_text__contains=term)
+
+    if backend == "postgres":
+        # o LIKE '%termo%' acima usa o índice trigram; o ts_rank põe na
+        # frente quem tem os termos como começo de palavra
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        rank = RawSQL(
+            f"ts_rank(to_tsvector('simple', {exam_table}.search_text), to_tsquery('simple', %s))",
+            [tsquery],
+            output_field=FloatField(),
+        )
+        return queryset.annotate(search_rank=rank)
+
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def suggest_exam_values(queryset, prefix: str, limit: int = 8):
+    """
+    Até `limit` valores distintos de cada campo de SUGGEST_FIELDS começando
+    com `prefix` (sem diferenciar maiúsculas), dentro do queryset recebido
+    (já filtrado pela visibilidade do usuário).
+
+    Postgres: LOWER(campo) LIKE 'abc%', pelo índice text_pattern_ops.
+    Outros bancos: LOWER(campo) >= 'abc' AND LOWER(campo) < 'abd', pelo
+    índice de expressão (o SQLite compara por bytes e não usaria índice
+    com LIKE).
+    """
+    prefix = (prefix or "").strip().lower()
+    results = {key: [] for key in SUGGEST_FIELDS}
+    if len(prefix) < SUGGEST_MIN_LENGTH:
+        return results
+
+    if connections[queryset.db].vendor == "postgresql":
+        prefix_filter = {"_suggest_key__startswith": prefix}
+    else:
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        prefix_filter = {"_suggest_key__gte": prefix, "_suggest_key__lt": upper}
+
+    for key, field_name in SUGGEST_FIELDS.items():
+        rows = (
+            queryset.annotate(_suggest_key=Lower(field_name))
+            .filter(**prefix_filter)
+            .order_by("_suggest_key")
+            .values_list("_suggest_key", field_name)
+            .distinct()[:limit * 3]
+        )
+
+        # variações só de maiúsculas/minúsculas contam uma vez
+        seen = set()
+        for folded, value in rows:
+            if folded in seen:
+                continue
+            seen.add(folded)
+            results[key].append(value)
+            if len(results[key]) >= limit:
+                break
+
+    return results
+
+
+def index_exam(exam, using="default"):
+    """
+    Atualiza a linha do exame no índice FTS5 (no Postgres o índice é
+    sobre a própria coluna, então não há nada a fazer).
+    """
+    if get_search_backend(using) != "sqlite_fts":
+        return
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s", [exam.pk])
+        cursor.execute(
+            f"INSERT INTO {SQLITE_FTS_TABLE} (rowid, search_text) VALUES (%s, %s)",
+            [exam.pk, exam.search_text or ""],
+        )
+
+
+def unindex_exam(exam_id, using="default"):
+    if get_search_backend(using) != "sqlite_fts":
+        return
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s", [exam_id])
+
+
+def rebuild_search_index(using="default") -> int:
+    """
+    Recalcula Exam.search_text de todos os exames e recria o índice FTS5.
+    Retorna a quantidade de exames indexados.
+    """
+    from .models import Exam
+
+    total = 0
+    batch = []
+    exams = Exam.objects.using(using).only("id", *SEARCH_FIELDS).order_by("id")
+
+    for exam in exams.iterator(chunk_size=1000):
+        exam.search_text = build_exam_search_text(exam)
+        batch.append(exam)
+        total += 1
+
+        if len(batch) >= 1000:
+            Exam.objects.using(using).bulk_update(batch, ["search_text"])
+            batch = []
+
+    if batch:
+        Exam.objects.using(using).bulk_update(batch, ["search_text"])
+
+    if get_search_backend(using) == "sqlite_fts":
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SQLITE_FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {SQLITE_FTS_TABLE} (rowid, search_text) "
+                f"SELECT id, search_text FROM {Exam._meta.db_table}"
+            )
+
+    return total
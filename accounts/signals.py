@@ -0,0 +1,50 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import search
+from .exam_types import bump_exam_type_version
+from .list_cache import bump_list_version
+from .models import Clinic, Exam, ExamExtraPDF, ExamProvider, ExamTypeAlias, Pet, Tutor, Veterinarian
+from .storage import release_file
+
+LIST_MODELS = (Exam, Tutor, Clinic, Veterinarian, Pet, ExamProvider)
+
+
+@receiver(post_save, sender=Exam)
+def update_exam_search_index(sender, instance, using, update_fields=None, **kwargs):
+    # salvamentos parciais que não mexem no texto da busca (alertas, etc.) não reindexam
+    if update_fields is not None and "search_text" not in update_fields:
+        return
+    search.index_exam(instance, using=using)
+
+
+@receiver(post_delete, sender=Exam)
+def remove_exam_from_search_index(sender, instance, using, **kwargs):
+    search.unindex_exam(instance.pk, using=using)
+
+
+@receiver(post_delete, sender=Exam)
+def release_exam_pdf(sender, instance, **kwargs):
+    if instance.pdf_file:
+        release_file(instance.pdf_file.name, instance.pdf_file.storage)
+
+
+@receiver(post_delete, sender=ExamExtraPDF)
+def release_extra_file(sender, instance, **kwargs):
+    if instance.file:
+        release_file(instance.file.name, instance.file.storage)
+
+
+def _bump_list_version(sender, **kwargs):
+    bump_list_version()
+
+
+for _model in LIST_MODELS:
+    post_save.connect(_bump_list_version, sender=_model, dispatch_uid=f"list_version_save_{_model.__name__}")
+    post_delete.connect(_bump_list_version, sender=_model, dispatch_uid=f"list_version_delete_{_model.__name__}")
+
+
+@receiver(post_save, sender=ExamTypeAlias)
+@receiver(post_delete, sender=ExamTypeAlias)
+def reload_exam_type_aliases(sender, **kwargs):
+    bump_exam_type_version()
@@ -0,0 +1,152 @@
+"""
+Armazenamento dos PDFs/extras dos exames endereçado pelo conteúdo.
+
+O arquivo é gravado como exam_files/<2 primeiros>/<sha256><extensão>, então
+o mesmo laudo enviado duas vezes (upload simples e múltiplo, reenvio depois
+de uma correção, o mesmo PDF como extra de outro exame) ocupa espaço uma
+vez só. O nome original fica no próprio registro (Exam.pdf_original_name /
+ExamExtraPDF.original_name).
+
+StoredFile conta quantos Exam/ExamExtraPDF apontam para cada arquivo; quando
+a contagem chega a zero, o arquivo sai do disco. Arquivos antigos (nomes
+fora de exam_files/) não são contados nem apagados; o comando
+dedupe_exam_files move esses para cá.
+"""
+import contextlib
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage, storages
+from django.db import transaction
+from django.db.models import F
+
+CONTENT_ADDRESSED_PREFIX = "exam_files"
+
+
+def content_address(sha256: str, original_name: str) -> str:
+    extension = os.path.splitext(original_name or "")[1].lower()
+    return f"{CONTENT_ADDRESSED_PREFIX}/{sha256[:2]}/{sha256}{extension}"
+
+
+def is_content_addressed(name: str) -> bool:
+    return bool(name) and name.startswith(f"{CONTENT_ADDRESSED_PREFIX}/")
+
+
+def _sha256_of(content) -> str:
+    digest = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage (mesmo MEDIA_ROOT/MEDIA_URL) que ignora o upload_to e
+    grava pelo hash do conteúdo. Se o arquivo já existe completo, não grava
+    de novo.
+
+    O conteúdo vai primeiro para um arquivo temporário na mesma pasta e só
+    então é renomeado (os.replace, atômico) para o nome final. Assim o nome
+    final nunca aponta para um arquivo pela metade, e dois processos
+    gravando o mesmo conteúdo ao mesmo tempo terminam os dois com o mesmo
+    arquivo, sem disputar o nome.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # o nome final só sai no _save(), a partir do conteúdo
+        return name
+
+    def _save(self, name, content):
+        # o Exam/ExamExtraPDF já calculou o hash no save(); reaproveita
+        sha256 = getattr(content, "content_sha256", None) or _sha256_of(content)
+        target = content_address(sha256, name)
+        if self._is_stored(target, content):
+            return target
+
+        full_path = self.path(target)
+        directory = os.path.dirname(full_path)
+        self._make_directory(directory)
+
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                for chunk in content.chunks():
+                    temp_file.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp_path)
+            raise
+        return target
+
+    def _is_stored(self, target, content) -> bool:
+        # arquivo de tamanho diferente é sobra de uma gravação interrompida
+        try:
+            return self.size(target) == content.size
+        except OSError:
+            return False
+
+    def _make_directory(self, directory):
+        if self.directory_permissions_mode is None:
+            os.makedirs(directory, exist_ok=True)
+            return
+        old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+        try:
+            os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+        finally:
+            os.umask(old_umask)
+
+
+def exam_file_storage():
+    """
+    Storage dos FileFields de Exam/ExamExtraPDF: STORAGES["exam_files"]
+    quando configurado, senão o default.
+    """
+    if "exam_files" in settings.STORAGES:
+        return storages["exam_files"]
+    return default_storage
+
+
+def retain_file(name: str, sha256: str, size: int):
+    """Mais uma referência para o arquivo (só para arquivos endereçados)."""
+    from .models import StoredFile
+
+    if not is_content_addressed(name):
+        return
+
+    stored, _ = StoredFile.objects.get_or_create(name=name, defaults={"sha256": sha256, "size": size or 0})
+    StoredFile.objects.filter(pk=stored.pk).update(ref_count=F("ref_count") + 1)
+
+
+def release_file(name: str, storage=None):
+    """
+    Uma referência a menos; sem referências, apaga o registro e, depois do
+    commit, o arquivo.
+    """
+    from .models import StoredFile
+
+    if not is_content_addressed(name):
+        return
+
+    StoredFile.objects.filter(name=name, ref_count__gt=0).update(ref_count=F("ref_count") - 1)
+    deleted, _ = StoredFile.objects.filter(name=name, ref_count__lte=0).delete()
+
+    if deleted:
+        storage = storage or exam_file_storage()
+        transaction.on_commit(lambda: _delete_if_unreferenced(storage, name))
+
+
+def _delete_if_unreferenced(storage, name):
+    from .models import StoredFile
+
+    # outro upload do mesmo conteúdo pode ter chegado entre o delete e o commit
+    if not StoredFile.objects.filter(name=name).exists():
+        storage.delete(name)
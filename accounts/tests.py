@@ -1,3 +1,1628 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import io
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import skipUnless
+from urllib.parse import unquote
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail, signing
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .batch_upload import (
+    BatchClaimLost,
+    _claim,
+    _heartbeat,
+    _process_items,
+    batch_dir,
+    process_batch,
+    requeue_stale_batches,
+    stage_batch,
+)
+from .chunked_upload import ChunkedUploadError, append_chunk, part_path
+from .forms import MultiExamUploadForm
+from .models import (
+    ChunkedUpload,
+    Clinic,
+    Exam,
+    ExamExtraPDF,
+    ExamProvider,
+    ExamTypeAlias,
+    Pet,
+    Profile,
+    StoredFile,
+    Tutor,
+    UploadBatch,
+    UploadBatchItem,
+    Veterinarian,
+    prefetch_additional_providers,
+    sync_exam_providers,
+)
+from . import pdf_optimize
+from .exam_types import translate_many
+from .facets import ExamFacets
+from .file_delivery import DOWNLOAD_TOKEN_SALT, make_download_token
+from .list_cache import bump_list_version, cached_count, list_cache_enabled, shared_cache_available
+from .pagination import paginate_by_cursor
+from .pdf_optimize import optimize_uploaded_pdf
+from .search import get_search_backend, search_exams
+from .storage import content_address, exam_file_storage, is_content_addressed
+from .views import EXAM_ORDER_MAP, MANAGEMENT_CATEGORIES, ensure_tutor_and_pet, ensure_tutors_and_pets
+
+
+class TempMediaMixin:
+    """
+    MEDIA_ROOT temporário para a classe inteira, com os arquivos gravados
+    em disco; apagado no fim. EXTRA_STORAGES entra em STORAGES
+    (ex.: "exam_files").
+    """
+    EXTRA_STORAGES = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+        media_settings = override_settings(
+            MEDIA_ROOT=cls.media_root,
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+                **cls.EXTRA_STORAGES,
+            },
+        )
+        media_settings.enable()
+        cls.addClassCleanup(media_settings.disable)
+        super().setUpClass()
+
+
+class ListSortIndexTests(TestCase):
+    """
+    Cada ordenação das listas precisa sair de um índice: o plano não pode
+    ter o passo de ordenação em memória ("USE TEMP B-TREE FOR ORDER BY").
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="clinica", password="x")
+
+    def assertOrderedByIndex(self, queryset):
+        if connection.vendor != "sqlite":
+            self.skipTest("plano verificado apenas no SQLite")
+        plan = queryset.explain()
+        self.assertIn("INDEX", plan, plan)
+        self.assertNotIn("TEMP B-TREE", plan, plan)
+
+    def test_exam_list_sorts_use_index(self):
+        for order, field_name in EXAM_ORDER_MAP.items():
+            for prefix in ("", "-"):
+                with self.subTest(order=order, direction=prefix or "asc"):
+                    self.assertOrderedByIndex(Exam.objects.order_by(f"{prefix}{field_name}", f"{prefix}pk")[:20])
+
+    def test_exam_default_order_uses_index(self):
+        self.assertOrderedByIndex(Exam.objects.all()[:20])
+        self.assertOrderedByIndex(Exam.objects.filter(assigned_user=self.user)[:20])
+
+    def test_provider_scoped_sorts_use_index(self):
+        for order, field_name in EXAM_ORDER_MAP.items():
+            for prefix in ("", "-"):
+                with self.subTest(order=order, direction=prefix or "asc"):
+                    qs = Exam.objects.filter(assigned_user=self.user).order_by(f"{prefix}{field_name}", f"{prefix}pk")
+                    self.assertOrderedByIndex(qs[:20])
+
+    def test_management_sorts_use_index(self):
+        for category, info in MANAGEMENT_CATEGORIES.items():
+            for order, field_name in info.get("order_map", {}).items():
+                # ordenação por coluna de outra tabela (pets por tutor__name)
+                # depende do join; o lado do tutor é coberto por tutor_name_idx
+                if "__" in field_name:
+                    continue
+                for prefix in ("", "-"):
+                    with self.subTest(category=category, order=order, direction=prefix or "asc"):
+                        qs = info["model"].objects.order_by(f"{prefix}{field_name}", f"{prefix}pk")
+                        self.assertOrderedByIndex(qs[:20])
+
+
+class ExamProviderSyncTests(TestCase):
+    """As linhas de ExamProvider acompanham o Exam em qualquer caminho de gravação."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.clinic_user = User.objects.create_user("clinica", password="x")
+        cls.clinic = Clinic.objects.create(name="Clínica Teste", user=cls.clinic_user)
+        cls.other_clinic = Clinic.objects.create(name="Outra Clínica")
+        cls.vet = Veterinarian.objects.create(name="Paula", surname="Lima")
+
+    def _exam(self, **kwargs):
+        fields = {
+            "date_realizacao": date(2024, 1, 10),
+            "clinic_or_vet": "Clínica Teste",
+            "exam_type": "Hemograma",
+            "pet_name": "Rex",
+            "tutor_name": "Maria",
+            **kwargs,
+        }
+        main_provider = fields.pop("main_provider", None)
+        exam = Exam(**fields)
+        exam.save(main_provider=main_provider)
+        return exam
+
+    def _links(self, exam):
+        return [(link.token, link.role) for link in ExamProvider.objects.filter(exam=exam)]
+
+    def test_create_writes_main_and_additional_links(self):
+        exam = self._exam(
+            main_provider=f"VET:{self.vet.pk}",
+            additional_clinic_or_vet=[
+                f"CLINIC:{self.other_clinic.pk}", "lixo", f"VET:{self.vet.pk}", "CLINIC:999999",
+            ],
+        )
+        self.assertEqual(self._links(exam), [
+            (f"VET:{self.vet.pk}", ExamProvider.ROLE_MAIN),
+            (f"CLINIC:{self.other_clinic.pk}", ExamProvider.ROLE_ADDITIONAL),
+        ])
+
+    def test_without_main_provider_it_is_resolved_from_the_exam(self):
+        by_user = self._exam(assigned_user=self.clinic_user, clinic_or_vet="Outro nome")
+        by_name = self._exam(clinic_or_vet="outra clínica")
+
+        self.assertEqual(self._links(by_user), [(f"CLINIC:{self.clinic.pk}", ExamProvider.ROLE_MAIN)])
+        self.assertEqual(self._links(by_name), [(f"CLINIC:{self.other_clinic.pk}", ExamProvider.ROLE_MAIN)])
+
+    def test_editing_additional_providers_keeps_the_chosen_main(self):
+        exam = self._exam(main_provider=f"VET:{self.vet.pk}")
+
+        # como o admin: carrega, muda o JSON e salva
+        exam = Exam.objects.get(pk=exam.pk)
+        exam.additional_clinic_or_vet = [f"CLINIC:{self.other_clinic.pk}"]
+        exam.save()
+
+        self.assertEqual(self._links(exam), [
+            (f"VET:{self.vet.pk}", ExamProvider.ROLE_MAIN),
+            (f"CLINIC:{self.other_clinic.pk}", ExamProvider.ROLE_ADDITIONAL),
+        ])
+
+    def test_changing_the_main_fields_resolves_the_main_again(self):
+        exam = self._exam(clinic_or_vet="Outra Clínica")
+        self.assertEqual(self._links(exam), [(f"CLINIC:{self.other_clinic.pk}", ExamProvider.ROLE_MAIN)])
+
+        exam = Exam.objects.get(pk=exam.pk)
+        exam.assigned_user = self.clinic_user
+        exam.clinic_or_vet = "Clínica Teste"
+        exam.save()
+
+        self.assertEqual(self._links(exam), [(f"CLINIC:{self.clinic.pk}", ExamProvider.ROLE_MAIN)])
+
+    def test_unrelated_saves_do_not_rewrite_the_links(self):
+        exam = self._exam(main_provider=f"CLINIC:{self.clinic.pk}")
+        link_ids = list(exam.provider_links.values_list("pk", flat=True))
+
+        exam = Exam.objects.get(pk=exam.pk)
+        exam.observations = "Sem alterações"
+        exam.save()
+        exam.alerta_provider = True
+        exam.save(update_fields=["alerta_provider"])
+
+        self.assertEqual(list(exam.provider_links.values_list("pk", flat=True)), link_ids)
+
+    def test_sync_exam_providers_uses_a_fixed_number_of_queries(self):
+        def exams(size):
+            return [
+                self._exam(additional_clinic_or_vet=[f"VET:{self.vet.pk}"])
+                for _ in range(size)
+            ]
+
+        def queries(batch):
+            with CaptureQueriesContext(connection) as captured:
+                sync_exam_providers([(exam, f"CLINIC:{self.clinic.pk}") for exam in batch])
+            return len(captured)
+
+        small, large = exams(1), exams(10)
+        self.assertEqual(queries(small), queries(large))
+        for exam in large:
+            self.assertEqual(self._links(exam), [
+                (f"CLINIC:{self.clinic.pk}", ExamProvider.ROLE_MAIN),
+                (f"VET:{self.vet.pk}", ExamProvider.ROLE_ADDITIONAL),
+            ])
+
+
+class ExamSearchTests(TestCase):
+    """
+    Busca do ?q= (search.py): cada termo como pedaço de texto, sem acentos,
+    com o mesmo resultado no índice FTS5 e no LIKE simples.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        def exam(pet, tutor, exam_type="Hemograma", clinic="Clínica Central"):
+            return Exam.objects.create(
+                date_realizacao=date(2024, 1, 10),
+                clinic_or_vet=clinic,
+                exam_type=exam_type,
+                pet_name=pet,
+                tutor_name=tutor,
+            )
+
+        cls.mariana = exam("Rex", "Mariana Souza", exam_type="Ultrassonografia")
+        cls.joao = exam("Thor", "João Conceição")
+        cls.ana = exam("Rex", "Rex Ana")
+        cls.bia = exam("Mia", "Bia Lima", clinic="Clínica AB")
+
+    def _search(self, query):
+        return list(search_exams(Exam.objects.all(), query).order_by("-search_rank", "pk"))
+
+    def assertFinds(self, query, expected):
+        for backend in ("auto", "basic"):
+            with self.subTest(query=query, backend=backend), self.settings(EXAM_SEARCH_BACKEND=backend):
+                self.assertEqual({exam.pk for exam in self._search(query)}, {exam.pk for exam in expected})
+
+    def test_fts_index_is_used_on_sqlite(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("índice FTS5 só no SQLite")
+        self.assertEqual(get_search_backend(), "sqlite_fts")
+
+    def test_terms_match_inside_words(self):
+        self.assertFinds("ana", [self.mariana, self.ana])
+        self.assertFinds("sono", [self.mariana])
+        self.assertFinds("ceica", [self.joao])
+
+    def test_accents_and_case_are_ignored(self):
+        self.assertFinds("JOAO conceicao", [self.joao])
+        self.assertFinds("joão", [self.joao])
+        self.assertFinds("ULTRASSONOGRAFÍA", [self.mariana])
+
+    def test_every_term_must_match(self):
+        self.assertFinds("rex ana", [self.mariana, self.ana])
+        self.assertFinds("rex souza", [self.mariana])
+        self.assertFinds("rex thor", [])
+
+    def test_short_terms(self):
+        self.assertFinds("ab", [self.bia])
+        self.assertFinds("ab mia", [self.bia])
+
+    def test_more_occurrences_rank_first(self):
+        # "rex" no pet e no tutor vem antes de "rex" só no pet
+        results = self._search("rex")
+        self.assertEqual([exam.pk for exam in results], [self.ana.pk, self.mariana.pk])
+        self.assertGreater(results[0].search_rank, results[1].search_rank)
+
+    def test_index_follows_edits_and_deletes(self):
+        self.joao.tutor_name = "Joana"
+        self.joao.save()
+        self.assertFinds("conceicao", [])
+        self.assertFinds("joana", [self.joao])
+
+        self.bia.delete()
+        self.assertFinds("ab", [])
+
+
+class FakeFrontProxy:
+    """
+    Faz o papel do nginx / Apache na frente do Django: se a resposta pede
+    X-Accel-Redirect ou X-Sendfile, lê o arquivo do disco como o servidor
+    faria; senão repassa o corpo gerado pelo Django.
+    """
+
+    def __init__(self, client, media_root, internal_prefix="/protected-media/"):
+        self.client = client
+        self.media_root = Path(media_root)
+        self.internal_prefix = internal_prefix
+
+    def get(self, url, **extra):
+        response = self.client.get(url, **extra)
+        response.served_by = "django"
+
+        accel = response.get("X-Accel-Redirect")
+        sendfile = response.get("X-Sendfile")
+
+        if accel:
+            if not accel.startswith(self.internal_prefix):
+                raise AssertionError(f"X-Accel-Redirect fora da location interna: {accel}")
+            path = self.media_root / unquote(accel[len(self.internal_prefix):])
+            response.proxied_body = path.read_bytes()
+            response.served_by = "x-accel"
+        elif sendfile:
+            response.proxied_body = Path(sendfile).read_bytes()
+            response.served_by = "x-sendfile"
+        elif response.streaming:
+            response.proxied_body = b"".join(response.streaming_content)
+        else:
+            response.proxied_body = response.content
+
+        return response
+
+
+class ExamFileOffloadTests(TempMediaMixin, TestCase):
+    PDF_BYTES = b"%PDF-1.4 laudo de teste"
+    EXTRA_BYTES = b"RIFF....AVI extra"
+
+    def setUp(self):
+        User = get_user_model()
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "x")
+        self.outsider = User.objects.create_user("outra", password="x")
+        Profile.objects.create(user=self.outsider, role="BASIC")
+
+        self.exam = Exam.objects.create(
+            date_realizacao=date(2024, 1, 10),
+            clinic_or_vet="Clínica Teste",
+            exam_type="Hemograma",
+            pet_name="Rex",
+            tutor_name="Maria",
+            pdf_file=SimpleUploadedFile("laudo.pdf", self.PDF_BYTES, content_type="application/pdf"),
+        )
+        self.extra = ExamExtraPDF.objects.create(
+            exam=self.exam,
+            file=SimpleUploadedFile("video.avi", self.EXTRA_BYTES, content_type="video/x-msvideo"),
+        )
+
+        self.proxy = FakeFrontProxy(self.client, self.media_root)
+        self.pdf_url = f"/exames/{self.exam.pk}/pdf/"
+        self.extra_url = f"/exames/{self.exam.pk}/extras/{self.extra.pk}/pdf/"
+
+    def test_without_offload_django_streams_the_file(self):
+        self.client.force_login(self.admin)
+        response = self.proxy.get(self.pdf_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.served_by, "django")
+        self.assertEqual(response.proxied_body, self.PDF_BYTES)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+
+    @override_settings(FILE_OFFLOAD_MODE="x-accel", FILE_OFFLOAD_PREFIX="/protected-media/")
+    def test_x_accel_redirect_hands_the_file_to_the_proxy(self):
+        self.client.force_login(self.admin)
+
+        for url, body in ((self.pdf_url, self.PDF_BYTES), (self.extra_url, self.EXTRA_BYTES)):
+            with self.subTest(url=url):
+                response = self.proxy.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.served_by, "x-accel")
+                self.assertEqual(response.content, b"")
+                self.assertEqual(response.proxied_body, body)
+
+        self.assertEqual(self.proxy.get(self.pdf_url)["Content-Type"], "application/pdf")
+
+    @override_settings(FILE_OFFLOAD_MODE="x-sendfile")
+    def test_x_sendfile_hands_the_file_to_the_proxy(self):
+        self.client.force_login(self.admin)
+        response = self.proxy.get(self.extra_url)
+
+        self.assertEqual(response.served_by, "x-sendfile")
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.proxied_body, self.EXTRA_BYTES)
+
+    def _get_range(self, url, range_header, **extra):
+        self.client.force_login(self.admin)
+        response = self.client.get(url, HTTP_RANGE=range_header, **extra)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_single_range_returns_partial_content(self):
+        response, body = self._get_range(self.pdf_url, "bytes=0-7")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.PDF_BYTES[:8])
+        self.assertEqual(response["Content-Range"], f"bytes 0-7/{len(self.PDF_BYTES)}")
+        self.assertEqual(response["Content-Length"], "8")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+
+    def test_open_ended_and_suffix_ranges(self):
+        size = len(self.PDF_BYTES)
+        response, body = self._get_range(self.extra_url, "bytes=5-")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.EXTRA_BYTES[5:])
+
+        response, body = self._get_range(self.pdf_url, "bytes=-5")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.PDF_BYTES[-5:])
+        self.assertEqual(response["Content-Range"], f"bytes {size - 5}-{size - 1}/{size}")
+
+        # fim além do tamanho: vai até o último byte
+        response, body = self._get_range(self.pdf_url, "bytes=10-9999")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.PDF_BYTES[10:])
+
+    def test_unsatisfiable_range(self):
+        size = len(self.PDF_BYTES)
+        for header in (f"bytes={size}-", "bytes=-0"):
+            with self.subTest(range=header):
+                response, _ = self._get_range(self.pdf_url, header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response["Content-Range"], f"bytes */{size}")
+
+    def test_ignored_ranges_return_the_whole_file(self):
+        for header in ("bytes=0-1,4-5", "items=0-5", "bytes=abc-def", "bytes=7-3"):
+            with self.subTest(range=header):
+                response, body = self._get_range(self.pdf_url, header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(body, self.PDF_BYTES)
+
+    def test_if_range(self):
+        etag = f'"{self.exam.get_pdf_sha256()}"'
+
+        response, body = self._get_range(self.pdf_url, "bytes=0-3", HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.PDF_BYTES[:4])
+
+        # versão diferente da que o cliente tem: arquivo inteiro
+        for if_range in ('"outra-versao"', f"W/{etag}", "Mon, 01 Jan 2001 00:00:00 GMT"):
+            with self.subTest(if_range=if_range):
+                response, body = self._get_range(self.pdf_url, "bytes=0-3", HTTP_IF_RANGE=if_range)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(body, self.PDF_BYTES)
+
+    def test_file_without_hash_gets_a_weak_etag_and_is_not_hashed(self):
+        Exam.objects.filter(pk=self.exam.pk).update(pdf_sha256="")
+        self.client.force_login(self.admin)
+
+        response = self.client.get(self.pdf_url)
+        b"".join(response.streaming_content)
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('W/"'), etag)
+        self.assertEqual(Exam.objects.get(pk=self.exam.pk).pdf_sha256, "")
+
+        self.assertEqual(self.client.get(self.pdf_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # o comando grava o hash; a partir daí o ETag é forte
+        call_command("compute_exam_file_hashes", stdout=io.StringIO())
+        response = self.client.get(self.pdf_url)
+        b"".join(response.streaming_content)
+        self.assertEqual(response["ETag"], f'"{hashlib.sha256(self.PDF_BYTES).hexdigest()}"')
+
+    @override_settings(FILE_OFFLOAD_MODE="x-accel")
+    def test_offload_only_after_permission_check(self):
+        self.client.force_login(self.outsider)
+
+        pdf_response = self.client.get(self.pdf_url)
+        extra_response = self.client.get(self.extra_url)
+
+        self.assertEqual(pdf_response.status_code, 404)
+        self.assertEqual(extra_response.status_code, 403)
+        self.assertNotIn("X-Accel-Redirect", pdf_response)
+        self.assertNotIn("X-Accel-Redirect", extra_response)
+
+
+class ExamExportTests(TempMediaMixin, TestCase):
+    """Exportação CSV/XLSX e download em zip dos exames (exports.py)."""
+    PDF_BYTES = b"%PDF-1.4 laudo exportado"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "x")
+        cls.clinic = Clinic.objects.create(name="Clínica Parceira")
+        cls.vet = Veterinarian.objects.create(name="Dra. Ana")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.exam = Exam.objects.create(
+            date_realizacao=date(2024, 1, 10),
+            clinic_or_vet="Clínica Teste",
+            additional_clinic_or_vet=[f"CLINIC:{self.clinic.pk}", f"VET:{self.vet.pk}"],
+            exam_type="Hemograma",
+            pet_name="Rex",
+            tutor_name="Maria; Souza",
+            pdf_file=SimpleUploadedFile("laudo.pdf", self.PDF_BYTES, content_type="application/pdf"),
+        )
+
+    def _body(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_csv_uses_semicolons_and_a_bom(self):
+        body = self._body(self.client.get("/exames/exportar/")).decode("utf-8")
+
+        self.assertTrue(body.startswith("\ufeff"))
+        header, row = list(csv.reader(io.StringIO(body[1:]), delimiter=";"))
+        self.assertEqual(header[:4], ["ID", "Data de realização", "Clínica / Veterinário", "Clínicas / Vets adicionais"])
+        self.assertEqual(row[0], str(self.exam.pk))
+        self.assertEqual(row[1], "10/01/2024")
+        self.assertEqual(row[3], "Clínica Parceira, Dra. Ana")
+        self.assertIn("Maria; Souza", row)
+
+    def test_gzip_csv_has_the_same_content(self):
+        plain = self._body(self.client.get("/exames/exportar/"))
+        response = self.client.get("/exames/exportar/?gzip=1", HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(self._body(response)), plain)
+
+    def test_xlsx_is_a_valid_workbook(self):
+        body = self._body(self.client.get("/exames/exportar/?formato=xlsx"))
+
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            self.assertIsNone(archive.testzip())
+            for name in archive.namelist():
+                with self.subTest(name=name):
+                    ElementTree.fromstring(archive.read(name))
+            sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+
+        ns = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+        rows = [[cell.text for cell in row.iterfind("s:c/s:is/s:t", ns)] for row in sheet.iterfind("s:sheetData/s:row", ns)]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0][3], "Clínicas / Vets adicionais")
+        self.assertEqual(rows[1][3], "Clínica Parceira, Dra. Ana")
+
+    def test_zip_skips_missing_files_and_renames_duplicates(self):
+        ExamExtraPDF.objects.create(exam=self.exam, file=SimpleUploadedFile("laudo.pdf", b"%PDF-1.4 segundo"))
+        gone = ExamExtraPDF.objects.create(exam=self.exam, file=SimpleUploadedFile("video.avi", b"RIFF"))
+        gone.file.storage.delete(gone.file.name)
+
+        body = self._body(self.client.get("/exames/baixar/"))
+
+        folder = f"2024-01-10 Rex - Hemograma ({self.exam.pk})"
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.namelist(), [f"{folder}/laudo.pdf", f"{folder}/laudo (2).pdf"])
+            self.assertEqual(archive.read(f"{folder}/laudo.pdf"), self.PDF_BYTES)
+            self.assertEqual(archive.read(f"{folder}/laudo (2).pdf"), b"%PDF-1.4 segundo")
+
+    def test_zip_has_only_exams_the_user_can_view(self):
+        outsider = get_user_model().objects.create_user("outra", password="x")
+        Profile.objects.create(user=outsider, role="BASIC")
+        self.client.force_login(outsider)
+
+        body = self._body(self.client.get(f"/exames/baixar/?ids={self.exam.pk}"))
+
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            self.assertEqual(archive.namelist(), [])
+
+
+class SignedDownloadTests(TempMediaMixin, TestCase):
+    """Links assinados (file_delivery.make_download_token / signed_download)."""
+    PDF_BYTES = b"%PDF-1.4 laudo assinado"
+
+    def setUp(self):
+        self.exam = Exam.objects.create(
+            date_realizacao=date(2024, 1, 10),
+            clinic_or_vet="Clínica Teste",
+            exam_type="Hemograma",
+            pet_name="Rex",
+            tutor_name="Maria",
+            pdf_file=SimpleUploadedFile("laudo.pdf", self.PDF_BYTES, content_type="application/pdf"),
+        )
+
+    def _url(self, token):
+        return reverse("signed_download", args=[token])
+
+    def _token(self, **kwargs):
+        return make_download_token("exam", self.exam.pdf_file, sha256=self.exam.pdf_sha256, **kwargs)
+
+    def test_valid_token_serves_the_file_without_login(self):
+        response = self.client.get(self._url(self._token(filename="Laudo Rex.pdf")))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.PDF_BYTES)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertIn("Laudo Rex.pdf", response["Content-Disposition"])
+
+    @override_settings(SIGNED_DOWNLOAD_WINDOW=1)
+    def test_expired_token_returns_404(self):
+        response = self.client.get(self._url(self._token(max_age=-10)))
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_token_returns_404(self):
+        token = self._token()
+        tampered = token[:-1] + ("A" if token[-1] != "A" else "B")
+        forged = signing.dumps(
+            {"k": "exam", "n": self.exam.pdf_file.name, "h": "", "f": "", "e": time.time() + 3600},
+            salt=DOWNLOAD_TOKEN_SALT, key="outra-chave",
+        )
+
+        for token in (tampered, forged, "lixo"):
+            with self.subTest(token=token):
+                self.assertEqual(self.client.get(self._url(token)).status_code, 404)
+
+    def test_token_for_another_file_returns_404(self):
+        # arquivo que não existe mais no storage, ou campo que não é de arquivo de exame
+        missing = signing.dumps(
+            {"k": "exam", "n": "exam_files/00/nao-existe.pdf", "h": "", "f": "", "e": time.time() + 3600},
+            salt=DOWNLOAD_TOKEN_SALT, compress=True,
+        )
+        other_kind = signing.dumps(
+            {"k": "avatar", "n": self.exam.pdf_file.name, "h": "", "f": "", "e": time.time() + 3600},
+            salt=DOWNLOAD_TOKEN_SALT, compress=True,
+        )
+
+        for token in (missing, other_kind):
+            with self.subTest(token=token):
+                self.assertEqual(self.client.get(self._url(token)).status_code, 404)
+
+
+class ExamViewQueryCountTests(TempMediaMixin, TestCase):
+    """
+    exam_view carrega tudo com um número fixo de consultas, não importa
+    quantas clínicas/vets adicionais e quantos extras o exame tem.
+    """
+    MAX_QUERIES = 8
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.provider_user = User.objects.create_user("clinica", password="x")
+        Profile.objects.create(user=cls.provider_user, role="BASIC")
+        cls.clinic = Clinic.objects.create(
+            name="Clínica Teste", phone="11999990000", email="c@example.com", user=cls.provider_user,
+        )
+
+    def _exam(self, providers, extras):
+        clinics = [Clinic.objects.create(name=f"Clínica {i}") for i in range(providers)]
+        vets = [Veterinarian.objects.create(name=f"Vet {i}", surname="Silva") for i in range(providers)]
+
+        exam = Exam.objects.create(
+            date_realizacao=date(2024, 1, 10),
+            clinic_or_vet="Clínica Teste",
+            exam_type="Hemograma",
+            pet_name="Rex",
+            tutor_name="Maria",
+            assigned_user=self.provider_user,
+            additional_clinic_or_vet=[f"CLINIC:{c.pk}" for c in clinics] + [f"VET:{v.pk}" for v in vets],
+        )
+        exam.sync_providers(main_token=f"CLINIC:{self.clinic.pk}")
+        for i in range(extras):
+            ExamExtraPDF.objects.create(
+                exam=exam, file=SimpleUploadedFile(f"extra{i}.pdf", f"%PDF extra {i}".encode()),
+            )
+        return exam
+
+    def _queries_for(self, exam):
+        self.client.force_login(self.provider_user)
+        url = f"/exames/{exam.pk}/ver/"
+        self.client.get(url)  # sessão e cookie CSRF criados fora da contagem
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_providers_and_extras(self):
+        _, small = self._queries_for(self._exam(providers=1, extras=1))
+        response, large = self._queries_for(self._exam(providers=6, extras=8))
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, self.MAX_QUERIES)
+        self.assertContains(response, "Clínica 5")
+        self.assertContains(response, "Vet 5 Silva")
+        self.assertContains(response, "11999990000 | c@example.com")
+
+
+@override_settings(STORAGES={
+    "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+})
+class ExamListQueryCountTests(TestCase):
+    """
+    A lista de exames mostra as clínicas/vets adicionais de cada exame sem
+    uma consulta por exame (prefetch_additional_providers).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "x")
+        cls.clinics = [Clinic.objects.create(name=f"Clínica Extra {i}") for i in range(3)]
+        cls.vet = Veterinarian.objects.create(name="Paula", surname="Lima")
+
+    def _add_exams(self, count):
+        for i in range(count):
+            Exam.objects.create(
+                date_realizacao=date(2024, 1, 10),
+                clinic_or_vet="Clínica Teste",
+                exam_type="Hemograma",
+                pet_name=f"Pet {i}",
+                tutor_name="Maria",
+                additional_clinic_or_vet=[f"CLINIC:{self.clinics[i % 3].pk}", f"VET:{self.vet.pk}"],
+            )
+
+    def _queries(self):
+        self.client.force_login(self.admin)
+        self.client.get("/exames/")  # sessão e cookie CSRF fora da contagem
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/exames/")
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        self._add_exams(2)
+        _, small = self._queries()
+        self._add_exams(10)
+        response, large = self._queries()
+
+        self.assertEqual(small, large)
+        self.assertContains(response, "(Clínica Extra 2, Paula Lima)")
+
+    def test_prefetched_names_match_the_single_exam_lookup(self):
+        self._add_exams(3)
+        exams = list(Exam.objects.order_by("pk"))
+        expected = [exam.additional_clinic_or_vet_display for exam in exams]
+
+        with self.assertNumQueries(2):
+            prefetched = prefetch_additional_providers(exams)
+        with self.assertNumQueries(0):
+            self.assertEqual([exam.additional_clinic_or_vet_display for exam in prefetched], expected)
+
+
+@override_settings(UPLOAD_BATCH_WORKER="command")
+@override_settings(CHUNKED_UPLOAD_CHUNK_SIZE=8)
+class ChunkedUploadTests(TempMediaMixin, TestCase):
+    """Upload em partes, retomável (chunked_upload.py)."""
+    FILENAME = "Laudo Rex Poodle Ana Eco 01.02.2025.pdf"
+    CONTENT = b"%PDF-1.4 laudo em partes"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "x")
+        cls.clinic = Clinic.objects.create(name="Clínica Teste")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _start(self, size=None):
+        response = self.client.post(
+            "/exames/uploads/",
+            {"filename": self.FILENAME, "size": len(self.CONTENT) if size is None else size},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()["id"]
+
+    def _put(self, upload_id, offset, data):
+        return self.client.put(
+            f"/exames/uploads/{upload_id}/?offset={offset}", data, content_type="application/octet-stream",
+        )
+
+    def _send_all(self, upload_id, start=0):
+        for offset in range(start, len(self.CONTENT), 8):
+            response = self._put(upload_id, offset, self.CONTENT[offset:offset + 8])
+            self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_chunks_are_assembled_and_attached_to_the_exam_form(self):
+        upload_id = self._start()
+        self.assertEqual(self._send_all(upload_id).json()["offset"], len(self.CONTENT))
+        self.assertTrue(self.client.post(f"/exames/uploads/{upload_id}/concluir/").json()["complete"])
+
+        response = self.client.post("/exames/novo/", {
+            "clinic_or_vet": f"CLINIC:{self.clinic.pk}",
+            "pdf_upload": upload_id,
+        })
+
+        self.assertEqual(response.status_code, 302)
+        exam = Exam.objects.get()
+        self.assertEqual(exam.pet_name, "Rex")
+        self.assertEqual(exam.pdf_file.read(), self.CONTENT)
+        exam.pdf_file.close()
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    def test_wrong_offset_returns_409_with_the_server_offset(self):
+        upload_id = self._start()
+        self._put(upload_id, 0, self.CONTENT[:8])
+
+        for offset in (0, 16):
+            with self.subTest(offset=offset):
+                response = self._put(upload_id, offset, self.CONTENT[offset:offset + 8])
+                self.assertEqual(response.status_code, 409)
+                self.assertEqual(response.json()["offset"], 8)
+
+    def test_interrupted_chunk_resumes_from_what_arrived(self):
+        upload_id = self._start()
+        self._put(upload_id, 0, self.CONTENT[:8])
+
+        # a conexão cai depois de 3 dos 8 bytes da segunda parte
+        with self.assertRaises(ChunkedUploadError) as raised:
+            append_chunk(upload_id, self.admin, 8, io.BytesIO(self.CONTENT[8:11]), 8)
+        self.assertEqual(raised.exception.status, 400)
+
+        status = self.client.get(f"/exames/uploads/{upload_id}/").json()
+        self.assertEqual((status["offset"], status["complete"]), (11, False))
+
+        self._send_all(upload_id, start=11)
+        self.assertEqual(self.client.post(f"/exames/uploads/{upload_id}/concluir/").status_code, 200)
+        upload = ChunkedUpload.objects.get(pk=upload_id)
+        self.assertEqual(part_path(upload).read_bytes(), self.CONTENT)
+
+    def test_finalize_checks_the_size(self):
+        upload_id = self._start()
+        self._put(upload_id, 0, self.CONTENT[:8])
+        response = self.client.post(f"/exames/uploads/{upload_id}/concluir/")
+        self.assertEqual(response.status_code, 409)
+
+        self._send_all(upload_id, start=8)
+        # arquivo parcial mexido por fora: o tamanho no disco não bate
+        with open(part_path(ChunkedUpload.objects.get(pk=upload_id)), "ab") as part:
+            part.write(b"sobra")
+        response = self.client.post(f"/exames/uploads/{upload_id}/concluir/")
+        self.assertEqual(response.status_code, 410)
+        self.assertFalse(ChunkedUpload.objects.get(pk=upload_id).is_complete)
+
+    def test_oversized_chunk_and_file_are_rejected(self):
+        upload_id = self._start()
+
+        response = self._put(upload_id, 0, self.CONTENT[:9])
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json()["offset"], 0)
+
+        with self.settings(CHUNKED_UPLOAD_MAX_SIZE=10):
+            response = self.client.post(
+                "/exames/uploads/", {"filename": self.FILENAME, "size": 11}, content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 413)
+
+
+class UploadBatchTests(TempMediaMixin, TestCase):
+    """Upload em massa em segundo plano (batch_upload.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "x")
+        cls.clinic = Clinic.objects.create(name="Clínica Teste")
+        ExamTypeAlias.objects.create(abbreviation="eco", full_name="Ecocardiograma")
+
+    def _pdf(self, name, content=None):
+        return SimpleUploadedFile(name, content or f"%PDF-1.4 {name}".encode(), content_type="application/pdf")
+
+    def _stage(self, names):
+        return stage_batch(self.admin, [self._pdf(name) for name in names], provider=None, notify_provider=False)
+
+    def test_upload_creates_exams_in_background(self):
+        self.client.force_login(self.admin)
+        files = [
+            self._pdf("Laudo Rex Poodle Ana_Souza Eco 01.02.2025.pdf"),
+            self._pdf("Laudo Mia SRD Ana_Souza Raio_X 02.02.2025.pdf"),
+        ]
+
+        with self.settings(UPLOAD_BATCH_WORKER="inline"), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/exames/novo-multiplo/", {
+                "clinic_or_vet": f"CLINIC:{self.clinic.pk}",
+                "pdf_files": files,
+            })
+
+        batch = UploadBatch.objects.get()
+        self.assertRedirects(response, f"/exames/lotes/{batch.pk}/", fetch_redirect_response=False)
+        self.assertEqual(batch.status, UploadBatch.STATUS_DONE)
+
+        exams = {exam.pet_name: exam for exam in Exam.objects.all()}
+        self.assertEqual(set(exams), {"Rex", "Mia"})
+        self.assertEqual(exams["Rex"].exam_type, "Ecocardiograma")
+        self.assertEqual(exams["Rex"].tutor_name, "Ana Souza")
+        self.assertEqual(exams["Rex"].date_realizacao, date(2025, 2, 1))
+        self.assertEqual(exams["Rex"].clinic_or_vet, "Clínica Teste")
+        self.assertEqual(exams["Mia"].exam_type, "Raio X")
+        self.assertEqual(exams["Rex"].pdf_file.read(), b"%PDF-1.4 " + files[0].name.encode())
+        self.assertEqual(Tutor.objects.filter(name="Ana Souza").count(), 1)
+        self.assertEqual(Pet.objects.filter(tutor__name="Ana Souza").count(), 2)
+        self.assertEqual(
+            set(ExamProvider.objects.values_list("exam_id", "clinic_id", "role")),
+            {(exam.pk, self.clinic.pk, ExamProvider.ROLE_MAIN) for exam in exams.values()},
+        )
+
+        progress = self.client.get(f"/exames/lotes/{batch.pk}/?formato=json").json()
+        self.assertTrue(progress["finished"])
+        self.assertEqual((progress["total"], progress["done"], progress["errors"]), (2, 2, 0))
+        self.assertEqual({item["exam_id"] for item in progress["items"]}, {e.pk for e in exams.values()})
+        self.assertFalse(batch_dir(batch).exists())
+
+    def test_failing_item_does_not_stop_the_others(self):
+        batch = self._stage([
+            "Laudo Rex Poodle Ana Eco 01.02.2025.pdf",
+            "Laudo Mia SRD Ana Eco 01.02.2025.pdf",
+            "Laudo Bob SRD Ana Eco 01.02.2025.pdf",
+        ])
+        missing = batch.items.get(position=1)
+        Path(missing.staged_path).unlink()
+
+        process_batch(batch.pk)
+
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, UploadBatch.STATUS_DONE)
+        statuses = dict(batch.items.values_list("position", "status"))
+        self.assertEqual(statuses, {
+            0: UploadBatchItem.STATUS_DONE,
+            1: UploadBatchItem.STATUS_ERROR,
+            2: UploadBatchItem.STATUS_DONE,
+        })
+        missing.refresh_from_db()
+        self.assertIn("Falha ao gravar", missing.error)
+        self.assertEqual(sorted(Exam.objects.values_list("pet_name", flat=True)), ["Bob", "Rex"])
+
+    def test_batch_is_processed_only_once(self):
+        batch = self._stage(["Laudo Rex Poodle Ana Eco 01.02.2025.pdf"])
+
+        self.assertIsNotNone(process_batch(batch.pk))
+        self.assertIsNone(process_batch(batch.pk))
+        self.assertEqual(Exam.objects.count(), 1)
+
+    def test_running_batch_with_recent_heartbeat_is_not_requeued(self):
+        batch = self._stage(["Laudo Rex Poodle Ana Eco 01.02.2025.pdf"])
+        self.assertTrue(_claim(batch.pk))
+        UploadBatch.objects.filter(pk=batch.pk).update(started_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(requeue_stale_batches(), 0)
+        self.assertFalse(_claim(batch.pk))
+
+    def test_worker_that_lost_the_claim_does_not_create_exams(self):
+        batch = self._stage(["Laudo Rex Poodle Ana Eco 01.02.2025.pdf"])
+
+        # worker A pega o lote e para de dar sinal de vida
+        self.assertTrue(_claim(batch.pk))
+        stalled = UploadBatch.objects.get(pk=batch.pk)
+        old = timezone.now() - timedelta(days=1)
+        UploadBatch.objects.filter(pk=batch.pk).update(started_at=old, heartbeat_at=old)
+        stalled.started_at = old
+
+        # o lote volta para a fila e o worker B processa
+        self.assertEqual(requeue_stale_batches(), 1)
+        self.assertIsNotNone(process_batch(batch.pk))
+        self.assertEqual(Exam.objects.count(), 1)
+
+        # worker A não consegue mais gravar nada
+        with self.assertRaises(BatchClaimLost):
+            _heartbeat(stalled)
+        with self.assertRaises(BatchClaimLost):
+            _process_items(stalled)
+        self.assertEqual(Exam.objects.count(), 1)
+
+    def test_worker_that_lost_the_claim_writes_no_files(self):
+        batch = self._stage(["Laudo Rex Poodle Ana Eco 01.02.2025.pdf"])
+        self.assertTrue(_claim(batch.pk))
+        stalled = UploadBatch.objects.get(pk=batch.pk)
+        UploadBatch.objects.filter(pk=batch.pk).update(started_at=timezone.now() + timedelta(seconds=1))
+        stored = Path(self.media_root) / "exam_files"
+        before = set(stored.rglob("*"))
+
+        with self.assertRaises(BatchClaimLost):
+            _process_items(stalled)
+        self.assertEqual(set(stored.rglob("*")), before)
+
+    @override_settings(SITE_URL="https://lumavet.example/", EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+    def test_notification_links_use_site_url(self):
+        batch = self._stage(["Laudo Rex Poodle Ana Eco 01.02.2025.pdf"])
+        UploadBatch.objects.filter(pk=batch.pk).update(notify_provider=True, provider={
+            "kind": "CLINIC", "id": self.clinic.pk, "label": "Clínica Teste", "email": "clinica@example.com",
+        })
+
+        process_batch(batch.pk)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("https://lumavet.example/login/", mail.outbox[0].body)
+
+    def _zip(self, members):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zf:
+            for name, content in members:
+                zf.writestr(name, content)
+        return SimpleUploadedFile("laudos.zip", buffer.getvalue(), content_type="application/zip")
+
+    def _clean_zip(self, archive):
+        form = MultiExamUploadForm()
+        form.cleaned_data = {"zip_file": archive}
+        return form.clean_zip_file()
+
+    def test_zip_junk_entries_do_not_count_towards_member_limit(self):
+        archive = self._zip([
+            ("laudos/", b""),
+            ("laudos/Laudo Rex Poodle Ana_Souza Eco 01.02.2025.pdf", b"%PDF-1.4 rex"),
+            ("laudos/.DS_Store", b"x"),
+            ("__MACOSX/laudos/._Laudo Rex Poodle Ana_Souza Eco 01.02.2025.pdf", b"x"),
+        ])
+
+        with self.settings(UPLOAD_ZIP_MAX_MEMBERS=1):
+            self.assertIs(self._clean_zip(archive), archive)
+
+    def test_zip_total_size_is_capped(self):
+        archive = self._zip([
+            ("Laudo Rex Poodle Ana_Souza Eco 01.02.2025.pdf", b"%PDF-1.4 " + b"r" * 100),
+            ("Laudo Mia SRD Ana_Souza Eco 02.02.2025.pdf", b"%PDF-1.4 " + b"m" * 100),
+        ])
+
+        with self.settings(UPLOAD_ZIP_MAX_TOTAL_SIZE=150):
+            with self.assertRaises(ValidationError):
+                self._clean_zip(archive)
+
+            # a extração também confere: o que passa do total vira item com erro
+            batch = stage_batch(self.admin, [], provider=None, notify_provider=False, archive=archive)
+
+        items = list(batch.items.order_by("position"))
+        self.assertEqual([item.status for item in items], [UploadBatchItem.STATUS_PENDING, UploadBatchItem.STATUS_ERROR])
+        self.assertIn("tamanho total", items[1].error)
+
+
+class ListCacheTests(TestCase):
+    """Contagens guardadas em list_cache.py, só com cache compartilhado."""
+
+    def test_disabled_with_process_local_cache(self):
+        with self.settings(LIST_CACHE_ENABLED=None):
+            self.assertFalse(list_cache_enabled())
+        with self.settings(
+            LIST_CACHE_ENABLED=None,
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                                "LOCATION": tempfile.gettempdir()}},
+        ):
+            self.assertTrue(list_cache_enabled())
+
+    def test_count_is_cached_until_the_version_changes(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        with self.settings(LIST_CACHE_ENABLED=False):
+            self.assertEqual(cached_count(("teste", "off"), compute), 1)
+            self.assertEqual(cached_count(("teste", "off"), compute), 2)
+
+        with self.settings(LIST_CACHE_ENABLED=True):
+            self.assertEqual(cached_count(("teste", "on"), compute), 3)
+            self.assertEqual(cached_count(("teste", "on"), compute), 3)
+            bump_list_version()
+            self.assertEqual(cached_count(("teste", "on"), compute), 4)
+
+
+class ExamTypeAliasCacheTests(TestCase):
+    """
+    Siglas em memória (exam_types.py): uma alteração feita em outro worker
+    aparece aqui na próxima tradução, com ou sem cache compartilhado.
+    """
+
+    def setUp(self):
+        self.alias = ExamTypeAlias.objects.create(abbreviation="eco", full_name="Ecocardiograma")
+
+    def test_edit_from_another_worker_with_local_cache(self):
+        self.assertFalse(shared_cache_available())
+        self.assertEqual(translate_many(["eco", "rx"]), {"eco": "Ecocardiograma", "rx": "rx"})
+
+        # update() não dispara sinal neste processo, como um save() em outro worker
+        ExamTypeAlias.objects.filter(pk=self.alias.pk).update(
+            full_name="Ecocardiograma Doppler", updated_at=timezone.now(),
+        )
+        ExamTypeAlias.objects.bulk_create([ExamTypeAlias(abbreviation="rx", full_name="Raio X")])
+
+        self.assertEqual(translate_many(["eco", "rx"]), {"eco": "Ecocardiograma Doppler", "rx": "Raio X"})
+
+        ExamTypeAlias.objects.filter(abbreviation="rx").delete()
+        self.assertEqual(translate_many(["rx"]), {"rx": "rx"})
+
+    def test_edit_with_shared_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        shared = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": cache_dir}}
+
+        with self.settings(CACHES=shared):
+            self.assertTrue(shared_cache_available())
+            self.assertEqual(translate_many(["eco"]), {"eco": "Ecocardiograma"})
+
+            self.alias.full_name = "Ecocardiograma Doppler"
+            with self.captureOnCommitCallbacks(execute=True):
+                self.alias.save()
+
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(translate_many(["eco"]), {"eco": "Ecocardiograma Doppler"})
+                self.assertEqual(translate_many(["eco"]), {"eco": "Ecocardiograma Doppler"})
+            # recarrega uma vez; a segunda tradução não consulta o banco
+            self.assertEqual(len(queries), 1)
+
+
+@override_settings(LIST_CACHE_ENABLED=True, STORAGES={
+    "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+})
+class ExamListPageCacheTests(TestCase):
+    """HTML guardado da lista de exames, pela versão das listas (list_cache.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "x")
+        cls.exam = Exam.objects.create(
+            date_realizacao=date(2024, 1, 10),
+            clinic_or_vet="Clínica Teste",
+            exam_type="Hemograma",
+            pet_name="Rex",
+            tutor_name="Maria",
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.client.get("/exames/")  # cria o cookie CSRF
+
+    def test_cache_hit_does_not_query_the_exams(self):
+        self.assertContains(self.client.get("/exames/"), "Rex")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/exames/")
+        self.assertContains(response, "Rex")
+        exam_table = Exam._meta.db_table
+        self.assertFalse([q["sql"] for q in queries if exam_table in q["sql"]])
+
+    def test_save_is_not_served_from_cache(self):
+        self.assertContains(self.client.get("/exames/"), "Rex")
+
+        self.exam.pet_name = "Thor"
+        self.exam.save()
+
+        response = self.client.get("/exames/")
+        self.assertContains(response, "Thor")
+        self.assertNotContains(response, "Rex")
+
+    def test_queryset_update_with_bump_is_not_served_from_cache(self):
+        self.assertContains(self.client.get("/exames/"), "Rex")
+
+        Exam.objects.filter(pk=self.exam.pk).update(pet_name="Thor", updated_at=timezone.now())
+        bump_list_version()
+
+        response = self.client.get("/exames/")
+        self.assertContains(response, "Thor")
+        self.assertNotContains(response, "Rex")
+
+
+@override_settings(LIST_CACHE_ENABLED=True)
+class ConditionalGetTests(TempMediaMixin, TestCase):
+    """ETag / 304 das páginas de exames e gestão (conditional.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "x")
+        cls.exam = Exam.objects.create(
+            date_realizacao=date(2024, 1, 10),
+            clinic_or_vet="Clínica Teste",
+            exam_type="Hemograma",
+            pet_name="Rex",
+            tutor_name="Maria",
+        )
+        cls.tutor = Tutor.objects.create(name="Maria")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.client.get("/exames/")  # cria o cookie CSRF
+
+    def _etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        return response["ETag"]
+
+    def _assert_changed(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_exams_list(self):
+        etag = self._etag("/exames/")
+        self.assertNotEqual(self._etag("/exames/?q=rex"), etag)
+
+        self.exam.pet_name = "Thor"
+        self.exam.save()
+        self._assert_changed("/exames/", etag)
+
+    def test_exam_view(self):
+        url = f"/exames/{self.exam.pk}/ver/"
+        etag = self._etag(url)
+
+        ExamExtraPDF.objects.create(exam=self.exam, file=SimpleUploadedFile("extra.pdf", b"%PDF-1.4 extra"))
+        self._assert_changed(url, etag)
+
+        etag = self._etag(url)
+        self.exam.observations = "Repetir em 30 dias"
+        self.exam.save()
+        self._assert_changed(url, etag)
+
+    def test_management_view(self):
+        url = "/gestao/tutores/"
+        etag = self._etag(url)
+
+        self.tutor.phone = "11999990000"
+        self.tutor.save()
+        self._assert_changed(url, etag)
+
+        etag = self._etag(url)
+        Tutor.objects.create(name="João")
+        self._assert_changed(url, etag)
+
+
+class ExamFacetsTests(TestCase):
+    """
+    Contagens das facetas da lista (facets.py): uma consulta só, e cada
+    faceta contada com os filtros das outras.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        rows = [
+            (date(2024, 1, 10), "Hemograma", "Clínica A", today + timedelta(days=5)),
+            (date(2024, 1, 15), "Hemograma", "Clínica B", None),
+            (date(2024, 2, 1), "Raio X", "Clínica A", today - timedelta(days=5)),
+            (date(2024, 3, 1), "Raio X", "Clínica B", today + timedelta(days=1)),
+        ]
+        cls.exams = [
+            Exam.objects.create(
+                date_realizacao=realizacao, exam_type=exam_type, clinic_or_vet=provider,
+                retorno_previsto=retorno, pet_name="Rex", tutor_name="Maria",
+            )
+            for realizacao, exam_type, provider, retorno in rows
+        ]
+
+    def _facets(self, query):
+        facets = ExamFacets(QueryDict(query))
+        exams = facets.apply(Exam.objects.all())
+        with CaptureQueriesContext(connection) as queries:
+            counts = facets.counts()
+        self.assertEqual(len(queries), 1)
+        return counts, set(exams.values_list("pk", flat=True))
+
+    def _pks(self, *indexes):
+        return {self.exams[index].pk for index in indexes}
+
+    def test_counts_without_filters(self):
+        counts, pks = self._facets("")
+
+        self.assertEqual(pks, self._pks(0, 1, 2, 3))
+        self.assertEqual(counts["exam_types"], [("Hemograma", 2, False), ("Raio X", 2, False)])
+        self.assertEqual(counts["providers"], [("Clínica A", 2, False), ("Clínica B", 2, False)])
+        self.assertEqual(counts["retorno_pending"], 2)
+
+    def test_each_facet_is_counted_with_the_other_filters(self):
+        counts, pks = self._facets("tipo=Hemograma&de=2024-01-01&ate=2024-02-28")
+
+        self.assertEqual(pks, self._pks(0, 1))
+        # o próprio filtro de tipo não entra: mostra as alternativas dentro do período
+        self.assertEqual(counts["exam_types"], [("Hemograma", 2, True), ("Raio X", 1, False)])
+        self.assertEqual(counts["providers"], [("Clínica A", 1, False), ("Clínica B", 1, False)])
+        self.assertEqual(counts["retorno_pending"], 1)
+
+    def test_pending_retorno_scopes_the_other_counts(self):
+        counts, pks = self._facets("retorno=pendente&clinica=Clínica A")
+
+        self.assertEqual(pks, self._pks(0))
+        self.assertEqual(counts["exam_types"], [("Hemograma", 1, False)])
+        self.assertEqual(counts["providers"], [("Clínica A", 1, True), ("Clínica B", 1, False)])
+        self.assertEqual(counts["retorno_pending"], 1)
+
+    def test_selected_value_without_matches_is_still_listed(self):
+        counts, pks = self._facets("tipo=Ultrassom")
+
+        self.assertEqual(pks, set())
+        self.assertIn(("Ultrassom", 0, True), counts["exam_types"])
+
+
+class CursorPaginationTests(TestCase):
+    """
+    Paginação por cursor (pagination.py): andando para frente e para trás
+    por todas as páginas, em cada ordenação da lista de exames, cada exame
+    aparece exatamente uma vez, inclusive com empates e valores NULL.
+    """
+    PER_PAGE = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        base = timezone.now().replace(microsecond=0)
+        # poucos valores distintos, para ter empates resolvidos pelo id
+        for i in range(11):
+            exam = Exam.objects.create(
+                date_realizacao=date(2024, 1, 1 + i % 3),
+                clinic_or_vet=f"Clinica {i % 2}",
+                exam_type=f"Exame {i % 4}",
+                pet_name=f"Pet {i % 3}",
+                breed="" if i % 5 == 0 else f"Raca {i % 2}",
+                tutor_name=f"Tutor {i % 4}",
+                retorno_previsto=None if i % 3 == 0 else date(2024, 2, 1 + i % 2),
+            )
+            Exam.objects.filter(pk=exam.pk).update(created_at=base - timedelta(hours=i % 4))
+
+    def _expected(self, field_name, descending):
+        def sort_key(exam):
+            value = getattr(exam, field_name)
+            # NULL por último na ordem crescente, como em pagination._ordering
+            return (value is None, value if value is not None else 0, exam.pk)
+
+        ordered = [exam.pk for exam in sorted(Exam.objects.all(), key=sort_key)]
+        return ordered[::-1] if descending else ordered
+
+    def _walk(self, field_name, descending, order_key, cursor=None, backwards=False):
+        pages = []
+        while True:
+            page = paginate_by_cursor(
+                Exam.objects.all(), field_name,
+                descending=descending, cursor=cursor, per_page=self.PER_PAGE, order_key=order_key,
+            )
+            pages.append([exam.pk for exam in page])
+            cursor = page.previous_cursor if backwards else page.next_cursor
+            if cursor is None:
+                return pages, page
+            self.assertLessEqual(len(pages), 20, "paginação não termina")
+
+    def test_forward_and_backward_walks_cover_every_row_once(self):
+        for order_key, field_name in EXAM_ORDER_MAP.items():
+            for descending in (False, True):
+                with self.subTest(order=order_key, descending=descending):
+                    expected = self._expected(field_name, descending)
+
+                    forward, last_page = self._walk(field_name, descending, order_key)
+                    self.assertEqual([pk for page in forward for pk in page], expected)
+                    self.assertFalse(last_page.has_next())
+
+                    # volta da última página até a primeira pelo previous_cursor
+                    backward, first_page = self._walk(
+                        field_name, descending, order_key,
+                        cursor=last_page.previous_cursor, backwards=True,
+                    )
+                    backward.reverse()
+                    self.assertEqual([pk for page in backward for pk in page] + forward[-1], expected)
+                    self.assertFalse(first_page.has_previous())
+
+    def test_nullable_sort_has_nulls_at_the_end(self):
+        forward, _ = self._walk("retorno_previsto", False, "retorno")
+        pks = [pk for page in forward for pk in page]
+        nulls = set(Exam.objects.filter(retorno_previsto__isnull=True).values_list("pk", flat=True))
+        self.assertEqual(set(pks[-len(nulls):]), nulls)
+
+    def test_invalid_or_foreign_cursor_starts_from_the_first_page(self):
+        first = paginate_by_cursor(
+            Exam.objects.all(), "pet_name", descending=False, cursor=None, per_page=self.PER_PAGE, order_key="pet",
+        )
+        other = paginate_by_cursor(
+            Exam.objects.all(), "tutor_name", descending=False, cursor=None, per_page=self.PER_PAGE, order_key="tutor",
+        )
+        for cursor in (first.next_cursor[:-2] + "xx", "lixo", other.next_cursor):
+            with self.subTest(cursor=cursor):
+                page = paginate_by_cursor(
+                    Exam.objects.all(), "pet_name",
+                    descending=False, cursor=cursor, per_page=self.PER_PAGE, order_key="pet",
+                )
+                self.assertEqual([e.pk for e in page], [e.pk for e in first])
+                self.assertFalse(page.has_previous())
+
+
+class ContentAddressedStorageTests(TempMediaMixin, TestCase):
+    """
+    Arquivos dos exames gravados pelo hash (storage.py): o mesmo conteúdo
+    ocupa um arquivo só, e ele só sai do disco com a última referência.
+    """
+    PDF_BYTES = b"%PDF-1.4 laudo repetido"
+    EXTRA_STORAGES = {
+        "exam_files": {"BACKEND": "accounts.storage.ContentAddressedStorage"},
+    }
+
+    def _exam(self, content=None, name="laudo.pdf"):
+        return Exam.objects.create(
+            date_realizacao=date(2024, 1, 10),
+            clinic_or_vet="Clínica Teste",
+            exam_type="Hemograma",
+            pet_name="Rex",
+            tutor_name="Maria",
+            pdf_file=SimpleUploadedFile(name, content or self.PDF_BYTES, content_type="application/pdf"),
+        )
+
+    def _on_disk(self, name):
+        return (Path(self.media_root) / name).exists()
+
+    def _refs(self, name):
+        stored = StoredFile.objects.filter(name=name).first()
+        return stored.ref_count if stored else 0
+
+    def _files(self):
+        return {path for path in Path(self.media_root).rglob("*") if path.is_file()}
+
+    def test_same_bytes_are_stored_once(self):
+        content = self.PDF_BYTES + b" (dedup)"
+        before = self._files()
+        first = self._exam(content, name="laudo-a.pdf")
+        second = self._exam(content, name="Laudo B.PDF")
+        extra = ExamExtraPDF.objects.create(
+            exam=second, file=SimpleUploadedFile("extra.pdf", content),
+        )
+
+        name = first.pdf_file.name
+        self.assertTrue(is_content_addressed(name))
+        self.assertEqual(second.pdf_file.name, name)
+        self.assertEqual(extra.file.name, name)
+        self.assertEqual(self._refs(name), 3)
+        self.assertEqual(self._files() - before, {Path(self.media_root) / name})
+        self.assertEqual(second.pdf_display_name, "Laudo B.PDF")
+
+    def test_truncated_target_is_rewritten(self):
+        content = self.PDF_BYTES + b" (interrompido)"
+        name = content_address(hashlib.sha256(content).hexdigest(), "laudo.pdf")
+        path = Path(self.media_root) / name
+        path.parent.mkdir(parents=True)
+        path.write_bytes(content[:5])
+
+        saved = exam_file_storage().save("laudo.pdf", ContentFile(content))
+
+        self.assertEqual(saved, name)
+        self.assertEqual(path.read_bytes(), content)
+        self.assertEqual([p.name for p in path.parent.iterdir()], [path.name])
+
+    def test_concurrent_saves_of_the_same_content(self):
+        content = self.PDF_BYTES * 4096
+        storage = exam_file_storage()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            names = list(pool.map(
+                lambda _: storage.save("laudo.pdf", ContentFile(content)), range(8),
+            ))
+
+        self.assertEqual(len(set(names)), 1)
+        path = Path(self.media_root) / names[0]
+        self.assertEqual(path.read_bytes(), content)
+        self.assertEqual([p.name for p in path.parent.iterdir()], [path.name])
+
+    def test_file_is_deleted_only_with_the_last_reference(self):
+        first = self._exam()
+        second = self._exam()
+        name = first.pdf_file.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(self._on_disk(name))
+        self.assertEqual(self._refs(name), 1)
+        self.assertEqual(second.pdf_file.open("rb").read(), self.PDF_BYTES)
+        second.pdf_file.close()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(self._on_disk(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+    def test_replacing_the_pdf_releases_the_old_file(self):
+        keeper = self._exam()
+        exam = self._exam()
+        old_name = exam.pdf_file.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            exam.pdf_file = SimpleUploadedFile("novo.pdf", b"%PDF-1.4 laudo corrigido")
+            exam.save()
+
+        self.assertNotEqual(exam.pdf_file.name, old_name)
+        self.assertEqual(self._refs(old_name), 1)
+        self.assertEqual(self._refs(exam.pdf_file.name), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            keeper.delete()
+        self.assertFalse(self._on_disk(old_name))
+        self.assertTrue(self._on_disk(exam.pdf_file.name))
+
+
+class EnsureTutorsAndPetsTests(TestCase):
+    """Versão em lote do ensure_tutor_and_pet (views.ensure_tutors_and_pets)."""
+
+    def setUp(self):
+        self.ana = Tutor.objects.create(name="Ana", email="", phone="")
+        self.rex = Pet.objects.create(name="Rex", breed="SRD", tutor=self.ana)
+        self.bia = Tutor.objects.create(name="Bia", email="bia@example.com", phone="")
+
+    def test_mixed_existing_new_and_repeated_rows(self):
+        rows = [
+            ("ana", "REX", "Poodle", "ana@example.com", ""),   # tutor e pet existentes
+            ("Bia", "Mia", "", "outro@example.com", "(11) 99999-0000"),
+            ("Caio", "Toto", "Beagle", "", ""),                 # tudo novo
+            ("caio", "toto", "Pug", "caio@example.com", ""),    # repetido no lote
+            ("", "Sem tutor", "", "", ""),
+            ("Ana", "Luna", "", "", "(21) 98888-0000"),
+        ]
+        result = ensure_tutors_and_pets(rows)
+
+        self.assertEqual(len(result), len(rows))
+        self.assertEqual(result[0], (self.ana, self.rex))
+        self.assertEqual(result[4], (None, None))
+        self.assertIs(result[2][0], result[3][0])
+        self.assertIs(result[2][1], result[3][1])
+
+        self.ana.refresh_from_db()
+        self.bia.refresh_from_db()
+        self.rex.refresh_from_db()
+        # só preenche o que estava vazio; a raça SRD melhora
+        self.assertEqual((self.ana.email, self.ana.phone), ("ana@example.com", "(21) 98888-0000"))
+        self.assertEqual((self.bia.email, self.bia.phone), ("bia@example.com", "(11) 99999-0000"))
+        self.assertEqual(self.rex.breed, "Poodle")
+
+        caio = Tutor.objects.get(name__iexact="caio")
+        self.assertEqual(caio.email, "caio@example.com")
+        self.assertEqual(list(caio.pets.values_list("name", "breed")), [("Toto", "Beagle")])
+        self.assertEqual(Tutor.objects.count(), 3)
+        self.assertEqual(
+            sorted(Pet.objects.values_list("tutor__name", "name", "breed")),
+            [("Ana", "Luna", "SRD"), ("Ana", "Rex", "Poodle"), ("Bia", "Mia", "SRD"), ("Caio", "Toto", "Beagle")],
+        )
+        for tutor, pet in result:
+            if tutor is not None:
+                self.assertEqual(pet.tutor_id, tutor.pk)
+
+    def test_same_result_as_one_row_at_a_time(self):
+        rows = [
+            ("Ana", "Rex", "Poodle", "ana@example.com", ""),
+            ("Dora", "Luna", "", "", ""),
+            ("dora", "luna", "Pug", "", "(11) 97777-0000"),
+            ("Bia", "Mia", "Siames", "", ""),
+        ]
+
+        def snapshot():
+            return (
+                sorted(Tutor.objects.values_list("name", "email", "phone")),
+                sorted(Pet.objects.values_list("tutor__name", "name", "breed")),
+            )
+
+        with transaction.atomic():
+            for row in rows:
+                ensure_tutor_and_pet(*row)
+            expected = snapshot()
+            transaction.set_rollback(True)
+
+        ensure_tutors_and_pets(rows)
+        self.assertEqual(snapshot(), expected)
+
+    def _queries(self, rows):
+        with CaptureQueriesContext(connection) as queries:
+            ensure_tutors_and_pets(rows)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        def rows(prefix, size):
+            return [("Ana", f"{prefix} velho {i}", "", "", "") for i in range(size)] + [
+                (f"{prefix} Tutor {i}", f"Pet {i}", "Poodle", "", "") for i in range(size)
+            ]
+
+        small = self._queries(rows("A", 2))
+        large = self._queries(rows("B", 40))
+        self.assertEqual(small, large)
+
+
+class PdfOptimizeTests(TestCase):
+    """Otimização dos PDFs no upload (pdf_optimize.py)."""
+
+    def _pdf(self, pages=3):
+        pikepdf = pdf_optimize.pikepdf
+        pdf = pikepdf.new()
+        for number in range(pages):
+            pdf.add_blank_page()
+            pdf.pages[-1].obj.Contents = pdf.make_stream(b"BT 72 712 Td (Laudo %d) Tj ET\n" % number * 200)
+        buffer = io.BytesIO()
+        pdf.save(buffer, compress_streams=False, object_stream_mode=pikepdf.ObjectStreamMode.disable)
+        return buffer.getvalue()
+
+    @skipUnless(pdf_optimize.pikepdf, "pikepdf não instalado")
+    @override_settings(PDF_OPTIMIZE_ON_UPLOAD=True)
+    def test_optimized_pdf_is_valid_and_not_larger(self):
+        original = self._pdf()
+        uploaded = SimpleUploadedFile("laudo.pdf", original, content_type="application/pdf")
+
+        optimized = optimize_uploaded_pdf(uploaded)
+        data = optimized.read()
+
+        # os streams sem compressão do original garantem um resultado menor
+        self.assertIsNot(optimized, uploaded)
+        self.assertLess(len(data), len(original))
+        self.assertEqual(optimized.bytes_saved, len(original) - len(data))
+        with pdf_optimize.pikepdf.open(io.BytesIO(data)) as pdf:
+            self.assertEqual(len(pdf.pages), 3)
+            self.assertTrue(pdf.is_linearized)
+
+    @skipUnless(pdf_optimize.pikepdf, "pikepdf não instalado")
+    @override_settings(PDF_OPTIMIZE_ON_UPLOAD=True)
+    def test_broken_pdf_is_kept_as_uploaded(self):
+        uploaded = SimpleUploadedFile("laudo.pdf", b"%PDF-1.4 corrompido", content_type="application/pdf")
+
+        self.assertIs(optimize_uploaded_pdf(uploaded), uploaded)
+        self.assertEqual(uploaded.read(), b"%PDF-1.4 corrompido")
+
+    @override_settings(PDF_OPTIMIZE_ON_UPLOAD=False)
+    def test_disabled_leaves_the_upload_unchanged(self):
+        content = self._pdf() if pdf_optimize.pikepdf else b"%PDF-1.4 laudo"
+        uploaded = SimpleUploadedFile("laudo.pdf", content, content_type="application/pdf")
+
+        self.assertIs(optimize_uploaded_pdf(uploaded), uploaded)
+        self.assertEqual(uploaded.read(), content)
@@ -10,6 +10,12 @@ urlpatterns = [
 
     path('exames/', views.exams_list, name='exames'),
     path('exames/novo/', views.exam_upload, name='exam_upload'),
+    path('exames/uploads/', views.chunked_upload_start, name='chunked_upload_start'),
+    path('exames/uploads/<uuid:upload_id>/', views.chunked_upload_detail, name='chunked_upload_detail'),
+    path('exames/uploads/<uuid:upload_id>/concluir/', views.chunked_upload_finalize, name='chunked_upload_finalize'),
+    path('exames/exportar/', views.exams_export, name='exams_export'),
+    path('exames/baixar/', views.exams_download_zip, name='exams_download_zip'),
+    path('exames/sugestoes/', views.exams_suggest, name='exams_suggest'),
     path('exames/<int:pk>/', views.exam_detail, name='exam_detail'),
     path('exames/<int:pk>/excluir/', views.exam_delete, name='exam_delete'),
     path('exames/<int:pk>/encaminhar/', views.exam_forward, name='exam_forward'),
@@ -27,11 +33,13 @@ urlpatterns = [
     path("gestao/<str:category>/<int:pk>/remover-acesso/", views.management_remove_access, name="gestao_remove_access"),
     path('exames/<int:pk>/pdf/', views.exam_pdf, name='exam_pdf'),
     path('exames/novo-multiplo/', views.exam_upload_multi, name='exam_upload_multi'),
+    path('exames/lotes/<uuid:batch_id>/', views.upload_batch_status, name='upload_batch_status'),
     path("exames/tipos/", views.exam_types_list, name="exam_types"),
     path("exames/tipos/novo/", views.exam_types_create, name="exam_types_create"),
     path("exames/tipos/<int:pk>/excluir/", views.exam_types_delete, name="exam_types_delete"),
     path("exames/<int:pk>/ver/", views.exam_view, name="exam_view"),
     path("exames/<int:pk>/extras/<int:extra_pk>/pdf/", views.exam_extra_pdf, name="exam_extra_pdf"),
     path("ativar/<uidb64>/<token>/", views.activate_account, name="activate_account"),
+    path("arquivos/<str:token>/", views.signed_download, name="signed_download"),
 ]
 
@@ -14,7 +14,6 @@ from .notifications import (
     send_tutor_exam_email,
     send_provider_exam_email,
     send_provider_exam_resend_email,
-    send_provider_bulk_exam_email,
     send_provider_return_email,
     send_portal_access_email,
     send_contact_updated_email,
@@ -25,27 +24,71 @@ from .whatsapp_client import (
     send_tutor_exam_whatsapp,
     send_provider_exam_whatsapp,
     send_provider_exam_resend_whatsapp,
-    send_provider_bulk_exam_whatsapp,
     send_provider_return_whatsapp,
     send_portal_access_whatsapp,
     send_contact_updated_whatsapp,
 )
 from django.contrib import messages
-from django.db.models import Q
+from django.db.models import Count, Exists, IntegerField, Max, OuterRef, Q, Value
 from django.urls import reverse
 from django.db.models.deletion import ProtectedError
 from django.db import transaction
-from django.http import FileResponse, Http404, HttpResponseForbidden
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.core.paginator import Paginator
 from django.core.mail import send_mail
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError as DjangoValidationError
 from .authz import admin_required, is_admin_user, is_superadmin_user, superadmin_required
-import os
-import mimetypes
+from .search import fold_search_text, search_exams, suggest_exam_values
+from .pagination import (
+    CachedCountPaginator,
+    build_page_numbers,
+    cursor_pagination_enabled,
+    paginate_by_cursor,
+)
+from .list_cache import bump_list_version, get_cached_page, list_cache_enabled, make_list_key, set_cached_page
+from .conditional import fingerprint, make_etag, not_modified_response, set_validators
+from .exports import gzip_stream, stream_csv, stream_files_zip, stream_xlsx, zip_entry_name
+from .exam_types import translate_many
+from .invitations import absolute_url
+from .facets import ExamFacets
+from .pdf_optimize import optimize_uploaded_pdf
+from .batch_upload import batch_progress, stage_batch, start_batch
+from .chunked_upload import (
+    ChunkedUploadError,
+    append_chunk,
+    attach_chunked_uploads,
+    discard_upload,
+    finish_attached_uploads,
+    finish_upload,
+    start_upload,
+    upload_status,
+)
+from .file_delivery import make_download_token, read_download_token, serve_file
+from django.db.models.fields.files import FieldFile
+from django.views.decorators.http import require_http_methods, require_POST, require_safe
+import json
 import re
 import unicodedata
-from .models import Profile, Exam, Tutor, Clinic, Veterinarian, Pet, ExamTypeAlias, ExamExtraPDF
+from .models import (
+    Profile,
+    Exam,
+    Tutor,
+    Clinic,
+    Veterinarian,
+    Pet,
+    ExamTypeAlias,
+    ExamExtraPDF,
+    ExamProvider,
+    ChunkedUpload,
+    UploadBatch,
+    main_provider_token,
+    normalize_tutor_email,
+    normalize_tutor_phone,
+    prefetch_additional_providers,
+)
 from .forms import (
     ExamUploadForm,
     TutorForm,
@@ -53,7 +96,6 @@ from .forms import (
     VeterinarianForm,
     PetForm,
     MultiExamUploadForm,
-    parse_exam_filename,
     ExamTypeAliasForm,
     AdminAuxForm,
     PHONE_ANY_RE,
@@ -62,6 +104,18 @@ from .forms import (
     admin_full_name_exists,
 )
 
+# Colunas ordenáveis da lista de exames (cada uma tem índice em Exam.Meta)
+EXAM_ORDER_MAP = {
+    'realizacao': 'date_realizacao',
+    'clinica': 'clinic_or_vet',
+    'exame': 'exam_type',
+    'pet': 'pet_name',
+    'raca': 'breed',
+    'tutor': 'tutor_name',
+    'cadastro': 'created_at',
+    'retorno': 'retorno_previsto',
+}
+
 MANAGEMENT_CATEGORIES = {
     'tutores': {
         'label': 'Tutores',
@@ -177,7 +231,121 @@ def ensure_tutor_and_pet(tutor_name, pet_name, breed, tutor_email="", tutor_phon
             pet.save()
 
     return tutor, pet
-    
+
+# nomes por consulta no ensure_tutors_and_pets (cada um vira um LIKE no OR)
+ENSURE_LOOKUP_CHUNK_SIZE = 200
+
+
+def _iexact_any(field, names):
+    """Q com OR de `field__iexact` para cada nome."""
+    query = Q()
+    for name in names:
+        query |= Q(**{f"{field}__iexact": name})
+    return query
+
+
+def _chunks(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def ensure_tutors_and_pets(rows):
+    """
+    Versão em lote do ensure_tutor_and_pet (multi-upload, importações).
+    `rows`: tuplas (tutor, pet, raça, email, telefone), com as mesmas regras,
+    mas uma consulta para os tutores, uma para os pets e bulk_create /
+    bulk_update para o que falta. Devolve [(tutor, pet)] na ordem de `rows`,
+    com (None, None) nas linhas sem tutor ou pet.
+    """
+    cleaned = [
+        (
+            (tutor_name or "").strip(),
+            (pet_name or "").strip(),
+            (breed or "").strip() or "SRD",
+            (tutor_email or "").strip(),
+            (tutor_phone or "").strip(),
+        )
+        for tutor_name, pet_name, breed, tutor_email, tutor_phone in rows
+    ]
+    valid = [row for row in cleaned if row[0] and row[1]]
+    if not valid:
+        return [(None, None)] * len(cleaned)
+
+    # 1) Tutores: o primeiro na ordenação padrão, como o .first() da versão unitária
+    tutor_names = {}
+    for row in valid:
+        tutor_names.setdefault(row[0].lower(), row[0])
+
+    tutors = {}
+    for names in _chunks(tutor_names.values(), ENSURE_LOOKUP_CHUNK_SIZE):
+        for tutor in Tutor.objects.filter(_iexact_any("name", names)):
+            tutors.setdefault(tutor.name.lower(), tutor)
+
+    # 2) Pets dos tutores que já existem (nome + tutor)
+    pets = {}
+    tutor_ids = [tutor.pk for tutor in tutors.values()]
+    if tutor_ids:
+        pet_names = {row[1].lower(): row[1] for row in valid if row[0].lower() in tutors}
+        for names in _chunks(pet_names.values(), ENSURE_LOOKUP_CHUNK_SIZE):
+            candidates = Pet.objects.filter(_iexact_any("name", names), tutor_id__in=tutor_ids)
+            for pet in candidates:
+                pets.setdefault((pet.tutor_id, pet.name.lower()), pet)
+
+    new_tutors, changed_tutors = {}, {}
+    new_pets, changed_pets = {}, {}
+    resolved = {}
+    for tutor_name, pet_name, breed, tutor_email, tutor_phone in valid:
+        tutor_key = tutor_name.lower()
+        tutor = tutors.get(tutor_key)
+        if tutor is None:
+            tutor = Tutor(name=tutor_name, email=tutor_email, phone=tutor_phone)
+            tutors[tutor_key] = new_tutors[tutor_key] = tutor
+        else:
+            if tutor_email and not tutor.email:
+                tutor.email = tutor_email
+                changed_tutors[tutor_key] = tutor
+            if tutor_phone and not tutor.phone:
+                tutor.phone = tutor_phone
+                changed_tutors[tutor_key] = tutor
+
+        # pets de tutor novo ainda não têm tutor_id; a chave usa o nome do tutor
+        pet_key = (tutor_key, pet_name.lower())
+        pet = resolved.get(pet_key) or (pets.get((tutor.pk, pet_name.lower())) if tutor.pk else None)
+        if pet is None:
+            pet = Pet(name=pet_name, breed=breed, tutor=tutor)
+            new_pets[pet_key] = pet
+        elif (not pet.breed or pet.breed.upper() == "SRD") and breed.upper() != "SRD":
+            # melhora raça se antes estava SRD/vazia
+            pet.breed = breed
+            if pet_key not in new_pets:
+                changed_pets[pet_key] = pet
+        resolved[pet_key] = pet
+
+    changed_tutors = [t for key, t in changed_tutors.items() if key not in new_tutors]
+    if new_tutors or changed_tutors or new_pets or changed_pets:
+        now = timezone.now()
+        with transaction.atomic():
+            Tutor.objects.bulk_create(new_tutors.values())
+            for tutor in changed_tutors:
+                tutor.updated_at = now
+            Tutor.objects.bulk_update(changed_tutors, ["email", "phone", "updated_at"])
+
+            # o tutor_id dos pets novos vem dos tutores inseridos acima
+            Pet.objects.bulk_create(new_pets.values())
+            for pet in changed_pets.values():
+                pet.updated_at = now
+            Pet.objects.bulk_update(changed_pets.values(), ["breed", "updated_at"])
+
+            # bulk_create/bulk_update não disparam os sinais do cache das listas
+            bump_list_version()
+
+    return [
+        (tutors[row[0].lower()], resolved[(row[0].lower(), row[1].lower())]) if row[0] and row[1] else (None, None)
+        for row in cleaned
+    ]
+
+
 def _to_login_base(name: str) -> str:
     name = (name or "").strip().lower()
     name = unicodedata.normalize("NFKD", name)
@@ -198,7 +366,7 @@ def build_activation_link(request, user):
     uidb64 = urlsafe_base64_encode(force_bytes(user.pk))
     token = default_token_generator.make_token(user)
     path = reverse("activate_account", args=[uidb64, token])
-    return request.build_absolute_uri(path)
+    return absolute_url(request, path)
 
 def ensure_pending_user_for_provider(name: str, email: str, phone: str, role: str):
     """
@@ -244,46 +412,63 @@ def _notification_label(name: str, category: str | None = None) -> str:
     return name.split()[0]
     
 def translate_exam_type(exam_type_raw: str) -> str:
-    key = (exam_type_raw or "").strip().lower()
-    if not key:
-        return exam_type_raw
-    alias = ExamTypeAlias.objects.filter(abbreviation=key).first()
-    return alias.full_name if alias else exam_type_raw
+    return translate_many([exam_type_raw])[exam_type_raw]
     
-def user_can_view_exam(user, exam) -> bool:
+def user_can_view_exam(user, exam, profile=None) -> bool:
     if is_admin_user(user):
         return True
 
-    profile, _ = Profile.objects.get_or_create(user=user)
+    if profile is None:
+        profile, _ = Profile.objects.get_or_create(user=user)
 
     if profile.role == "TUTOR":
         return _tutor_matches_exam(user, profile, exam)
 
-    return user_is_provider_for_exam(user, exam)
+    return user_is_provider_for_exam(user, exam, profile)
+
+def visible_exams_for_user(user, profile=None):
+    """
+    Queryset dos exames que o usuário pode ver, com o filtro feito no banco:
+      - admin: todos
+      - TUTOR: exames cujo e-mail/telefone normalizado bate com o do usuário
+      - clínica/vet (BASIC): exames atribuídos à conta ou em que a clínica/vet
+        da conta aparece como adicional (ExamProvider)
+    """
+    exams = Exam.objects.all()
+
+    if is_admin_user(user):
+        return exams
+
+    if profile is None:
+        profile, _ = Profile.objects.get_or_create(user=user)
+
+    if profile.role == "TUTOR":
+        tutor_q = _tutor_exams_q(user, profile)
+        if tutor_q is None:
+            return exams.none()
+        return exams.filter(tutor_q)
+
+    additional_links = _additional_provider_links_for_user(user).filter(exam=OuterRef("pk"))
+    return exams.filter(Q(assigned_user=user) | Q(Exists(additional_links)))
+
+def _additional_provider_links_for_user(user):
+    return ExamProvider.objects.filter(
+        Q(clinic__user=user) | Q(veterinarian__user=user),
+        role=ExamProvider.ROLE_ADDITIONAL,
+    )
     
-def user_is_provider_for_exam(user, exam) -> bool:
+def user_is_provider_for_exam(user, exam, profile=None) -> bool:
     # principal
     if exam.assigned_user_id == user.id:
         return True
 
-    # adicionais: exam.additional_clinic_or_vet é lista ["CLINIC:1", "VET:3"]
-    profile, _ = Profile.objects.get_or_create(user=user)
+    # adicionais: linhas de ExamProvider cuja clínica/vet pertence ao usuário
+    if profile is None:
+        profile, _ = Profile.objects.get_or_create(user=user)
     if profile.role != "BASIC":
         return False
 
-    tokens = exam.additional_clinic_or_vet or []
-
-    # se for user de clínica:
-    clinic = Clinic.objects.filter(user=user).first()
-    if clinic and f"CLINIC:{clinic.id}" in tokens:
-        return True
-
-    # se for user de vet:
-    vet = Veterinarian.objects.filter(user=user).first()
-    if vet and f"VET:{vet.id}" in tokens:
-        return True
-
-    return False
+    return _additional_provider_links_for_user(user).filter(exam=exam).exists()
     
 def is_whatsapp_phone(phone: str) -> bool:
     return bool(normalize_br_phone(phone))
@@ -351,41 +536,15 @@ def prepare_provider_for_notification(request, selected_value: str, *, allow_cre
     provider["activation_link"] = activation_link
     return provider
     
-def _get_main_provider_token_for_exam(exam):
-    # 1) tenta resolver pelo usuário atualmente vinculado ao exame
-    if exam.assigned_user_id:
-        clinic = Clinic.objects.filter(user=exam.assigned_user).first()
-        if clinic:
-            return f"CLINIC:{clinic.id}"
-
-        vet = Veterinarian.objects.filter(user=exam.assigned_user).first()
-        if vet:
-            return f"VET:{vet.id}"
-
-    # 2) fallback: tenta resolver pelo nome salvo no exame
-    provider_name = (exam.clinic_or_vet or "").strip()
-    if provider_name:
-        clinic = Clinic.objects.filter(name__iexact=provider_name).first()
-        if clinic:
-            return f"CLINIC:{clinic.id}"
-
-        vet = Veterinarian.objects.filter(name__iexact=provider_name).first()
-        if vet:
-            return f"VET:{vet.id}"
-
-    return None
-
 def _get_provider_tokens_for_exam(exam):
-    tokens = []
+    links = list(exam.provider_links.all())
+    tokens = [link.token for link in links]
 
-    main_token = _get_main_provider_token_for_exam(exam)
-    if main_token:
-        tokens.append(main_token)
-
-    for token in (exam.additional_clinic_or_vet or []):
-        token = (token or "").strip()
-        if token and token not in tokens:
-            tokens.append(token)
+    # exames sem responsável principal vinculado: resolve como antes
+    if not any(link.role == ExamProvider.ROLE_MAIN for link in links):
+        main_token = main_provider_token(exam)
+        if main_token and main_token not in tokens:
+            tokens.insert(0, main_token)
 
     return tokens
     
@@ -406,17 +565,32 @@ def _sanitize_per_page(value, fallback=20):
     return value
 
 def _tutor_matches_exam(user, profile, exam) -> bool:
-    user_email = (user.email or "").strip().lower()
-    exam_email = (exam.tutor_email or "").strip().lower()
-
-    user_phone = _phone_digits(profile.whatsapp or "")
-    exam_phone = _phone_digits(exam.tutor_phone or "")
+    user_email = normalize_tutor_email(user.email)
+    user_phone = normalize_tutor_phone(profile.whatsapp)
 
-    email_match = bool(user_email and exam_email and user_email == exam_email)
-    phone_match = bool(user_phone and exam_phone and user_phone == exam_phone)
+    email_match = bool(user_email and user_email == exam.tutor_email_normalized)
+    phone_match = bool(user_phone and user_phone == exam.tutor_phone_digits)
 
     return email_match or phone_match
 
+def _tutor_exams_q(user, profile):
+    """
+    Mesmo critério de _tutor_matches_exam, mas como filtro SQL
+    (usa as colunas normalizadas e indexadas do Exam).
+    Retorna None se o tutor não tiver nenhum contato para comparar.
+    """
+    user_email = normalize_tutor_email(user.email)
+    user_phone = normalize_tutor_phone(profile.whatsapp)
+
+    tutor_q = None
+    if user_email:
+        tutor_q = Q(tutor_email_normalized=user_email)
+    if user_phone:
+        phone_q = Q(tutor_phone_digits=user_phone)
+        tutor_q = phone_q if tutor_q is None else (tutor_q | phone_q)
+
+    return tutor_q
+
 def send_simple_email(to_email: str, subject: str, body: str):
     send_mail(
         subject,
@@ -549,11 +723,27 @@ def profile_view(request):
             new_email = (request.user.email or "").strip()
             new_whatsapp = (whatsapp or "").strip()
 
+            # update() não passa pelo Exam.save(), então as colunas normalizadas
+            # são atualizadas junto
             if old_email.strip() and new_email and old_email.strip().lower() != new_email.lower():
-                Exam.objects.filter(tutor_email__iexact=old_email.strip()).update(tutor_email=new_email)
+                Exam.objects.filter(
+                    tutor_email_normalized=normalize_tutor_email(old_email)
+                ).update(
+                    tutor_email=new_email,
+                    tutor_email_normalized=normalize_tutor_email(new_email),
+                    updated_at=timezone.now(),
+                )
 
             if old_whatsapp.strip() and new_whatsapp and _phone_digits(old_whatsapp) != _phone_digits(new_whatsapp):
-                Exam.objects.filter(tutor_phone__iexact=old_whatsapp.strip()).update(tutor_phone=new_whatsapp)
+                Exam.objects.filter(
+                    tutor_phone_digits=normalize_tutor_phone(old_whatsapp)
+                ).update(
+                    tutor_phone=new_whatsapp,
+                    tutor_phone_digits=normalize_tutor_phone(new_whatsapp),
+                    updated_at=timezone.now(),
+                )
+
+            bump_list_version()
 
         # Atualiza dados do Profile
         profile.whatsapp = whatsapp
@@ -628,64 +818,59 @@ def profile_view(request):
     
 @login_required
 def exam_pdf(request, pk):
-    exam = get_object_or_404(Exam, pk=pk)
-
-    if not user_can_view_exam(request.user, exam):
-        raise Http404()
+    # o filtro de permissão vai junto na mesma consulta (404 se não puder ver)
+    exam = get_object_or_404(visible_exams_for_user(request.user), pk=pk)
 
     if not exam.pdf_file:
         raise Http404()
 
-    return FileResponse(exam.pdf_file.open('rb'), content_type='application/pdf')
+    return serve_file(
+        request,
+        exam.pdf_file,
+        sha256=exam.pdf_sha256,
+        content_type='application/pdf',
+        filename=exam.pdf_display_name,
+    )
     
-@login_required
-def exams_list(request):
-    profile, _ = Profile.objects.get_or_create(user=request.user)
-
-    exams = Exam.objects.all()
-    tutor_filter_later = False
-
-    if not is_admin_user(request.user):
-        if profile.role == "TUTOR":
-            tutor_filter_later = True
-        else:
-            # Clínica/Vet (BASIC)
-            exams = exams.filter(assigned_user=request.user)
+def _filtered_exams(request, profile):
+    """
+    Exames visíveis para o usuário com a busca (?q=), as facetas (ver
+    facets.py) e a ordenação (?order=&direction=) da lista aplicadas.
+    Usado pela lista e pela exportação.
+    """
+    exams = visible_exams_for_user(request.user, profile)
 
-    # Busca simples
+    # Busca (sem acentos, por pedaço de texto, ranqueada)
     search_query = request.GET.get('q', '').strip()
     if search_query:
-        exams = exams.filter(
-            Q(clinic_or_vet__icontains=search_query) |
-            Q(exam_type__icontains=search_query) |
-            Q(pet_name__icontains=search_query) |
-            Q(breed__icontains=search_query) |
-            Q(tutor_name__icontains=search_query)
-        )
+        exams = search_exams(exams, search_query)
+
+    # Facetas (período, exame, clínica/vet, retorno pendente)
+    facets = ExamFacets(request.GET)
+    exams = facets.apply(exams)
 
     # Ordenação
     order = request.GET.get('order', '')
     direction = request.GET.get('direction', 'asc')
 
-    order_map = {
-        'realizacao': 'date_realizacao',
-        'clinica': 'clinic_or_vet',
-        'exame': 'exam_type',
-        'pet': 'pet_name',
-        'raca': 'breed',
-        'tutor': 'tutor_name',
-        'cadastro': 'created_at',
-        'retorno': 'retorno_previsto',
-    }
-
-    if order in order_map:
-        field_name = order_map[order]
+    if order in EXAM_ORDER_MAP:
+        field_name = EXAM_ORDER_MAP[order]
         if direction == 'desc':
             field_name = '-' + field_name
         exams = exams.order_by(field_name)
+    elif search_query:
+        # sem ordenação escolhida, os resultados mais relevantes vêm primeiro
+        exams = exams.order_by('-search_rank', *Exam._meta.ordering)
 
-    if tutor_filter_later:
-        exams = [exam for exam in exams if _tutor_matches_exam(request.user, profile, exam)]
+    return exams, search_query, order, direction, facets
+
+
+@login_required
+def exams_list(request):
+    profile, _ = Profile.objects.get_or_create(user=request.user)
+
+    exams, search_query, order, direction, facets = _filtered_exams(request, profile)
+    order_map = EXAM_ORDER_MAP
 
     # Quantidade por página (preferência do usuário para Exames)
     saved_per_page = _sanitize_per_page(getattr(profile, 'exams_per_page', 20), 20)
@@ -700,45 +885,232 @@ def exams_list(request):
     else:
         per_page = saved_per_page
 
-    # Paginação
-    paginator = Paginator(exams, per_page)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-
-    # Faixa de páginas para mostrar no rodapé
-    current_page = page_obj.number
-    total_pages = paginator.num_pages
-
-    if total_pages <= 9:
-        page_numbers = list(range(1, total_pages + 1))
+    # Página já renderizada para este usuário, com os mesmos parâmetros e
+    # sem alterações nos dados desde então: a chave e o ETag levam a versão
+    # das listas (list_cache.py), sem consultar os exames. Quem grava com
+    # update()/bulk_create chama bump_list_version.
+    page_cache_key = _exams_list_page_cache_key(request, profile, per_page)
+    etag = None
+    if page_cache_key is not None:
+        etag = make_etag(*page_cache_key)
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        cached_html = get_cached_page(page_cache_key)
+        if cached_html is not None:
+            return set_validators(HttpResponse(cached_html), etag)
+
+    # Paginação: por cursor (keyset) quando a ordenação é por coluna;
+    # a ordenação por relevância da busca fica sempre no modo numerado
+    page_obj = None
+    cursor_page = None
+    page_numbers = []
+
+    if cursor_pagination_enabled(request) and (order in order_map or not search_query):
+        if order in order_map:
+            cursor_field, cursor_desc = order_map[order], direction == 'desc'
+        else:
+            cursor_field, cursor_desc = 'date_realizacao', True
+
+        cursor_page = paginate_by_cursor(
+            exams,
+            cursor_field,
+            descending=cursor_desc,
+            cursor=request.GET.get('cursor'),
+            per_page=per_page,
+            order_key=f"{order}:{direction}",
+        )
+        exams_page = cursor_page.object_list
     else:
-        page_numbers = []
-        last_added = None
-
-        for num in range(1, total_pages + 1):
-            should_show = (
-                num == 1 or
-                num == total_pages or
-                abs(num - current_page) <= 2
-            )
+        is_admin = is_admin_user(request.user)
+        paginator = CachedCountPaginator(
+            exams,
+            per_page,
+            count_key=(
+                "exams",
+                "all" if is_admin else f"user:{request.user.id}",
+                fold_search_text(search_query),
+                facets.cache_key_parts(),
+            ),
+            estimate=is_admin and not search_query and not facets.active,
+        )
+        page_obj = paginator.get_page(request.GET.get('page'))
+        exams_page = page_obj.object_list
+
+        # Faixa de páginas para mostrar no rodapé
+        page_numbers = build_page_numbers(page_obj.number, paginator.num_pages)
 
-            if should_show:
-                if last_added and num - last_added > 1:
-                    page_numbers.append('...')
-                page_numbers.append(num)
-                last_added = num
+    # nomes das clínicas/vets adicionais da página inteira, sem uma consulta por exame
+    exams_page = prefetch_additional_providers(exams_page)
 
     context = {
         'profile': profile,
-        'exams': page_obj.object_list,
+        'exams': exams_page,
         'page_obj': page_obj,
+        'cursor_page': cursor_page,
         'page_numbers': page_numbers,
         'search_query': search_query,
         'order': order,
         'direction': direction,
         'per_page': per_page,
+        'facets': facets,
+        'facet_counts': facets.counts(),
+        'facet_query': facets.querystring(),
     }
-    return render(request, 'accounts/exams_list.html', context)
+    response = render(request, 'accounts/exams_list.html', context)
+
+    # o token CSRF só existe depois do render na primeira visita
+    if page_cache_key is None:
+        page_cache_key = _exams_list_page_cache_key(request, profile, per_page)
+    if page_cache_key is not None:
+        set_cached_page(page_cache_key, response.content)
+        if etag is not None:
+            set_validators(response, etag)
+
+    return response
+
+
+def _page_viewer_identity(request, profile):
+    """
+    O que, além dos dados, muda o HTML de uma página para quem a vê: o token
+    CSRF dos formulários, o escopo do usuário e os dados do topo/menu.
+    None quando a página não pode ser reaproveitada (mensagens pendentes,
+    sem cookie CSRF ainda).
+    """
+    csrf_cookie = request.META.get('CSRF_COOKIE')
+    if not csrf_cookie or len(messages.get_messages(request)):
+        return None
+
+    user = request.user
+    return (
+        user.id,
+        "admin" if is_admin_user(user) else profile.role,
+        user.username,
+        user.first_name,
+        user.email,
+        profile.whatsapp,
+        profile.photo.name if profile.photo else "",
+        csrf_cookie,
+    )
+
+
+def _exams_list_page_cache_key(request, profile, per_page):
+    # sem versão compartilhada entre os workers não há como saber se a
+    # página guardada (ou a do navegador) ainda vale
+    if not list_cache_enabled():
+        return None
+    viewer = _page_viewer_identity(request, profile)
+    if viewer is None:
+        return None
+    # a data entra por causa da faceta "retorno pendente" (relativa a hoje)
+    return ("exams_list", *viewer, sorted(request.GET.lists()), per_page, timezone.localdate())
+
+
+@login_required
+def exams_suggest(request):
+    """
+    Sugestões (JSON) para a caixa de busca da lista de exames: pets, tutores,
+    exames e clínicas/vets que começam com ?q=, só entre os exames visíveis
+    para o usuário. Guardadas por alguns segundos por (escopo, prefixo).
+    """
+    prefix = request.GET.get('q', '').strip().lower()
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), 20)
+    except (TypeError, ValueError):
+        limit = 8
+
+    scope = "all" if is_admin_user(request.user) else f"user:{request.user.id}"
+    key = make_list_key("suggest", scope, prefix, limit)
+
+    results = cache.get(key) if list_cache_enabled() else None
+    if results is None:
+        profile, _ = Profile.objects.get_or_create(user=request.user)
+        results = suggest_exam_values(visible_exams_for_user(request.user, profile), prefix, limit)
+        if list_cache_enabled():
+            cache.set(key, results, getattr(settings, 'EXAM_SUGGEST_CACHE_TIMEOUT', 30))
+
+    return JsonResponse(results)
+
+
+@login_required
+def exams_export(request):
+    """
+    Exporta (CSV ou XLSX) os exames da lista com a mesma visibilidade, busca
+    e ordenação da tela. ?formato=xlsx para planilha; ?gzip=1 comprime o CSV
+    quando o navegador aceita gzip.
+    """
+    profile, _ = Profile.objects.get_or_create(user=request.user)
+    exams, _, _, _, _ = _filtered_exams(request, profile)
+
+    filename = f"exames-{timezone.localdate():%Y-%m-%d}"
+
+    if request.GET.get('formato') == 'xlsx':
+        response = StreamingHttpResponse(
+            stream_xlsx(exams),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}.xlsx"'
+        return response
+
+    rows = stream_csv(exams)
+    accepts_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+
+    if request.GET.get('gzip') and accepts_gzip:
+        response = StreamingHttpResponse(gzip_stream(rows), content_type='text/csv; charset=utf-8')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = StreamingHttpResponse(rows, content_type='text/csv; charset=utf-8')
+
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def _exam_zip_entries(user, profile, exams):
+    """
+    (nome no zip, arquivo) do PDF e dos extras de cada exame, uma pasta por
+    exame. Cada exame passa de novo por user_can_view_exam.
+    """
+    exams = exams.prefetch_related('extra_pdfs')
+    for exam in exams.iterator(chunk_size=100):
+        if not user_can_view_exam(user, exam, profile):
+            continue
+
+        folder = f"{exam.date_realizacao:%Y-%m-%d} {exam.pet_name} - {exam.exam_type} ({exam.pk})"
+        if exam.pdf_file:
+            yield zip_entry_name(folder, exam.pdf_display_name), exam.pdf_file
+        for extra in exam.extra_pdfs.all():
+            if extra.file:
+                yield zip_entry_name(folder, extra.display_name), extra.file
+
+
+@login_required
+def exams_download_zip(request):
+    """
+    Baixa num zip o PDF e os extras dos exames da lista (mesmos filtros e
+    ordenação da tela; ?ids= restringe a exames escolhidos). O zip é montado
+    enquanto é enviado, sem recomprimir os arquivos.
+    """
+    profile, _ = Profile.objects.get_or_create(user=request.user)
+    exams, _, _, _, _ = _filtered_exams(request, profile)
+
+    ids = [value for value in request.GET.getlist('ids') if value.isdigit()]
+    if ids:
+        exams = exams.filter(pk__in=ids)
+
+    limit = getattr(settings, 'EXAM_ZIP_MAX_EXAMS', 500)
+    if exams.count() > limit:
+        messages.error(request, f"Selecione no máximo {limit} exames para baixar de uma vez.")
+        return redirect('exames')
+
+    filename = f"exames-{timezone.localdate():%Y-%m-%d}.zip"
+    response = StreamingHttpResponse(
+        stream_files_zip(_exam_zip_entries(request.user, profile, exams)),
+        content_type='application/zip',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
     
 @login_required
 def exam_detail(request, pk):
@@ -877,8 +1249,16 @@ def exam_upload(request):
     profile, _ = Profile.objects.get_or_create(user=request.user)
 
     if request.method == 'POST':
-        form = ExamUploadForm(request.POST, request.FILES)
-        if form.is_valid():
+        # arquivos que vieram pelo upload em partes (chunked_upload.py)
+        files = request.FILES.copy()
+        chunked = attach_chunked_uploads(request, files, {
+            'pdf_upload': ('pdf_file', False),
+            'extra_uploads': ('extra_files', True),
+        })
+        form = ExamUploadForm(request.POST, files)
+        if not form.is_valid():
+            finish_attached_uploads(chunked, discard=False)
+        else:
             cd = form.cleaned_data
             
             selected = cd["clinic_or_vet"]
@@ -942,7 +1322,7 @@ def exam_upload(request):
                 if tutor_user and needs_activation:
                     tutor_activation_link = build_activation_link(request, tutor_user)
 
-            exam = Exam.objects.create(
+            exam = Exam(
                 date_realizacao=cd['parsed_date_realizacao'],
                 clinic_or_vet=clinic_or_vet_name,
                 exam_type=translate_exam_type(cd['parsed_exam_type']),
@@ -954,11 +1334,12 @@ def exam_upload(request):
                 retorno_previsto=cd.get('retorno_previsto'),
                 retorno_horario=cd.get('retorno_horario'),
                 observations=cd['observations'],
-                pdf_file=cd['pdf_file'],
+                pdf_file=optimize_uploaded_pdf(cd['pdf_file']),
                 owner=request.user,
                 assigned_user=assigned_user,
                 additional_clinic_or_vet=cd.get("additional_clinic_or_vet") or [],
             )
+            exam.save(main_provider=selected)
             
             tutor_email_sent_any = False
             tutor_zap_sent_any = False
@@ -1055,6 +1436,7 @@ def exam_upload(request):
             extra_files = form.cleaned_data.get("extra_files", [])
             for f in extra_files:
                 ExamExtraPDF.objects.create(exam=exam, file=f)
+            finish_attached_uploads(chunked)
             return redirect('exames')
     else:
         form = ExamUploadForm()
@@ -1062,8 +1444,76 @@ def exam_upload(request):
     return render(request, 'accounts/exam_upload.html', {
         'profile': profile,
         'form': form,
+        'chunked_upload_threshold': getattr(settings, 'CHUNKED_UPLOAD_THRESHOLD', 0),
     })
     
+def _chunked_upload_error(error):
+    data = {"error": str(error)}
+    if error.upload is not None:
+        data.update(upload_status(error.upload))
+    return JsonResponse(data, status=error.status)
+
+
+@login_required
+@admin_required
+@require_POST
+def chunked_upload_start(request):
+    """Abre um upload em partes: {filename, size} (JSON ou formulário)."""
+    try:
+        payload = json.loads(request.body or b"{}") if request.content_type == "application/json" else request.POST
+        upload = start_upload(request.user, payload.get("filename"), payload.get("size"))
+    except ValueError:
+        return JsonResponse({"error": "JSON inválido."}, status=400)
+    except ChunkedUploadError as error:
+        return _chunked_upload_error(error)
+
+    return JsonResponse(upload_status(upload), status=201)
+
+
+@login_required
+@admin_required
+@require_http_methods(["GET", "HEAD", "PUT", "DELETE"])
+def chunked_upload_detail(request, upload_id):
+    """
+    GET: progresso (para retomar). PUT ?offset=N: grava uma parte.
+    DELETE: cancela.
+    """
+    if request.method == "PUT":
+        try:
+            offset = int(request.GET.get("offset", ""))
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            return JsonResponse({"error": "Informe o offset da parte."}, status=400)
+
+        try:
+            # lido direto do corpo, em blocos (request.body guardaria tudo em memória)
+            upload = append_chunk(upload_id, request.user, offset, request, length)
+        except ChunkedUploadError as error:
+            return _chunked_upload_error(error)
+        return JsonResponse(upload_status(upload))
+
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, user=request.user)
+    if request.method == "DELETE":
+        discard_upload(upload)
+        return HttpResponse(status=204)
+
+    response = JsonResponse(upload_status(upload))
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+@login_required
+@admin_required
+@require_POST
+def chunked_upload_finalize(request, upload_id):
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, user=request.user)
+    try:
+        finish_upload(upload)
+    except ChunkedUploadError as error:
+        return _chunked_upload_error(error)
+    return JsonResponse(upload_status(upload))
+
+
 @login_required
 @admin_required
 def exam_upload_multi(request):
@@ -1075,6 +1525,7 @@ def exam_upload_multi(request):
         if form.is_valid():
             selected = form.cleaned_data["clinic_or_vet"]
             pdf_files = form.cleaned_data["pdf_files"]
+            zip_file = form.cleaned_data.get("zip_file")
             notify_provider = (form.cleaned_data.get("notify_provider") or "") == "1"
 
             main_provider = prepare_provider_for_notification(
@@ -1083,137 +1534,136 @@ def exam_upload_multi(request):
                 allow_create_user=notify_provider,
             )
 
-            assigned_user = main_provider["user"] if main_provider else None
-            clinic_or_vet_name = main_provider["label"] if main_provider else ""
-            provider_activation_link = main_provider.get("activation_link") if main_provider else None
-            provider_email = (main_provider.get("email") or "").strip() if main_provider else ""
-            provider_phone = (main_provider.get("phone") or "").strip() if main_provider else ""
-            provider_label = main_provider["label"] if main_provider else "Clínica/Veterinário"
+            # os exames são criados em segundo plano (batch_upload.py)
+            with transaction.atomic():
+                batch = stage_batch(
+                    request.user,
+                    pdf_files,
+                    provider=main_provider,
+                    notify_provider=notify_provider,
+                    archive=zip_file,
+                )
+                start_batch(batch)
 
-            created_count = 0
-            created_exam_ids = []
-            first_exam = None
+            status_url = reverse("upload_batch_status", args=[batch.pk])
+            if "application/json" in request.headers.get("Accept", ""):
+                return JsonResponse({"id": str(batch.pk), "status_url": status_url}, status=202)
 
-            with transaction.atomic():
-                for f in pdf_files:
-                    data = parse_exam_filename(f.name)
+            total = batch.items.count() if zip_file else len(pdf_files)
+            messages.success(request, f"{total} arquivo(s) recebidos. Os exames estão sendo cadastrados.")
+            return redirect(status_url)
+    else:
+        form = MultiExamUploadForm()
 
-                    ensure_tutor_and_pet(
-                        tutor_name=data["tutor_name"],
-                        pet_name=data["pet_name"],
-                        breed=data["breed"],
-                    )
+    return render(request, "accounts/exam_upload_multi.html", {"profile": profile, "form": form})
 
-                    exam = Exam.objects.create(
-                        date_realizacao=data["date_realizacao"],
-                        clinic_or_vet=clinic_or_vet_name,
-                        exam_type=translate_exam_type(data["exam_type"]),
-                        pet_name=data["pet_name"],
-                        breed=data["breed"],
-                        tutor_name=data["tutor_name"],
-                        pdf_file=f,
-                        owner=request.user,
-                        assigned_user=assigned_user,
-                        tutor_phone="",
-                        tutor_email="",
-                        observations="",
-                    )
 
-                    if first_exam is None:
-                        first_exam = exam
+@login_required
+@admin_required
+def upload_batch_status(request, batch_id):
+    """Andamento de um lote do upload em massa, por arquivo (HTML ou ?formato=json)."""
+    batch = get_object_or_404(UploadBatch, pk=batch_id)
+    progress = batch_progress(batch)
 
-                    created_exam_ids.append(exam.id)
-                    created_count += 1
+    if request.GET.get("formato") == "json":
+        response = JsonResponse(progress)
+        patch_cache_control(response, no_store=True)
+        return response
 
-            provider_sent_any = False
+    profile, _ = Profile.objects.get_or_create(user=request.user)
+    return render(request, "accounts/upload_batch_status.html", {
+        "profile": profile,
+        "batch": batch,
+        "progress": progress,
+    })
+    
+# campo de onde vem o storage de cada tipo de link assinado
+SIGNED_FILE_FIELDS = {
+    "exam": (Exam, "pdf_file"),
+    "extra": (ExamExtraPDF, "file"),
+}
 
-            # Só notifica se o botão estiver ativado
-            if notify_provider:
-                # Se enviou só 1 exame no upload em massa, reutiliza o template normal
-                if created_count == 1 and first_exam is not None:
-                    if provider_email:
-                        try:
-                            ok = send_provider_exam_email(
-                                request,
-                                exam=exam,
-                                to_email=provider_email,
-                                recipient_label=provider_label,
-                                activation_link=provider_activation_link,
-                            )
-                            provider_sent_any = provider_sent_any or ok
-                        except Exception as e:
-                            messages.error(request, f"Falha ao enviar e-mail para a clínica/vet: {e}")
 
-                    if provider_phone and is_whatsapp_phone(provider_phone):
-                        try:
-                            ok = send_provider_exam_whatsapp(
-                                request,
-                                exam=exam,
-                                to_phone=provider_phone,
-                                recipient_label=provider_label,
-                                activation_link=provider_activation_link,
-                            )
-                            provider_sent_any = provider_sent_any or ok
-                        except Exception as e:
-                            messages.error(request, f"Falha ao enviar WhatsApp para a clínica/vet: {e}")
+def _signed_file_url(kind, obj, max_age=None):
+    """
+    URL assinada e com validade para o PDF do exame (kind="exam") ou um
+    extra (kind="extra"). Quem gera o link precisa já ter checado a permissão.
+    """
+    if kind == "exam":
+        token = make_download_token(
+            kind, obj.pdf_file, sha256=obj.pdf_sha256, filename=obj.pdf_display_name, max_age=max_age,
+        )
+    else:
+        token = make_download_token(
+            kind, obj.file, sha256=obj.sha256, filename=obj.display_name, max_age=max_age,
+        )
+    return reverse("signed_download", args=[token])
 
-                # Se enviou mais de 1 exame, usa os templates novos de massa
-                elif created_count > 1:
-                    if provider_email:
-                        try:
-                            ok = send_provider_bulk_exam_email(
-                                request,
-                                recipient_label=provider_label,
-                                to_email=provider_email,
-                                exam_count=created_count,
-                                activation_link=provider_activation_link,
-                            )
-                            provider_sent_any = provider_sent_any or ok
-                        except Exception as e:
-                            messages.error(request, f"Falha ao enviar e-mail em massa para a clínica/vet: {e}")
 
-                    if provider_phone and is_whatsapp_phone(provider_phone):
-                        try:
-                            ok = send_provider_bulk_exam_whatsapp(
-                                request,
-                                recipient_label=provider_label,
-                                to_phone=provider_phone,
-                                exam_count=created_count,
-                                activation_link=provider_activation_link,
-                            )
-                            provider_sent_any = provider_sent_any or ok
-                        except Exception as e:
-                            messages.error(request, f"Falha ao enviar WhatsApp em massa para a clínica/vet: {e}")
+@require_safe
+def signed_download(request, token):
+    """
+    Download por link assinado: só confere assinatura e validade, sem
+    sessão, login nem consulta ao banco.
+    """
+    payload = read_download_token(token)
+    if payload is None or payload.get("k") not in SIGNED_FILE_FIELDS:
+        raise Http404()
 
-            # Não marcamos alerta_email/alerta_zap aqui, porque esses campos
-            # agora representam alerta do tutor na tela de visualização.
-            
-            if provider_sent_any:
-                Exam.objects.filter(id__in=created_exam_ids).update(alerta_provider=True)
+    model, field_name = SIGNED_FILE_FIELDS[payload["k"]]
+    field = model._meta.get_field(field_name)
+    field_file = FieldFile(None, field, payload.get("n") or "")
+
+    if not field_file.name or not field_file.storage.exists(field_file.name):
+        raise Http404()
+
+    return serve_file(
+        request,
+        field_file,
+        sha256=payload.get("h", ""),
+        content_type="application/pdf" if payload["k"] == "exam" else None,
+        filename=payload.get("f") or None,
+        max_age=max(int(payload["e"] - timezone.now().timestamp()), 0),
+    )
+
+
+def _provider_contact_by_name(name):
+    """
+    (telefone, e-mail) da clínica com esse nome ou, se não houver, do
+    veterinário, numa consulta só.
+    """
+    clinics = (
+        Clinic.objects.filter(name__iexact=name)
+        .order_by()
+        .annotate(source=Value(0, output_field=IntegerField()))
+        .values_list("source", "name", "id", "phone", "email")
+    )
+    vets = (
+        Veterinarian.objects.filter(name__iexact=name)
+        .order_by()
+        .annotate(source=Value(1, output_field=IntegerField()))
+        .values_list("source", "name", "id", "phone", "email")
+    )
+    row = clinics.union(vets, all=True).order_by("source", "name", "id").first()
+    if row is None:
+        return "", ""
+    return (row[3] or "").strip(), (row[4] or "").strip()
 
-            messages.success(request, f"{created_count} exame(s) enviados com sucesso.")
-            return redirect("exames")
-    else:
-        form = MultiExamUploadForm()
 
-    return render(request, "accounts/exam_upload_multi.html", {"profile": profile, "form": form})
-    
 @login_required
 def exam_view(request, pk):
     profile, _ = Profile.objects.get_or_create(user=request.user)
+    # is_admin_user() lê user.profile; reaproveita o que acabou de ser carregado
+    request.user.profile = profile
     exam = get_object_or_404(Exam, pk=pk)
 
-    if not user_can_view_exam(request.user, exam):
+    if not user_can_view_exam(request.user, exam, profile):
         return HttpResponseForbidden("Você não tem permissão para ver este exame.")
 
-    extras = exam.extra_pdfs.all().order_by("uploaded_at")
-
-    provider_obj = Clinic.objects.filter(name__iexact=exam.clinic_or_vet).first()
-    if provider_obj is None:
-        provider_obj = Veterinarian.objects.filter(name__iexact=exam.clinic_or_vet).first()
+    extras = list(exam.extra_pdfs.all().order_by("uploaded_at"))
+    additional_providers = exam.additional_clinic_or_vet_display
 
-    provider_phone = (getattr(provider_obj, "phone", "") or "").strip()
-    provider_email = (getattr(provider_obj, "email", "") or "").strip()
+    provider_phone, provider_email = _provider_contact_by_name(exam.clinic_or_vet)
 
     if provider_phone and provider_email:
         provider_contact = f"{provider_phone} | {provider_email}"
@@ -1224,13 +1674,38 @@ def exam_view(request, pk):
     else:
         provider_contact = "–"
 
-    return render(request, "accounts/exam_view.html", {
+    # links assinados: o navegador baixa sem passar de novo pela sessão/permissão
+    pdf_url = _signed_file_url("exam", exam) if exam.pdf_file else ""
+    for extra in extras:
+        extra.download_url = _signed_file_url("extra", extra)
+
+    viewer = _page_viewer_identity(request, profile)
+    etag = last_modified = None
+    if viewer is not None:
+        extras_last_modified = max((extra.updated_at for extra in extras), default=None)
+        extras_total = len(extras)
+        last_modified = max(filter(None, [exam.updated_at, extras_last_modified]), default=None)
+        etag = make_etag(
+            "exam_view", *viewer,
+            exam.pk, exam.updated_at, extras_last_modified, extras_total,
+            provider_contact, additional_providers, pdf_url,
+        )
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+    response = render(request, "accounts/exam_view.html", {
         "profile": profile,
         "exam": exam,
         "extras": extras,
         "is_admin": is_admin_user(request.user),
         "provider_contact": provider_contact,
+        "additional_providers": additional_providers,
+        "pdf_url": pdf_url,
     })
+    if etag is not None:
+        set_validators(response, etag, last_modified)
+    return response
 
 
 @login_required
@@ -1242,15 +1717,7 @@ def exam_extra_pdf(request, pk, extra_pk):
 
     extra = get_object_or_404(ExamExtraPDF, pk=extra_pk, exam=exam)
 
-    content_type, _ = mimetypes.guess_type(extra.file.name)
-    if not content_type:
-        content_type = "application/octet-stream"
-
-    response = FileResponse(extra.file.open("rb"), content_type=content_type)
-
-    filename = os.path.basename(extra.file.name)
-    response["Content-Disposition"] = f'inline; filename="{filename}"'
-    return response
+    return serve_file(request, extra.file, sha256=extra.sha256, filename=extra.display_name)
 
     
 @login_required
@@ -1365,27 +1832,7 @@ def management_view(request, category='tutores'):
         page_obj = paginator.get_page(page_number)
         items = page_obj.object_list
 
-        current_page = page_obj.number
-        total_pages = paginator.num_pages
-
-        if total_pages <= 9:
-            page_numbers = list(range(1, total_pages + 1))
-        else:
-            page_numbers = []
-            last_added = None
-
-            for num in range(1, total_pages + 1):
-                should_show = (
-                    num == 1 or
-                    num == total_pages or
-                    abs(num - current_page) <= 2
-                )
-
-                if should_show:
-                    if last_added and num - last_added > 1:
-                        page_numbers.append('...')
-                    page_numbers.append(num)
-                    last_added = num
+        page_numbers = build_page_numbers(page_obj.number, paginator.num_pages)
 
         return render(request, 'accounts/management.html', {
             'profile': profile,
@@ -1408,6 +1855,10 @@ def management_view(request, category='tutores'):
     Model = info['model']
 
     items = Model.objects.all()
+    if category in ("clinicas", "veterinarios"):
+        items = items.select_related("user")
+    elif category == "pets":
+        items = items.select_related("tutor")
 
     search_query = request.GET.get('q', '').strip()
     if search_query:
@@ -1428,66 +1879,75 @@ def management_view(request, category='tutores'):
     else:
         items = items.order_by('-created_at')
 
-    if category in ("tutores", "clinicas", "veterinarios"):
-        items_list = list(items)
-
-        if category == "tutores":
-            emails = [((t.email or "").strip().lower()) for t in items_list if (t.email or "").strip()]
-            email_to_has = {}
-
-            if emails:
-                profiles = Profile.objects.select_related("user").filter(
-                    role="TUTOR",
-                    user__email__in=emails,
-                )
-                for p in profiles:
-                    em = (p.user.email or "").strip().lower()
-                    if em:
-                        email_to_has[em] = p.user.has_usable_password()
-
-            for t in items_list:
-                em = (t.email or "").strip().lower()
-                t.has_account = bool(em and email_to_has.get(em, False))
-
+    has_account_category = category in ("tutores", "clinicas", "veterinarios")
+
+    # 304 quando nem os registros da aba nem as contas (coluna "conta") mudaram
+    viewer = _page_viewer_identity(request, profile)
+    etag = last_modified = None
+    if viewer is not None:
+        last_modified, total = fingerprint(items)
+        accounts_state = None
+        if has_account_category:
+            accounts_state = User.objects.aggregate(
+                total=Count("pk"), joined=Max("date_joined"), login=Max("last_login"),
+            )
+        etag = make_etag(
+            "management", category, *viewer, is_superadmin,
+            sorted(request.GET.lists()), per_page, last_modified, total, accounts_state,
+        )
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+    page_obj = None
+    cursor_page = None
+    page_numbers = []
+
+    if cursor_pagination_enabled(request) and order != "conta":
+        if order in order_map:
+            cursor_field, cursor_desc = order_map[order], direction == 'desc'
         else:
-            for obj in items_list:
-                u = getattr(obj, "user", None)
-                obj.has_account = bool(u and u.has_usable_password())
-
-        items = items_list
+            cursor_field, cursor_desc = 'created_at', True
+
+        cursor_page = paginate_by_cursor(
+            items,
+            cursor_field,
+            descending=cursor_desc,
+            cursor=request.GET.get('cursor'),
+            per_page=per_page,
+            order_key=f"{category}:{order}:{direction}",
+        )
+        items = cursor_page.object_list
+        if has_account_category:
+            _annotate_has_account(category, items)
 
-        if order == "conta":
+    else:
+        # a ordenação por "conta" depende de has_account, então precisa de todos os itens;
+        # nas demais, só os itens da página são anotados
+        if has_account_category and order == "conta":
+            items = list(items)
+            _annotate_has_account(category, items)
             items.sort(
                 key=lambda x: (x.has_account, (getattr(x, "display_name", "") or "").lower()),
                 reverse=(direction == "desc")
             )
 
-    paginator = Paginator(items, per_page)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    items = page_obj.object_list
-
-    current_page = page_obj.number
-    total_pages = paginator.num_pages
-
-    if total_pages <= 9:
-        page_numbers = list(range(1, total_pages + 1))
-    else:
-        page_numbers = []
-        last_added = None
-
-        for num in range(1, total_pages + 1):
-            should_show = (
-                num == 1 or
-                num == total_pages or
-                abs(num - current_page) <= 2
+        if isinstance(items, list):
+            paginator = Paginator(items, per_page)
+        else:
+            paginator = CachedCountPaginator(
+                items,
+                per_page,
+                count_key=("management", category, search_query.lower()),
+                estimate=not search_query,
             )
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
+        items = list(page_obj.object_list)
+
+        if has_account_category and order != "conta":
+            _annotate_has_account(category, items)
 
-            if should_show:
-                if last_added and num - last_added > 1:
-                    page_numbers.append('...')
-                page_numbers.append(num)
-                last_added = num
+        page_numbers = build_page_numbers(page_obj.number, paginator.num_pages)
 
     categories_nav = [
         {'slug': key, 'label': value['label']}
@@ -1507,10 +1967,42 @@ def management_view(request, category='tutores'):
         'order': order,
         'direction': direction,
         'page_obj': page_obj,
+        'cursor_page': cursor_page,
         'page_numbers': page_numbers,
         'per_page': per_page,
     }
-    return render(request, 'accounts/management.html', context)
+    response = render(request, 'accounts/management.html', context)
+    if etag is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+def _annotate_has_account(category, items_list):
+    """
+    Marca obj.has_account nos itens de Tutores/Clínicas/Veterinários
+    (tutor: conta TUTOR ativa com o mesmo e-mail; clínica/vet: user vinculado ativo).
+    """
+    if category == "tutores":
+        emails = [((t.email or "").strip().lower()) for t in items_list if (t.email or "").strip()]
+        email_to_has = {}
+
+        if emails:
+            profiles = Profile.objects.select_related("user").filter(
+                role="TUTOR",
+                user__email__in=emails,
+            )
+            for p in profiles:
+                em = (p.user.email or "").strip().lower()
+                if em:
+                    email_to_has[em] = p.user.has_usable_password()
+
+        for t in items_list:
+            em = (t.email or "").strip().lower()
+            t.has_account = bool(em and email_to_has.get(em, False))
+
+    else:
+        for obj in items_list:
+            u = getattr(obj, "user", None)
+            obj.has_account = bool(u and u.has_usable_password())
 
 @login_required
 @admin_required
@@ -2022,7 +2514,8 @@ def management_remove_access(request, category, pk):
     obj.user = None
     obj.save(update_fields=["user"])
     try:
-        Exam.objects.filter(assigned_user=u).update(assigned_user=None)
+        Exam.objects.filter(assigned_user=u).update(assigned_user=None, updated_at=timezone.now())
+        bump_list_version()
     except Exception:
         pass
 
@@ -2082,7 +2575,8 @@ def management_delete(request, category, pk):
     if linked_user:
         if category in ("clinicas", "veterinarios"):
             try:
-                Exam.objects.filter(assigned_user=linked_user).update(assigned_user=None)
+                Exam.objects.filter(assigned_user=linked_user).update(assigned_user=None, updated_at=timezone.now())
+                bump_list_version()
             except Exception:
                 pass
 
@@ -2305,9 +2799,11 @@ def admin_user_delete(request, user_id: int):
         messages.error(request, "Este usuário não é um Administrador Auxiliar.")
         return redirect('gestao_category', category='admin')
 
-    Clinic.objects.filter(user=target_user).update(user=None)
-    Veterinarian.objects.filter(user=target_user).update(user=None)
-    Exam.objects.filter(assigned_user=target_user).update(assigned_user=None)
+    now = timezone.now()
+    Clinic.objects.filter(user=target_user).update(user=None, updated_at=now)
+    Veterinarian.objects.filter(user=target_user).update(user=None, updated_at=now)
+    Exam.objects.filter(assigned_user=target_user).update(assigned_user=None, updated_at=now)
+    bump_list_version()
 
     name = target_user.first_name or target_user.username
     target_user.delete()
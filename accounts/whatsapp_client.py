@@ -7,6 +7,8 @@ from urllib.parse import urlsplit
 from django.conf import settings
 from django.urls import reverse
 
+from .invitations import absolute_url
+
 
 def normalize_br_phone(phone: str) -> str:
     """
@@ -161,7 +163,7 @@ def send_tutor_exam_whatsapp(request, *, exam, to_phone: str, activation_link: s
     """
     tutor_first_name = _first_name_only(exam.tutor_name)
     exam_date = exam.date_realizacao.strftime("%d/%m/%Y")
-    login_link = request.build_absolute_uri(reverse("login"))
+    login_link = absolute_url(request, reverse("login"))
 
     is_first_access = bool(activation_link)
     target_link = activation_link or login_link
@@ -199,7 +201,7 @@ def send_provider_exam_whatsapp(request, *, exam, to_phone: str, recipient_label
     - Clínica/Veterinário com acesso já existente
     """
     exam_date = exam.date_realizacao.strftime("%d/%m/%Y")
-    login_link = request.build_absolute_uri(reverse("login"))
+    login_link = absolute_url(request, reverse("login"))
 
     is_first_access = bool(activation_link)
     target_link = activation_link or login_link
@@ -244,7 +246,7 @@ def send_provider_exam_resend_whatsapp(
     Usa os templates específicos de reenvio.
     """
     exam_date = exam.date_realizacao.strftime("%d/%m/%Y")
-    login_link = request.build_absolute_uri(reverse("login"))
+    login_link = absolute_url(request, reverse("login"))
 
     is_first_access = bool(activation_link)
     target_link = activation_link or login_link
@@ -319,7 +321,7 @@ def send_exam_whatsapp(request, *, exam, to_phone: str, recipient_label: str, ac
     if not settings.WHATSAPP_TEMPLATE_NAME:
         raise RuntimeError("WHATSAPP_TEMPLATE_NAME não configurado.")
 
-    login_link = request.build_absolute_uri(reverse("login"))
+    login_link = absolute_url(request, reverse("login"))
     target_link = activation_link or login_link
 
     if settings.WHATSAPP_TEMPLATE_NAME == "hello_world":
@@ -349,7 +351,7 @@ def send_contact_updated_whatsapp(
     if not settings.WHATSAPP_TEMPLATE_CONTACT_UPDATED:
         raise RuntimeError("WHATSAPP_TEMPLATE_CONTACT_UPDATED não configurado.")
 
-    login_link = request.build_absolute_uri(reverse("login"))
+    login_link = absolute_url(request, reverse("login"))
     target_suffix = _url_suffix_from_absolute_url(login_link)
 
     return _send_template_message(
@@ -372,7 +374,7 @@ def send_provider_bulk_exam_whatsapp(
     exam_count: int,
     activation_link: str | None = None,
 ) -> bool:
-    login_link = request.build_absolute_uri(reverse("login"))
+    login_link = absolute_url(request, reverse("login"))
 
     is_first_access = bool(activation_link)
     target_link = activation_link or login_link
@@ -410,7 +412,7 @@ def send_provider_return_whatsapp(
     activation_link: str | None = None,
 ) -> bool:
     exam_date = exam.date_realizacao.strftime("%d/%m/%Y")
-    login_link = request.build_absolute_uri(reverse("login"))
+    login_link = absolute_url(request, reverse("login"))
 
     is_first_access = bool(activation_link)
     target_link = activation_link or login_link
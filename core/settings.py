@@ -93,6 +93,43 @@ DATABASES = {
     )
 }
 
+# Busca de exames: "auto" usa FTS5 no SQLite e tsvector/pg_trgm no Postgres
+# (conforme o banco acima); "basic" força LIKE simples.
+EXAM_SEARCH_BACKEND = os.environ.get("EXAM_SEARCH_BACKEND", "auto").strip()
+
+# Paginação das listas de exames/gestão: "pages" (numerada, com COUNT) ou
+# "cursor" (keyset, custo constante em qualquer profundidade)
+LIST_PAGINATION_MODE = os.environ.get("LIST_PAGINATION_MODE", "pages").strip()
+
+# Total das listas paginadas: guardado em cache por (escopo, busca, filtros).
+# Com LIST_COUNT_MODE="estimate", listas sem filtro no Postgres usam a
+# estimativa do planner (pg_class.reltuples) a partir de LIST_COUNT_ESTIMATE_MIN_ROWS.
+LIST_COUNT_MODE = os.environ.get("LIST_COUNT_MODE", "exact").strip()
+LIST_COUNT_CACHE_TIMEOUT = int(os.environ.get("LIST_COUNT_CACHE_TIMEOUT", "300"))
+LIST_COUNT_ESTIMATE_MIN_ROWS = int(os.environ.get("LIST_COUNT_ESTIMATE_MIN_ROWS", "10000"))
+
+# HTML renderizado da lista de exames, por usuário (0 desliga)
+LIST_PAGE_CACHE_TIMEOUT = int(os.environ.get("LIST_PAGE_CACHE_TIMEOUT", "60"))
+
+# Sugestões da busca de exames (por usuário e prefixo digitado)
+EXAM_SUGGEST_CACHE_TIMEOUT = int(os.environ.get("EXAM_SUGGEST_CACHE_TIMEOUT", "30"))
+
+# Sem serviços externos: cache em memória local (padrão) ou em arquivos
+# com CACHE_DIR (compartilhado entre os workers do gunicorn).
+# O cache das listas (contagens, páginas, sugestões e o ETag da lista de
+# exames) depende de um contador de versão que todos os workers enxergam;
+# com a memória local ele fica desligado (accounts/list_cache.py). Em
+# produção com vários workers, use CACHE_DIR. LIST_CACHE_ENABLED=1/0 força.
+_list_cache_enabled = os.environ.get("LIST_CACHE_ENABLED", "").strip().lower()
+LIST_CACHE_ENABLED = _list_cache_enabled in ("true", "1", "yes") if _list_cache_enabled else None
+if os.environ.get("CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["CACHE_DIR"],
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -138,6 +175,48 @@ if os.environ.get("RENDER_EXTERNAL_HOSTNAME"):
 else:
     MEDIA_ROOT = BASE_DIR / "media"
 
+# Entrega dos PDFs/extras dos exames pelo servidor da frente (ver
+# accounts/file_delivery.py): "" = Django (FileResponse), "x-accel" = nginx,
+# "x-sendfile" = Apache/lighttpd. FILE_OFFLOAD_PREFIX é a location interna
+# do nginx que aponta para o MEDIA_ROOT.
+FILE_OFFLOAD_MODE = os.environ.get("FILE_OFFLOAD_MODE", "").strip()
+FILE_OFFLOAD_PREFIX = os.environ.get("FILE_OFFLOAD_PREFIX", "/protected-media/").strip()
+
+# Links assinados de download (/arquivos/<token>/): validade padrão em
+# segundos e janela de arredondamento (o mesmo link vale durante a janela)
+SIGNED_DOWNLOAD_MAX_AGE = int(os.environ.get("SIGNED_DOWNLOAD_MAX_AGE", "3600"))
+SIGNED_DOWNLOAD_WINDOW = int(os.environ.get("SIGNED_DOWNLOAD_WINDOW", "900"))
+
+# Máximo de exames por download em ZIP (/exames/baixar/)
+EXAM_ZIP_MAX_EXAMS = int(os.environ.get("EXAM_ZIP_MAX_EXAMS", "500"))
+
+# Linearizar/recomprimir os PDFs no upload (precisa do pikepdf instalado)
+PDF_OPTIMIZE_ON_UPLOAD = os.environ.get("PDF_OPTIMIZE_ON_UPLOAD", "False").lower() in ("true", "1", "yes")
+
+# Upload em partes (accounts/chunked_upload.py): arquivos acima do limite
+# vão em partes de CHUNKED_UPLOAD_CHUNK_SIZE bytes, retomáveis; parciais sem
+# atividade por CHUNKED_UPLOAD_EXPIRY_HOURS são apagados pelo
+# cleanup_chunked_uploads
+CHUNKED_UPLOAD_THRESHOLD = int(os.environ.get("CHUNKED_UPLOAD_THRESHOLD", str(8 * 1024 * 1024)))
+CHUNKED_UPLOAD_CHUNK_SIZE = int(os.environ.get("CHUNKED_UPLOAD_CHUNK_SIZE", str(5 * 1024 * 1024)))
+CHUNKED_UPLOAD_MAX_SIZE = int(os.environ.get("CHUNKED_UPLOAD_MAX_SIZE", str(1024 * 1024 * 1024)))
+CHUNKED_UPLOAD_EXPIRY_HOURS = int(os.environ.get("CHUNKED_UPLOAD_EXPIRY_HOURS", "24"))
+
+# Upload em massa em segundo plano (accounts/batch_upload.py):
+# "thread" (padrão), "inline" ou "command" (só pelo process_upload_batches).
+# "thread" é uma thread daemon do processo web: morre com ele (deploy,
+# reciclagem de worker) e o lote só volta pelo comando. Em produção, usar
+# "command" com o process_upload_batches agendado (cron/systemd).
+UPLOAD_BATCH_WORKER = os.environ.get("UPLOAD_BATCH_WORKER", "thread").strip()
+UPLOAD_BATCH_WRITE_WORKERS = int(os.environ.get("UPLOAD_BATCH_WRITE_WORKERS", "4"))
+UPLOAD_BATCH_STALE_MINUTES = int(os.environ.get("UPLOAD_BATCH_STALE_MINUTES", "30"))
+
+# Upload em massa por .zip: máximo de arquivos no ZIP, tamanho máximo de
+# cada laudo e do ZIP inteiro depois de descompactado (bytes)
+UPLOAD_ZIP_MAX_MEMBERS = int(os.environ.get("UPLOAD_ZIP_MAX_MEMBERS", "1000"))
+UPLOAD_ZIP_MAX_MEMBER_SIZE = int(os.environ.get("UPLOAD_ZIP_MAX_MEMBER_SIZE", str(100 * 1024 * 1024)))
+UPLOAD_ZIP_MAX_TOTAL_SIZE = int(os.environ.get("UPLOAD_ZIP_MAX_TOTAL_SIZE", str(2 * 1024 * 1024 * 1024)))
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -148,6 +227,9 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'meu_perfil'
 LOGOUT_REDIRECT_URL = 'login'
 
+# Endereço público do site: monta os links dos e-mails/WhatsApp enviados
+# fora de uma requisição (send_due_exam_returns, upload em massa em segundo
+# plano). Em produção, configurar com o domínio real (https://...).
 SITE_URL = os.environ.get("SITE_URL", "http://127.0.0.1:8000")
 
 # Email (SendGrid SMTP)
@@ -194,6 +276,10 @@ STORAGES = {
     "default": {
         "BACKEND": "django.core.files.storage.FileSystemStorage",
     },
+    # PDFs/extras dos exames, gravados pelo hash do conteúdo (accounts/storage.py)
+    "exam_files": {
+        "BACKEND": "accounts.storage.ContentAddressedStorage",
+    },
 }
 
 CANONICAL_HOST = "lumavet.pet"